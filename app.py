@@ -1,70 +1,821 @@
-from flask import Flask, request, jsonify, send_file
+import time
+STARTUP_STARTED = time.perf_counter()
+
+from flask import Flask, request, jsonify, send_file, Response, stream_with_context, g, has_request_context
 from flask_cors import CORS
 import os
 import json
 import uuid
+import threading
+import random
+import hashlib
+import atexit
+import sqlite3
+import socket
+import re
+import bisect
+import math
+import contextlib
+import contextvars
+import logging
+import queue
+import sys
+import importlib
+import importlib.util
+from logging.handlers import QueueHandler, QueueListener
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import io
-import markdown
-from xhtml2pdf import pisa
-from docx import Document
-from openai import OpenAI
-from reportlab.lib.pagesizes import A4
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle, Spacer
-from reportlab.lib.enums import TA_CENTER
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import pdfmetrics
+import copy
+import weakref
+import zipfile
+import shutil
+import tempfile
+from dataclasses import dataclass
+try:
+    import fcntl
+except ImportError:  # Windows: chat log appends are only serialized within one process
+    fcntl = None
 
-import os
-import json
-from docx import Document
+
+# -------- Startup profiling --------
+# With RESUMECRAFT_PROFILE_STARTUP=1 (or `python app.py --profile-startup`)
+# the time spent importing and initialising each part of the app is logged
+# at startup, and the one-off cost of each lazily loaded dependency is logged
+# when it is first used. For a per-module breakdown of the eager imports use
+# `python -X importtime app.py --profile-startup`.
+PROFILE_STARTUP = os.environ.get("RESUMECRAFT_PROFILE_STARTUP") == "1" or "--profile-startup" in sys.argv
+startup_timings = OrderedDict([("imports", time.perf_counter() - STARTUP_STARTED)])
+
+
+@contextlib.contextmanager
+def startup_phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        startup_timings[name] = startup_timings.get(name, 0.0) + elapsed
+        if PROFILE_STARTUP and "module" in startup_timings:
+            logger.info("Startup profile: %s took %.1f ms", name, elapsed * 1000)
+
+
+def startup_report():
+    return "\n".join(f"  {name:<32} {seconds * 1000:9.1f} ms" for name, seconds in startup_timings.items())
 
 
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+CORS(app, expose_headers=["X-Total-Count", "X-Next-Offset", "Server-Timing", "X-Request-ID"])  # Enable CORS for all routes
+
+# -------- Logging --------
+# Records are put on a queue by the calling thread and written by a
+# QueueListener thread, so request handlers never wait on stdout. Each record
+# carries the id of the request that produced it (X-Request-ID, or a generated
+# id echoed back in that header); work handed to the thread pools keeps the
+# id via submit_in_context(). Per-call detail such as file sizes and request
+# payloads is logged at DEBUG, which is off unless RESUMECRAFT_LOG_LEVEL=DEBUG.
+# RESUMECRAFT_LOG_FORMAT=json writes one JSON object per line.
+LOG_LEVEL = os.environ.get("RESUMECRAFT_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("RESUMECRAFT_LOG_FORMAT", "text")
+REQUEST_ID_MAX_LENGTH = 128
+
+_request_id = contextvars.ContextVar("request_id", default="-")
+# Context carried into thread pool work by submit_in_context()
+_propagated_context_vars = [_request_id]
+_LOG_RECORD_FIELDS = set(vars(logging.makeLogRecord({}))) | {"message", "request_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        record.request_id = _request_id.get()
+        return True
+
+
+class JsonLogFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "requestId": record.request_id,
+            "message": record.getMessage(),
+        }
+        # Anything passed through ``extra=`` becomes a field of its own
+        entry.update((key, value) for key, value in vars(record).items() if key not in _LOG_RECORD_FIELDS)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    if logger.handlers:
+        return
+    handler = logging.StreamHandler(sys.stdout)
+    if LOG_FORMAT == "json":
+        handler.setFormatter(JsonLogFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s [%(request_id)s] %(message)s"))
+    log_queue = queue.SimpleQueue()
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(RequestIdFilter())
+    logger.addHandler(queue_handler)
+    logger.setLevel(LOG_LEVEL)
+    logger.propagate = False
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+    # A preforked worker inherits the queue but not the listener thread
+    if hasattr(os, "register_at_fork"):
+        os.register_at_fork(after_in_child=listener.start)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    """executor.submit() that runs fn with the caller's request id and user.
+
+    Only those values are carried over: fn runs in a fresh context, so it
+    never sees the (possibly finished) Flask request.
+    """
+    values = [(var, var.get()) for var in _propagated_context_vars]
+
+    def run():
+        for var, value in values:
+            var.set(value)
+        return fn(*args, **kwargs)
+
+    return executor.submit(contextvars.Context().run, run)
+
+
+logger = logging.getLogger("resumecraft")
+with startup_phase("logging"):
+    configure_logging()
+
+
+@app.before_request
+def _assign_request_id():
+    request_id = request.headers.get("X-Request-ID", "")[:REQUEST_ID_MAX_LENGTH]
+    g.request_id = request_id if request_id.isprintable() and request_id.strip() else uuid.uuid4().hex
+    _request_id.set(g.request_id)
+
+
+@app.after_request
+def _echo_request_id(response):
+    if "request_id" in g:
+        response.headers["X-Request-ID"] = g.request_id
+    return response
+
+
+@app.teardown_request
+def _clear_request_id(exc):
+    _request_id.set("-")
+
+
+LLM_MODEL = os.environ.get("RESUMECRAFT_LLM_MODEL", "gpt-4o-mini")
+LLM_TIMEOUT_SECONDS = float(os.environ.get("RESUMECRAFT_LLM_TIMEOUT", "60"))
+LLM_MAX_CONCURRENCY = int(os.environ.get("RESUMECRAFT_LLM_MAX_CONCURRENCY", "16"))
+LLM_MAX_RETRIES = 3
+LLM_RETRY_BASE_DELAY = 0.5
+LLM_RETRY_MAX_DELAY = 8.0
+
+# Model calls are network-bound, so independent calls run on a small shared
+# thread pool; its size caps the number of in-flight requests to the API.
+LLM_MAX_WORKERS = 16
+llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+
+# -------- Metrics --------
+# Request latency, per-stage timings (span()) and LLM call latency and token
+# usage are kept as Prometheus histograms/counters and served from /metrics.
+# Stage spans nest, so a stage's time includes any stages inside it. With
+# RESUMECRAFT_METRICS=0 span() hands back a shared no-op context manager and
+# nothing is recorded. RESUMECRAFT_SERVER_TIMING=1 also reports each
+# request's stages in a Server-Timing header (streamed responses only cover
+# the time until the body starts).
+METRICS_ENABLED = os.environ.get("RESUMECRAFT_METRICS", "1") != "0"
+SERVER_TIMING_ENABLED = METRICS_ENABLED and os.environ.get("RESUMECRAFT_SERVER_TIMING", "0") == "1"
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+METRICS_HELP = {
+    "resumecraft_http_request_duration_seconds": ("histogram", "HTTP request latency by route"),
+    "resumecraft_stage_duration_seconds": ("histogram", "Time spent in each request/render stage"),
+    "resumecraft_llm_request_duration_seconds": ("histogram", "LLM call latency including slot wait and retries"),
+    "resumecraft_llm_tokens_total": ("counter", "Tokens reported by the model API"),
+    "resumecraft_llm_retries_total": ("counter", "Retried LLM requests"),
+    "resumecraft_llm_cache_events_total": ("counter", "LLM response cache lookups by outcome"),
+}
+
+
+class Histogram:
+    def __init__(self, buckets=METRICS_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """Thread-safe histograms and counters keyed by metric name and labels."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = Histogram()
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def render(self, extra_counters=()):
+        """Return the Prometheus text exposition of every series.
+
+        ``extra_counters`` are (name, labels, value) tuples computed at scrape
+        time, e.g. from stats the app already keeps.
+        """
+        with self._lock:
+            histograms = {name: {key: (list(h.counts), h.sum, h.count) for key, h in series.items()}
+                          for name, series in self._histograms.items()}
+            counters = {name: dict(series) for name, series in self._counters.items()}
+        for name, labels, value in extra_counters:
+            counters.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+
+        lines = []
+        for name in sorted(set(histograms) | set(counters)):
+            kind, help_text = METRICS_HELP.get(name, ("histogram" if name in histograms else "counter", name))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, (counts, total, count) in sorted(histograms.get(name, {}).items()):
+                cumulative = 0
+                for bound, bucket_count in zip(METRICS_LATENCY_BUCKETS + ("+Inf",), counts):
+                    cumulative += bucket_count
+                    lines.append(f"{name}_bucket{_metric_labels(key + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_metric_labels(key)} {total}")
+                lines.append(f"{name}_count{_metric_labels(key)} {count}")
+            for key, value in sorted(counters.get(name, {}).items()):
+                lines.append(f"{name}{_metric_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _metric_labels(key):
+    if not key:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in key)
+    return "{" + ",".join(f'{label}="{value}"' for (label, _), value in zip(key, escaped)) + "}"
+
+
+metrics = MetricsRegistry()
+
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        metrics.observe("resumecraft_stage_duration_seconds", elapsed, stage=self.stage)
+        if SERVER_TIMING_ENABLED and has_request_context():
+            timings = g.setdefault("server_timing", {})
+            timings[self.stage] = timings.get(self.stage, 0.0) + elapsed
+        return False
+
+
+_NO_SPAN = contextlib.nullcontext()
+
+
+def span(stage):
+    """Time a block as ``stage``: ``with span("pdf-layout"): ...``"""
+    if not METRICS_ENABLED:
+        return _NO_SPAN
+    return _Span(stage)
+
+
+@app.before_request
+def _start_request_timer():
+    if METRICS_ENABLED:
+        g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request_metrics(response):
+    started = g.pop("request_started", None)
+    if started is None:
+        return response
+    elapsed = time.perf_counter() - started
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    metrics.observe("resumecraft_http_request_duration_seconds", elapsed,
+                    method=request.method, route=route, status=str(response.status_code))
+    if SERVER_TIMING_ENABLED:
+        timings = g.pop("server_timing", {})
+        entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+        entries.append(f"total;dur={elapsed * 1000:.2f}")
+        response.headers["Server-Timing"] = ", ".join(entries)
+    return response
+
+# -------- LLM client --------
+class LLMTimeout(Exception):
+    """The call's deadline passed before the model produced a response."""
+
+
+class LLMClient:
+    """OpenAI-compatible chat client shared by every model call in the app.
+
+    All calls go through one pooled HTTP transport. Each call has an overall
+    deadline that covers waiting for a concurrency slot and any retries.
+    429 and 5xx responses and connection errors are retried with jittered
+    exponential backoff. The number of in-flight requests is capped by
+    ``max_concurrency``. Point ``base_url`` at fake_openai_server.py to
+    run offline. The openai/httpx stack is imported when the first call is
+    made (or by warm_up()).
+    """
+
+    def __init__(self, api_key, base_url=None, model=LLM_MODEL, timeout=LLM_TIMEOUT_SECONDS,
+                 max_concurrency=LLM_MAX_CONCURRENCY, max_retries=LLM_MAX_RETRIES):
+        self.model = model
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._api_key = api_key
+        self._base_url = base_url
+        self._max_concurrency = max_concurrency
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._client_lock = threading.Lock()
+        self._openai = None
+        self._retryable = ()
+
+    def _client(self):
+        if self._openai is None:
+            with self._client_lock:
+                if self._openai is None:
+                    with startup_phase("openai client"):
+                        import httpx
+                        import openai
+                        http = httpx.Client(
+                            limits=httpx.Limits(max_connections=self._max_concurrency,
+                                                max_keepalive_connections=self._max_concurrency),
+                            timeout=self.timeout
+                        )
+                        self._retryable = (openai.RateLimitError, openai.InternalServerError,
+                                           openai.APIConnectionError, openai.APITimeoutError)
+                        self._openai = openai.OpenAI(api_key=self._api_key, base_url=self._base_url,
+                                                     http_client=http, max_retries=0, timeout=self.timeout)
+        return self._openai
+
+    def _remaining(self, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMTimeout("LLM call deadline exceeded")
+        return remaining
+
+    def _backoff(self, attempt, error, deadline):
+        delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * 2 ** attempt))
+        response = getattr(error, "response", None)
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after:
+            try:
+                delay = max(delay, float(retry_after))
+            except ValueError:
+                pass
+        if time.monotonic() + delay >= deadline:
+            raise LLMTimeout("LLM call deadline exceeded while retrying") from error
+        logger.warning("Retrying LLM call in %.2fs after error: %s", delay, error)
+        time.sleep(delay)
+
+    def _create(self, messages, model, deadline, **kwargs):
+        client = self._client()
+        attempt = 0
+        while True:
+            try:
+                return client.chat.completions.create(
+                    model=model or self.model, messages=messages,
+                    timeout=self._remaining(deadline), **kwargs
+                )
+            except self._retryable as e:
+                if attempt >= self.max_retries:
+                    raise
+                self._backoff(attempt, e, deadline)
+                attempt += 1
+                if METRICS_ENABLED:
+                    metrics.inc("resumecraft_llm_retries_total", model=model or self.model)
+
+    def complete(self, messages, model=None, timeout=None):
+        """Return the stripped text of one chat completion."""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            deadline = time.monotonic() + (timeout or self.timeout)
+            if not self._slots.acquire(timeout=self._remaining(deadline)):
+                raise LLMTimeout("Timed out waiting for an LLM slot")
+            try:
+                response = self._create(messages, model, deadline)
+            finally:
+                self._slots.release()
+            outcome = "ok"
+            record_llm_usage(model or self.model, getattr(response, "usage", None))
+            return response.choices[0].message.content.strip()
+        except LLMTimeout:
+            outcome = "timeout"
+            raise
+        finally:
+            record_llm_latency(model or self.model, outcome, time.perf_counter() - started)
+
+    def stream(self, messages, model=None, timeout=None):
+        """Start a streamed completion and return an iterator of text deltas.
+
+        The connection is opened (and retried) before this returns; the
+        concurrency slot is held until the iterator is exhausted or closed.
+        """
+        started = time.perf_counter()
+        model = model or self.model
+        deadline = time.monotonic() + (timeout or self.timeout)
+        try:
+            if not self._slots.acquire(timeout=self._remaining(deadline)):
+                raise LLMTimeout("Timed out waiting for an LLM slot")
+        except LLMTimeout:
+            record_llm_latency(model, "timeout", time.perf_counter() - started)
+            raise
+        try:
+            stream = self._create(messages, model, deadline, stream=True)
+        except Exception as e:
+            self._slots.release()
+            record_llm_latency(model, "timeout" if isinstance(e, LLMTimeout) else "error",
+                               time.perf_counter() - started)
+            raise
+        return _DeltaStream(stream, self._slots, model, started)
+
+
+def record_llm_latency(model, outcome, seconds):
+    if METRICS_ENABLED:
+        metrics.observe("resumecraft_llm_request_duration_seconds", seconds, model=model, outcome=outcome)
+
+
+def record_llm_usage(model, usage):
+    if METRICS_ENABLED and usage is not None:
+        metrics.inc("resumecraft_llm_tokens_total", usage.prompt_tokens or 0, model=model, kind="prompt")
+        metrics.inc("resumecraft_llm_tokens_total", usage.completion_tokens or 0, model=model, kind="completion")
+
+
+class _DeltaStream:
+    """Iterator of text deltas that releases its concurrency slot exactly once.
 
-#Paste your API key here
-client = OpenAI(api_key="YOUR-API-KEY")
+    Unlike a generator, close() releases the slot even when iteration never
+    started (e.g. the client disconnected before the first token).
+    """
 
-# Set the directory for storing user data
-DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+    def __init__(self, stream, slots, model, started):
+        self._stream = stream
+        self._chunks = iter(stream)
+        self._slots = slots
+        self._model = model
+        self._started = started
+        self._outcome = "error"
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            while True:
+                chunk = next(self._chunks)
+                # Some servers report usage on the final chunk
+                record_llm_usage(self._model, getattr(chunk, "usage", None))
+                if chunk.choices and chunk.choices[0].delta.content:
+                    return chunk.choices[0].delta.content
+        except StopIteration:
+            self._outcome = "ok"
+            self.close()
+            raise
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._stream.close()
+            self._slots.release()
+            record_llm_latency(self._model, self._outcome, time.perf_counter() - self._started)
+
+
+#Paste your API key here, or set OPENAI_API_KEY
+llm = LLMClient(
+    api_key=os.environ.get("OPENAI_API_KEY", "YOUR-API-KEY"),
+    base_url=os.environ.get("RESUMECRAFT_LLM_BASE_URL") or None,
+    model=LLM_MODEL
+)
+
+
+# Set the directory for storing user data (RESUMECRAFT_DATA_DIR overrides it)
+DATA_DIR = os.environ.get("RESUMECRAFT_DATA_DIR") or os.path.dirname(os.path.abspath(__file__))
+# The default user's files; other users get the same layout under users/<id>/
+DEFAULT_USER_ID = os.environ.get("RESUMECRAFT_DEFAULT_USER", "default")
 USER_DATA_FILE = os.path.join(DATA_DIR, "user_data.json")
 RESUMES_DIR = os.path.join(DATA_DIR, "resumes")
-CHAT_HISTORY_FILE = os.path.join(DATA_DIR, "chat_history.json")
+CHAT_HISTORY_DIR = os.path.join(DATA_DIR, "chat_history")
+CHAT_SEGMENT_MAX_BYTES = 16 * 1024 * 1024
 AI_CONVERSATIONS_FILE = os.path.join(DATA_DIR, "ai_conversations.json")
+USERS_DIR = os.path.join(DATA_DIR, "users")
+# "sqlite" (default) or "json" for the original single-file store
+AI_CONVERSATION_BACKEND = os.environ.get("RESUMECRAFT_CONVERSATION_BACKEND", "sqlite")
+LLM_CACHE_DIR = os.path.join(DATA_DIR, "cache", "llm")
+JOBS_DIR = os.path.join(DATA_DIR, "jobs")
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+LLM_CACHE_MEMORY_ENTRIES = 256
+LLM_CACHE_MAX_DISK_BYTES = 64 * 1024 * 1024
+# Bursts of profile/conversation edits within this window are written once
+STORE_FLUSH_WINDOW_SECONDS = float(os.environ.get("RESUMECRAFT_FLUSH_WINDOW", "0.25"))
+
+logger.debug("Data directory: %s", DATA_DIR)
+logger.debug("User data file path: %s", USER_DATA_FILE)
+logger.debug("Resumes directory: %s", RESUMES_DIR)
+logger.debug("Chat history directory: %s", CHAT_HISTORY_DIR)
+logger.debug("AI conversations file path: %s", AI_CONVERSATIONS_FILE)
+
+# -------- Lazily loaded rendering stacks --------
+# reportlab and python-docx are only needed to render and parse documents, so
+# they are imported on first use and the names the renderers need are bound
+# as module globals. Each loader runs once; warm_up() runs them ahead of
+# traffic.
+_lazy_lock = threading.RLock()
+_lazy_loaded = set()
+
+
+def _load_once(name, loader):
+    if name in _lazy_loaded:
+        return
+    with _lazy_lock:
+        if name not in _lazy_loaded:
+            with startup_phase(name):
+                loader()
+            _lazy_loaded.add(name)
+
+
+def _load_reportlab():
+    global A4, inch, colors, TA_CENTER, TA_LEFT, getSampleStyleSheet, ParagraphStyle
+    global SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.units import inch
+    from reportlab.lib import colors
+    from reportlab.lib.enums import TA_CENTER, TA_LEFT
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.pdfbase import pdfmetrics
+    from reportlab.pdfbase.ttfonts import TTFont
+    # Register Times New Roman font if available
+    try:
+        pdfmetrics.registerFont(TTFont('Times-Roman', '/usr/share/fonts/truetype/msttcorefonts/times.ttf'))
+    except Exception:
+        pass  # fallback to built-in Times-Roman
 
-print(f"Data directory: {DATA_DIR}")
-print(f"User data file path: {USER_DATA_FILE}")
-print(f"Resumes directory: {RESUMES_DIR}")
-print(f"Chat history file path: {CHAT_HISTORY_FILE}")
-print(f"AI conversations file path: {AI_CONVERSATIONS_FILE}")
 
-# Register Times New Roman font if available
-try:
-    pdfmetrics.registerFont(TTFont('Times-Roman', '/usr/share/fonts/truetype/msttcorefonts/times.ttf'))
-except:
-    pass  # fallback to built-in Times-Roman
+def load_pdf_stack():
+    _load_once("reportlab", _load_reportlab)
+
+
+def _load_docx():
+    global Document, Pt
+    from docx import Document
+    from docx.shared import Pt
+
+
+def load_docx_stack():
+    _load_once("python-docx", _load_docx)
+
+
+# -------- Render templates --------
+# The PDF stylesheet and the DOCX base documents are built once per process.
+# Renderers share the stylesheet read-only and start every DOCX from a deep
+# copy of a parsed base document, which is cheaper than Document() re-reading
+# the default template from the python-docx package on each call.
+_render_templates = {}
+
+
+def _build_pdf_styles():
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='Header', fontName='Times-Roman', fontSize=18, alignment=TA_CENTER, spaceAfter=10))
+    styles.add(ParagraphStyle(name='Section', fontName='Times-Roman', fontSize=14, spaceBefore=12, spaceAfter=6, textColor=colors.HexColor('#2c3e50')))
+    styles.add(ParagraphStyle(name='Body', fontName='Times-Roman', fontSize=11, spaceAfter=4))
+    styles.add(ParagraphStyle(name='MyBullet', fontName='Times-Roman', fontSize=11, leftIndent=10, bulletIndent=5))
+    styles.add(ParagraphStyle(name='Letter', fontName='Times-Roman', fontSize=12, leading=16, alignment=TA_LEFT))
+    return styles
+
+
+def _build_cover_letter_template():
+    doc = Document()
+    font = doc.styles['Normal'].font
+    font.name = 'Times New Roman'
+    font.size = Pt(12)
+    return doc
+
+
+def _build_render_templates():
+    load_pdf_stack()
+    load_docx_stack()
+    _render_templates.update(
+        pdf_styles=_build_pdf_styles(),
+        resume_docx=Document(),
+        cover_letter_docx=_build_cover_letter_template()
+    )
+
+
+def load_render_templates():
+    _load_once("render templates", _build_render_templates)
+
+
+def pdf_styles():
+    """The shared PDF stylesheet. Callers must not modify it."""
+    load_render_templates()
+    return _render_templates["pdf_styles"]
+
+
+def new_docx(template):
+    """A fresh document built from the "resume_docx" or "cover_letter_docx" base."""
+    load_render_templates()
+    return copy.deepcopy(_render_templates[template])
 
 # Create directories if they don't exist
 if not os.path.exists(RESUMES_DIR):
     os.makedirs(RESUMES_DIR)
-    print(f"Created resumes directory: {RESUMES_DIR}")
-
-def load_user_data():
-    if os.path.exists(USER_DATA_FILE):
+    logger.info("Created resumes directory: %s", RESUMES_DIR)
+
+# -------- Write-behind JSON stores --------
+# user_data.json and ai_conversations.json are held in memory. Mutations are
+# applied copy-on-write under a lock and return immediately; a background
+# timer then writes the latest state with one temp-file-plus-rename per flush
+# window, so a burst of N edits costs one write. Readers get the current
+# object, which is never modified after it is published. The file's
+# mtime/size is checked on read so edits from another process are picked up
+# whenever there are no unflushed local changes.
+_write_behind_stores = []
+
+
+class WriteBehindJsonFile:
+    def __init__(self, path, default_factory, copy=dict, indent=2, flush_window=None):
+        self.path = path
+        self.default_factory = default_factory
+        self.copy = copy
+        self.indent = indent
+        self.flush_window = STORE_FLUSH_WINDOW_SECONDS if flush_window is None else flush_window
+        self.version = 0
+        self.writes = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._data = None
+        self._stat = None
+        self._dirty = False
+        self._flushing = False
+        self._timer = None
+        _write_behind_stores.append(self)
+
+    def _load_locked(self):
+        stat = _file_stat(self.path)
+        if self._data is not None and (self._dirty or self._flushing or stat == self._stat):
+            return self._data
+
+        data = None
+        if stat is not None:
+            try:
+                with span("store-load"), open(self.path, 'r') as f:
+                    data = json.load(f)
+                logger.debug("Loaded %s: %d bytes", os.path.basename(self.path), stat[1])
+            except Exception as e:
+                logger.error("Error loading %s: %s", self.path, e)
+        if data is None:
+            # Default data if file doesn't exist or is corrupted
+            data = self.default_factory()
+
+        self._data = data
+        self._stat = stat
+        self.version += 1
+        return data
+
+    def read(self):
+        """Return the current data. Callers must not mutate it."""
+        with self._lock:
+            return self._load_locked()
+
+    def current_version(self):
+        with self._lock:
+            self._load_locked()
+            return self.version
+
+    def mutate(self, fn):
+        """Apply fn to a copy of the data, publish the copy and schedule a flush.
+
+        Returns whatever fn returns.
+        """
+        with self._lock:
+            data = self.copy(self._load_locked())
+            result = fn(data)
+            self._publish_locked(data)
+        if self.flush_window <= 0:
+            self.flush()
+        return result
+
+    def replace(self, data):
+        with self._lock:
+            self._publish_locked(self.copy(data))
+        if self.flush_window <= 0:
+            self.flush()
+
+    def _publish_locked(self, data):
+        self._data = data
+        self.version += 1
+        self._dirty = True
+        if self.flush_window > 0 and self._timer is None:
+            self._timer = threading.Timer(self.flush_window, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Write pending changes to disk now. Returns False if the write failed."""
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return True
+                data = self._data
+                self._dirty = False
+                self._flushing = True
+
+            try:
+                with span("store-flush"):
+                    # Directories are created on first write, never on reads
+                    os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                    tmp_path = f"{self.path}.{uuid.uuid4().hex}.tmp"
+                    with open(tmp_path, 'w') as f:
+                        json.dump(data, f, indent=self.indent)
+                    os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error("Error saving %s: %s", self.path, e)
+                with self._lock:
+                    self._flushing = False
+                    if self._data is data:
+                        self._dirty = True
+                    self._publish_retry_locked()
+                return False
+
+            with self._lock:
+                self._flushing = False
+                self._stat = _file_stat(self.path)
+                self.writes += 1
+            return True
+
+    def _publish_retry_locked(self):
+        if self.flush_window > 0 and self._timer is None:
+            self._timer = threading.Timer(self.flush_window, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def close(self):
+        """Flush and stop tracking the store; it must not be used afterwards."""
+        self.flush()
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
         try:
-            with open(USER_DATA_FILE, 'r') as f:
-                data = json.load(f)
-                print(f"Successfully loaded user data: {len(str(data))} bytes")
-                return data
-        except Exception as e:
-            print(f"Error loading user data: {e}")
-    
-    # Default data if file doesn't exist or is corrupted
-    default_data = {
+            _write_behind_stores.remove(self)
+        except ValueError:
+            pass
+
+
+def flush_write_behind_stores():
+    for store in list(_write_behind_stores):
+        store.flush()
+
+
+atexit.register(flush_write_behind_stores)
+
+
+def _file_stat(path):
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def _default_user_data():
+    return {
         "name": "John Doe",
         "email": "john@example.com",
         "phone": "(123) 456-7890",
@@ -75,67 +826,932 @@ def load_user_data():
         "resumes": [],
         "coverLetters": []
     }
-    print("Creating default user data")
-    return default_data
+
+
+def _copy_user_data(data):
+    # Handlers replace top-level values and append to / replace items in the
+    # top-level lists, so copying one level deep keeps published copies intact.
+    return {key: list(value) if isinstance(value, list) else value for key, value in data.items()}
+
+
+# -------- Per-user storage shards --------
+# Each user's profile, uploaded resume, chat history and AI conversations
+# live in their own directory, users/<user id>/ (the default user keeps the
+# original top-level layout), behind their own stores and locks. A write only
+# touches the caller's files, and requests for different users never wait on
+# each other. The user comes from the X-User-Id header. Shards are opened on
+# first use and kept in a small LRU directory of USER_SHARD_CACHE_ENTRIES;
+# requests and jobs pin the shard they use, and evicting an unpinned shard
+# flushes and closes its stores. Nothing is created on disk until a user's
+# first write.
+USER_SHARD_CACHE_ENTRIES = 256
+USER_ID_PATTERN = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,63}")
+_current_user = contextvars.ContextVar("user_id", default=DEFAULT_USER_ID)
+_propagated_context_vars.append(_current_user)
+
+
+class UserShard:
+    def __init__(self, user_id, root):
+        self.user_id = user_id
+        self.root = root
+        self.pins = 0  # requests and jobs using the shard; guarded by _user_shards_lock
+        self.closed = threading.Event()
+        self.resumes_dir = os.path.join(root, "resumes")
+        self.resume_sections_file = os.path.join(self.resumes_dir, "parsed_sections.json")
+        self.resume_sections_lock = threading.Lock()
+        self.resume_sections = {"sha256": None, "sections": None}
+        self.profile = WriteBehindJsonFile(os.path.join(root, "user_data.json"), _default_user_data,
+                                           copy=_copy_user_data)
+        self.chat_history = ChatHistoryLog(os.path.join(root, "chat_history"),
+                                           legacy_file=os.path.join(root, "chat_history.json"))
+        self.artifacts = ArtifactStore(os.path.join(root, "artifacts"))
+        self._conversations_lock = threading.Lock()
+        self._conversations = None
+
+    def exists(self):
+        return os.path.isdir(self.root)
+
+    def migrate_inline_artifacts(self):
+        # Profiles written before the artifact store held every document's text inline
+        profile = self.profile.read()
+        if not any("content" in entry for key in ARTIFACT_LIST_KEYS for entry in profile.get(key, [])):
+            return
+
+        def apply(user_data):
+            for key in ARTIFACT_LIST_KEYS:
+                user_data[key] = [self.artifacts.reference(entry) for entry in user_data.get(key, [])]
+
+        self.profile.mutate(apply)
+        logger.info("Moved generated documents of user %s to the artifact store", self.user_id)
+
+    def collect_artifacts(self):
+        """Delete the artifacts the profile no longer references."""
+        profile = self.profile.read()
+        referenced = {entry.get("artifactId") for key in ARTIFACT_LIST_KEYS
+                      for entry in profile.get(key, []) if isinstance(entry, dict)}
+        removed = self.artifacts.sweep(referenced)
+        if removed:
+            logger.info("Deleted %d unreferenced artifacts of user %s", removed, self.user_id)
+        return removed
+
+    def conversations(self):
+        with self._conversations_lock:
+            if self._conversations is None:
+                json_path = os.path.join(self.root, "ai_conversations.json")
+                if AI_CONVERSATION_BACKEND == "json":
+                    store = JsonConversationStore(json_path)
+                elif AI_CONVERSATION_BACKEND == "sqlite":
+                    os.makedirs(self.root, exist_ok=True)
+                    store = SqliteConversationStore(os.path.join(self.root, "ai_conversations.db"))
+                    store.migrate_from_json(json_path)
+                else:
+                    raise ValueError(f"Unknown AI conversation backend: {AI_CONVERSATION_BACKEND}")
+                self._conversations = store
+            return self._conversations
+
+    def close(self):
+        self.profile.close()
+        with self._conversations_lock:
+            if self._conversations is not None:
+                self._conversations.close()
+                self._conversations = None
+
+
+_user_shards = OrderedDict()
+_closing_shards = {}
+_user_shards_lock = threading.Lock()
+
+
+def _evict_shards_locked():
+    evicted = []
+    for user_id in list(_user_shards):
+        if len(_user_shards) <= USER_SHARD_CACHE_ENTRIES:
+            break
+        shard = _user_shards[user_id]
+        if shard.pins == 0:
+            del _user_shards[user_id]
+            _closing_shards[user_id] = shard
+            evicted.append(shard)
+    return evicted
+
+
+def _open_shard(user_id, pin):
+    while True:
+        with _user_shards_lock:
+            closing = _closing_shards.get(user_id)
+            if closing is None:
+                shard = _user_shards.get(user_id)
+                created = shard is None
+                if created:
+                    root = DATA_DIR if user_id == DEFAULT_USER_ID else os.path.join(USERS_DIR, user_id)
+                    shard = _user_shards[user_id] = UserShard(user_id, root)
+                _user_shards.move_to_end(user_id)
+                if pin:
+                    shard.pins += 1
+                evicted = _evict_shards_locked()
+                break
+        # Don't reopen the user's files while the evicted shard is still flushing them
+        closing.closed.wait()
+
+    # File I/O happens outside the directory lock
+    for old in evicted:
+        try:
+            old.close()
+        except Exception:
+            logger.exception("Error closing storage shard of user %s", old.user_id)
+        finally:
+            with _user_shards_lock:
+                _closing_shards.pop(old.user_id, None)
+            old.closed.set()
+    if created:
+        try:
+            shard.migrate_inline_artifacts()
+        except Exception:
+            logger.exception("Error moving generated documents of user %s to the artifact store", user_id)
+        try:
+            shard.collect_artifacts()
+        except Exception:
+            logger.exception("Error deleting unreferenced artifacts of user %s", user_id)
+    return shard
+
+
+def user_shard(user_id):
+    with _user_shards_lock:
+        shard = _user_shards.get(user_id)
+        if shard is not None:
+            _user_shards.move_to_end(user_id)
+            return shard
+    return _open_shard(user_id, pin=False)
+
+
+def pin_shard(user_id):
+    """Open user_id's shard and keep it from being evicted until unpin_shard()."""
+    return _open_shard(user_id, pin=True)
+
+
+def unpin_shard(shard):
+    with _user_shards_lock:
+        shard.pins -= 1
+
+
+def current_user_id():
+    return _current_user.get()
+
+
+def current_shard():
+    return user_shard(_current_user.get())
+
+
+@contextlib.contextmanager
+def acting_as(user_id):
+    """Run a block (e.g. a background job) against user_id's shard."""
+    shard = pin_shard(user_id)
+    token = _current_user.set(user_id)
+    try:
+        yield shard
+    finally:
+        _current_user.reset(token)
+        unpin_shard(shard)
+
+
+@app.before_request
+def _resolve_user():
+    user_id = request.headers.get("X-User-Id") or DEFAULT_USER_ID
+    if not USER_ID_PATTERN.fullmatch(user_id):
+        return jsonify({"error": "Invalid X-User-Id header"}), 400
+    _current_user.set(user_id)
+    g.user_shard = pin_shard(user_id)
+
+
+@app.teardown_request
+def _clear_user(exc):
+    shard = g.pop("user_shard", None)
+    if shard is not None:
+        unpin_shard(shard)
+    _current_user.set(DEFAULT_USER_ID)
+
+
+def get_user_data():
+    """Return the caller's shared cached profile. Callers must not mutate it."""
+    return current_shard().profile.read()
+
+
+def profile_version():
+    return current_shard().profile.current_version()
+
+
+def load_user_data():
+    """Return a copy of the profile that the caller may modify and pass to save_user_data."""
+    return _copy_user_data(get_user_data())
+
+
+def update_user_data(fn):
+    """Apply fn(user_data) to the profile atomically and return its result.
+
+    Unlike load_user_data()/save_user_data(), concurrent updates never
+    overwrite each other.
+    """
+    return current_shard().profile.mutate(fn)
+
 
 def save_user_data(data):
+    current_shard().profile.replace(data)
+    return True
+
+
+# -------- Chat history store --------
+# Chat history is an append-only log of JSONL segments. Each saved chat is a
+# single line in the active segment, and index.jsonl maps chat id -> (segment,
+# byte offset, length) so a save never rewrites earlier chats and a single chat
+# can be read with one seek. Index entries also carry the chat's summary
+# fields (jobTitle, timestamp, messageCount) for list views. Each user shard
+# has its own ChatHistoryLog.
+def _chat_summary(record):
+    # Stored in the index so list views never have to parse message bodies
+    return {
+        "jobTitle": record.get("jobTitle", "Untitled Job"),
+        "timestamp": record.get("timestamp"),
+        "messageCount": len(record.get("messages", []))
+    }
+
+
+class ChatHistoryLog:
+    def __init__(self, directory, legacy_file=None):
+        self.directory = directory
+        self.index_file = os.path.join(directory, "index.jsonl")
+        self.legacy_file = legacy_file  # chat_history.json, migrated on first use
+        self.lock = threading.Lock()
+        self._index = OrderedDict()
+        self._state = {"loaded": False, "index_size": 0, "segment": 1}
+
+    def _segment_path(self, segment):
+        return os.path.join(self.directory, f"segment-{segment:06d}.jsonl")
+
+    def _segments(self):
+        if not os.path.exists(self.directory):
+            return []
+        segments = []
+        for fname in os.listdir(self.directory):
+            if fname.startswith("segment-") and fname.endswith(".jsonl"):
+                try:
+                    segments.append(int(fname[len("segment-"):-len(".jsonl")]))
+                except ValueError:
+                    continue
+        return sorted(segments)
+
+    @contextlib.contextmanager
+    def _file_lock(self):
+        # Serializes appends, recovery and migration with other worker
+        # processes sharing this directory. Callers hold self.lock.
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), 'ab') as f:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            yield  # closing the file releases the lock
+
+    def _append_index_entries(self, entries):
+        # Callers hold the file lock and have read the index tail, so the
+        # index ends at index_size unless a crashed writer left a torn line.
+        if not entries:
+            return
+        data = b"".join((json.dumps(entry, separators=(",", ":")) + "\n").encode("utf-8") for entry in entries)
+        with open(self.index_file, 'ab') as f:
+            if f.tell() > self._state["index_size"]:
+                f.truncate(self._state["index_size"])
+            f.write(data)
+        self._state["index_size"] += len(data)
+
+    def _read_index_tail(self):
+        # Pick up index lines appended since the last read (including by another process)
+        if not os.path.exists(self.index_file):
+            return
+        size = os.path.getsize(self.index_file)
+        if size == self._state["index_size"]:
+            return
+        if size < self._state["index_size"]:
+            self._index.clear()
+            self._state["index_size"] = 0
+        with open(self.index_file, 'rb') as f:
+            f.seek(self._state["index_size"])
+            consumed = self._state["index_size"]
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # partially written entry, pick it up next time
+                consumed += len(line)
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    continue
+                self._index[entry["id"]] = entry
+                self._state["segment"] = max(self._state["segment"], entry["segment"])
+        self._state["index_size"] = consumed
+
+    def _recover_segment(self, segment):
+        # Index records that were written to the segment but not to the index,
+        # and cut off a torn trailing line left by a crash mid-append.
+        path = self._segment_path(segment)
+        if not os.path.exists(path):
+            return
+        indexed_end = 0
+        for entry in self._index.values():
+            if entry["segment"] == segment:
+                indexed_end = max(indexed_end, entry["offset"] + entry["length"])
+        size = os.path.getsize(path)
+        if size <= indexed_end:
+            return
+
+        recovered = []
+        truncate_at = None
+        with open(path, 'rb') as f:
+            f.seek(indexed_end)
+            offset = indexed_end
+            for line in f:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete record")
+                    record = json.loads(line)
+                except ValueError:
+                    truncate_at = offset
+                    break
+                recovered.append({"id": record["id"], "segment": segment, "offset": offset, "length": len(line),
+                                  **_chat_summary(record)})
+                offset += len(line)
+
+        if truncate_at is not None:
+            logger.warning("Truncating torn chat history record in %s at byte %d", path, truncate_at)
+            with open(path, 'r+b') as f:
+                f.truncate(truncate_at)
+        if recovered:
+            logger.warning("Recovered %d unindexed chat history records from %s", len(recovered), path)
+            self._append_index_entries(recovered)
+            for entry in recovered:
+                self._index[entry["id"]] = entry
+
+    def _migrate_legacy(self):
+        if not self.legacy_file or not os.path.exists(self.legacy_file):
+            return
+        try:
+            with open(self.legacy_file, 'r') as f:
+                legacy = json.load(f)
+        except Exception as e:
+            logger.error("Error migrating legacy chat history: %s", e)
+            return
+        for chat in legacy:
+            # Skip chats already copied by an earlier, interrupted migration
+            if chat.get("id") not in self._index:
+                self._append_record_locked(chat)
+        os.replace(self.legacy_file, self.legacy_file + ".migrated")
+        logger.info("Migrated %d chats from %s to %s", len(legacy), self.legacy_file, self.directory)
+
+    def _ensure_loaded_locked(self):
+        if self._state["loaded"]:
+            self._read_index_tail()
+            return
+        if not os.path.isdir(self.directory) and not (self.legacy_file and os.path.exists(self.legacy_file)):
+            # Nothing stored yet; don't create the directory on a read
+            self._state["loaded"] = True
+            return
+        with self._file_lock():
+            self._read_index_tail()
+            segments = self._segments()
+            if segments:
+                self._state["segment"] = max(self._state["segment"], segments[-1])
+                self._recover_segment(self._state["segment"])
+            self._state["loaded"] = True
+            self._migrate_legacy()
+
+    def _append_record_locked(self, record):
+        line = (json.dumps(record, separators=(",", ":")) + "\n").encode("utf-8")
+        segment = self._state["segment"]
+        path = self._segment_path(segment)
+        if os.path.exists(path) and os.path.getsize(path) >= CHAT_SEGMENT_MAX_BYTES:
+            segment += 1
+            self._state["segment"] = segment
+            path = self._segment_path(segment)
+
+        os.makedirs(self.directory, exist_ok=True)
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line)
+            offset = os.lseek(fd, 0, os.SEEK_CUR) - len(line)
+        finally:
+            os.close(fd)
+
+        entry = {"id": record["id"], "segment": segment, "offset": offset, "length": len(line),
+                 **_chat_summary(record)}
+        self._append_index_entries([entry])
+        self._index[record["id"]] = entry
+        return entry
+
+    def count(self):
+        with self.lock:
+            self._ensure_loaded_locked()
+            return len(self._index)
+
+    def append(self, record):
+        with self.lock:
+            self._ensure_loaded_locked()
+            with self._file_lock():
+                self._read_index_tail()  # other processes may have appended or rolled the segment
+                return self._append_record_locked(record)
+
+    def read(self, chat_id):
+        with self.lock:
+            self._ensure_loaded_locked()
+            entry = self._index.get(chat_id)
+        if entry is None:
+            return None
+        with open(self._segment_path(entry["segment"]), 'rb') as f:
+            f.seek(entry["offset"])
+            return json.loads(f.read(entry["length"]))
+
+    def iter_lines(self):
+        """Return an iterator over each stored chat as a raw JSON line (bytes), oldest first."""
+        with self.lock:
+            self._ensure_loaded_locked()
+            ends = {}
+            for entry in self._index.values():
+                ends[entry["segment"]] = max(ends.get(entry["segment"], 0), entry["offset"] + entry["length"])
+        return self._stream_segments(ends)
+
+    def _stream_segments(self, ends):
+        # Only read up to the indexed end of each segment, so a record that is
+        # being appended concurrently is never streamed half-written.
+        for segment in sorted(ends):
+            remaining = ends[segment]
+            with open(self._segment_path(segment), 'rb') as f:
+                for line in f:
+                    if remaining <= 0:
+                        break
+                    remaining -= len(line)
+                    line = line.rstrip(b"\n")
+                    if line:
+                        yield line
+
+    def index_entries(self):
+        """Snapshot of the chat index entries, oldest first."""
+        with self.lock:
+            self._ensure_loaded_locked()
+            entries = list(self._index.values())
+        for entry in entries:
+            if "messageCount" not in entry:
+                # Indexed before summaries were recorded
+                entry.update(_chat_summary(self.read(entry["id"])))
+        return entries
+
+    def iter_record_lines(self, entries):
+        """Yield the raw JSON line for each index entry, seeking straight to it."""
+        handles = {}
+        try:
+            for entry in entries:
+                f = handles.get(entry["segment"])
+                if f is None:
+                    f = handles[entry["segment"]] = open(self._segment_path(entry["segment"]), 'rb')
+                f.seek(entry["offset"])
+                yield f.read(entry["length"]).rstrip(b"\n")
+        finally:
+            for f in handles.values():
+                f.close()
+
+
+def append_chat_record(record):
     try:
-        print(f"Saving user data to {os.path.abspath(USER_DATA_FILE)}")
-        with open(USER_DATA_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f"Data saved successfully. File size: {os.path.getsize(USER_DATA_FILE)} bytes")
+        with span("chat-append"):
+            current_shard().chat_history.append(record)
         return True
-    except Exception as e:
-        print(f"Error saving user data: {e}")
+    except Exception:
+        logger.exception("Error saving chat history")
         return False
 
+
+def read_chat_record(chat_id):
+    return current_shard().chat_history.read(chat_id)
+
+
+def iter_chat_history_lines():
+    return current_shard().chat_history.iter_lines()
+
+
+def chat_index_entries():
+    return current_shard().chat_history.index_entries()
+
+
+def iter_chat_record_lines(entries):
+    return current_shard().chat_history.iter_record_lines(entries)
+
+
 def load_chat_history():
-    if os.path.exists(CHAT_HISTORY_FILE):
+    return [json.loads(line) for line in iter_chat_history_lines()]
+
+
+# -------- Generated document artifacts --------
+# Generated resume and cover letter texts are stored once per user under
+# artifacts/, named by the SHA-256 of their content, and the profile's
+# "resumes" and "coverLetters" lists only hold references ({"id", "title",
+# "artifactId", "size", "createdAt"}). The profile stays small however many
+# documents are generated, and regenerating identical text stores nothing new.
+# Artifacts are immutable, so recently read ones are cached in memory.
+# Artifacts the profile no longer references are deleted when the shard is
+# opened and after a profile update that replaces the document lists. A sweep
+# spares files written or reused within ARTIFACT_GC_GRACE_SECONDS, since
+# generation stores an artifact before saving the reference to it.
+ARTIFACT_LIST_KEYS = ("resumes", "coverLetters")
+ARTIFACT_ID_PATTERN = re.compile(r"[0-9a-f]{64}")
+ARTIFACT_CACHE_ENTRIES = 16
+ARTIFACT_GC_GRACE_SECONDS = 60 * 60
+
+
+class ArtifactStore:
+    def __init__(self, directory):
+        self.directory = directory
+        self._cache_lock = threading.Lock()
+        self._cache = OrderedDict()
+
+    def _path(self, artifact_id):
+        return os.path.join(self.directory, artifact_id[:2], f"{artifact_id}.txt")
+
+    def _remember(self, artifact_id, content):
+        with self._cache_lock:
+            self._cache[artifact_id] = content
+            self._cache.move_to_end(artifact_id)
+            while len(self._cache) > ARTIFACT_CACHE_ENTRIES:
+                self._cache.popitem(last=False)
+
+    def put(self, content):
+        """Store content and return its artifact id; existing content is not rewritten."""
+        data = content.encode("utf-8")
+        artifact_id = hashlib.sha256(data).hexdigest()
+        path = self._path(artifact_id)
         try:
-            with open(CHAT_HISTORY_FILE, 'r') as f:
-                data = json.load(f)
-                print(f"Successfully loaded chat history: {len(data)} conversations")
-                return data
-        except Exception as e:
-            print(f"Error loading chat history: {e}")
-    
-    # Default empty chat history if file doesn't exist or is corrupted
-    return []
+            os.utime(path)  # reused content is new again as far as sweep() is concerned
+        except FileNotFoundError:
+            with span("artifact-write"):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+        self._remember(artifact_id, content)
+        return artifact_id
+
+    def read(self, artifact_id):
+        if not ARTIFACT_ID_PATTERN.fullmatch(artifact_id or ""):
+            return None
+        with self._cache_lock:
+            content = self._cache.get(artifact_id)
+            if content is not None:
+                self._cache.move_to_end(artifact_id)
+                return content
+        try:
+            with span("artifact-read"), open(self._path(artifact_id), 'rb') as f:
+                content = f.read().decode("utf-8")
+        except OSError:
+            return None
+        self._remember(artifact_id, content)
+        return content
+
+    def sweep(self, referenced, grace=ARTIFACT_GC_GRACE_SECONDS):
+        """Delete artifacts whose id is not in referenced and that are older than grace seconds."""
+        if not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - grace
+        removed = 0
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                # Temp files left by an interrupted put() never match an id, so they go too
+                artifact_id = entry.name[:-len(".txt")] if entry.name.endswith(".txt") else None
+                if artifact_id in referenced:
+                    continue
+                try:
+                    if entry.stat().st_mtime >= cutoff:
+                        continue
+                    os.remove(entry.path)
+                except FileNotFoundError:
+                    continue
+                removed += 1
+                with self._cache_lock:
+                    self._cache.pop(artifact_id, None)
+        return removed
+
+    def reference(self, entry):
+        """Return entry with its "content" moved into the store."""
+        if not isinstance(entry, dict) or not isinstance(entry.get("content"), str):
+            return entry
+        ref = {key: value for key, value in entry.items() if key != "content"}
+        ref["artifactId"] = self.put(entry["content"])
+        ref["size"] = len(entry["content"])
+        return ref
+
+
+def artifact_reference(entry):
+    return current_shard().artifacts.reference(entry)
+
+
+def latest_resume_content():
+    """Text of the most recently saved resume, or None."""
+    resumes = get_user_data().get("resumes")
+    if not resumes:
+        return None
+    latest = resumes[-1]
+    if "artifactId" in latest:
+        return current_shard().artifacts.read(latest["artifactId"])
+    return latest.get("content")
 
-def save_chat_history(data):
-    try:
-        print(f"Saving chat history to {os.path.abspath(CHAT_HISTORY_FILE)}")
-        with open(CHAT_HISTORY_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f"Chat history saved successfully. File size: {os.path.getsize(CHAT_HISTORY_FILE)} bytes")
-        return True
-    except Exception as e:
-        print(f"Error saving chat history: {e}")
-        return False
 
-def load_ai_conversations():
-    if os.path.exists(AI_CONVERSATIONS_FILE):
+def _conversation_summary(conversation):
+    return {
+        "jobTitle": conversation.get("jobTitle", "Untitled Job"),
+        "lastUpdated": conversation.get("lastUpdated"),
+        "messageCount": len(conversation.get("messages", []))
+    }
+
+# -------- AI conversation storage backends --------
+# Conversations are read and written through a backend chosen by
+# AI_CONVERSATION_BACKEND. Both backends expose the same methods:
+#   get(conversation_id) -> conversation dict or None
+#   upsert(conversation_id, conversation)
+#   append(conversation_id, messages, base_count, job_title, last_updated) -> new message count
+#   list_summaries(sort, page) -> (total, [summary dicts with "id"])
+class ConversationConflict(Exception):
+    """Raised by append() when the client's base message count is stale."""
+
+    def __init__(self, message_count):
+        super().__init__(f"Conversation has {message_count} messages")
+        self.message_count = message_count
+
+
+class JsonConversationStore:
+    """The original single-file store, kept for deployments that opt out of SQLite.
+
+    Summaries are kept in memory and rebuilt only when the file store's
+    version moves without going through upsert (e.g. an external edit).
+    """
+
+    def __init__(self, path):
+        self.file_store = WriteBehindJsonFile(path, dict)
+        self._lock = threading.Lock()
+        self._summaries = None
+        self._version = None
+
+    def get(self, conversation_id):
+        return self.file_store.read().get(conversation_id)
+
+    def close(self):
+        self.file_store.close()
+
+    def upsert(self, conversation_id, conversation):
+        with self._lock:
+            self._summaries_locked()
+            self.file_store.mutate(lambda conversations: conversations.__setitem__(conversation_id, conversation))
+            self._summaries[conversation_id] = _conversation_summary(conversation)
+            self._version = self.file_store.current_version()
+
+    def append(self, conversation_id, messages, base_count, job_title, last_updated):
+        def apply(conversations):
+            existing = conversations.get(conversation_id, {"jobTitle": job_title or "Untitled Job", "messages": []})
+            if len(existing.get("messages", [])) != base_count:
+                raise ConversationConflict(len(existing.get("messages", [])))
+            conversations[conversation_id] = {
+                "jobTitle": job_title or existing.get("jobTitle", "Untitled Job"),
+                "lastUpdated": last_updated,
+                "messages": existing.get("messages", []) + messages
+            }
+            return conversations[conversation_id]
+
+        with self._lock:
+            self._summaries_locked()
+            conversation = self.file_store.mutate(apply)
+            self._summaries[conversation_id] = _conversation_summary(conversation)
+            self._version = self.file_store.current_version()
+        return len(conversation["messages"])
+
+    def _summaries_locked(self):
+        version = self.file_store.current_version()
+        if self._summaries is None or version != self._version:
+            self._summaries = {
+                conv_id: _conversation_summary(conversation)
+                for conv_id, conversation in self.file_store.read().items()
+            }
+            self._version = version
+        return self._summaries
+
+    def list_summaries(self, sort, page):
+        with self._lock:
+            summaries = [{"id": conv_id, **summary} for conv_id, summary in self._summaries_locked().items()]
+        if sort == 'lastUpdated':
+            summaries.sort(key=lambda conv: conv["lastUpdated"] or "")
+        return len(summaries), paginate(summaries, page)
+
+
+class SqliteConversationStore:
+    """Conversations in SQLite (WAL mode): one row per conversation, one per message.
+
+    Reads and upserts touch only the rows of a single conversation, and the
+    summary columns let list views skip message bodies entirely.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS conversations (
+            id TEXT PRIMARY KEY,
+            job_title TEXT NOT NULL,
+            last_updated TEXT,
+            message_count INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE INDEX IF NOT EXISTS conversations_last_updated ON conversations (last_updated);
+        CREATE TABLE IF NOT EXISTS messages (
+            conversation_id TEXT NOT NULL,
+            position INTEGER NOT NULL,
+            body TEXT NOT NULL,
+            PRIMARY KEY (conversation_id, position)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connections_lock = threading.Lock()
+        self._connections = {}  # thread ident -> (weakref to the thread, connection)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        # Each thread uses its own connection, tracked by thread so close() can
+        # reach it. The dev server runs every request on a new thread, so
+        # opening a connection also closes those of threads that have exited.
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            thread = threading.current_thread()
+            with self._connections_lock:
+                exited = [ident for ident, (ref, _) in self._connections.items()
+                          if ref() is None or not ref().is_alive()]
+                stale = [self._connections.pop(ident)[1] for ident in exited]
+                self._connections[thread.ident] = (weakref.ref(thread), conn)
+            for old in stale:
+                old.close()
+        return conn
+
+    def close(self):
+        with self._connections_lock:
+            connections, self._connections = self._connections, {}
+        for _, conn in connections.values():
+            conn.close()
+
+    def get(self, conversation_id):
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT job_title, last_updated FROM conversations WHERE id = ?", (conversation_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        bodies = conn.execute(
+            "SELECT body FROM messages WHERE conversation_id = ? ORDER BY position", (conversation_id,)
+        ).fetchall()
+        return {
+            "jobTitle": row[0],
+            "lastUpdated": row[1],
+            "messages": [json.loads(body) for (body,) in bodies]
+        }
+
+    def _upsert(self, conn, conversation_id, conversation):
+        messages = conversation.get("messages", [])
+        conn.execute(
+            """INSERT INTO conversations (id, job_title, last_updated, message_count) VALUES (?, ?, ?, ?)
+               ON CONFLICT (id) DO UPDATE SET job_title = excluded.job_title,
+                   last_updated = excluded.last_updated, message_count = excluded.message_count""",
+            (conversation_id, conversation.get("jobTitle", "Untitled Job"),
+             conversation.get("lastUpdated"), len(messages))
+        )
+        conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+        conn.executemany(
+            "INSERT INTO messages (conversation_id, position, body) VALUES (?, ?, ?)",
+            [(conversation_id, position, json.dumps(message)) for position, message in enumerate(messages)]
+        )
+
+    def upsert(self, conversation_id, conversation):
+        with self._connect() as conn:
+            self._upsert(conn, conversation_id, conversation)
+
+    def append(self, conversation_id, messages, base_count, job_title, last_updated):
+        """Insert only the new message rows; O(len(messages)) regardless of history length."""
+        conn = self._connect()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT message_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            current = row[0] if row else 0
+            if current != base_count:
+                raise ConversationConflict(current)
+            if row is None:
+                conn.execute(
+                    "INSERT INTO conversations (id, job_title, last_updated, message_count) VALUES (?, ?, ?, 0)",
+                    (conversation_id, job_title or "Untitled Job", last_updated)
+                )
+            conn.executemany(
+                "INSERT INTO messages (conversation_id, position, body) VALUES (?, ?, ?)",
+                [(conversation_id, current + offset, json.dumps(message)) for offset, message in enumerate(messages)]
+            )
+            conn.execute(
+                """UPDATE conversations SET message_count = ?, last_updated = ?,
+                       job_title = COALESCE(?, job_title) WHERE id = ?""",
+                (current + len(messages), last_updated, job_title, conversation_id)
+            )
+        return current + len(messages)
+
+    def list_summaries(self, sort, page):
+        conn = self._connect()
+        total = conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+        # rowid preserves first-insertion order, like the JSON dict did
+        column = "COALESCE(last_updated, '')" if sort == 'lastUpdated' else "rowid"
+        direction = "DESC" if page["order"] == 'desc' else "ASC"
+        limit = -1 if page["limit"] is None else page["limit"]
+        rows = conn.execute(
+            f"SELECT id, job_title, last_updated, message_count FROM conversations "
+            f"ORDER BY {column} {direction} LIMIT ? OFFSET ?",
+            (limit, page["offset"])
+        ).fetchall()
+        summaries = [
+            {"id": row[0], "jobTitle": row[1], "lastUpdated": row[2], "messageCount": row[3]}
+            for row in rows
+        ]
+        return total, summaries
+
+    def migrate_from_json(self, json_path):
+        """One-shot import of ai_conversations.json; the file is renamed afterwards."""
+        if not os.path.exists(json_path):
+            return 0
+        with open(json_path, 'r') as f:
+            conversations = json.load(f)
+        with self._connect() as conn:
+            for conversation_id, conversation in conversations.items():
+                self._upsert(conn, conversation_id, conversation)
         try:
-            with open(AI_CONVERSATIONS_FILE, 'r') as f:
-                data = json.load(f)
-                print(f"Successfully loaded AI conversations: {len(data)} conversations")
-                return data
-        except Exception as e:
-            print(f"Error loading AI conversations: {e}")
-    
-    # Default empty conversations if file doesn't exist or is corrupted
-    return {}
+            os.replace(json_path, json_path + ".migrated")
+        except FileNotFoundError:
+            pass  # another process finished the same migration first
+        logger.info("Migrated %d AI conversations from %s to %s", len(conversations), json_path, self.path)
+        return len(conversations)
+
 
-def save_ai_conversations(data):
+def conversation_store():
+    """The caller's conversation store."""
+    return current_shard().conversations()
+
+
+# -------- List endpoint pagination --------
+LIST_MAX_LIMIT = 500
+
+
+def parse_list_args(summary_fields):
+    """Parse the limit/offset/order/fields query arguments of a list endpoint.
+
+    Raises ValueError for invalid values. ``fields`` is None when every
+    field was requested.
+    """
+    args = request.args
     try:
-        print(f"Saving AI conversations to {os.path.abspath(AI_CONVERSATIONS_FILE)}")
-        with open(AI_CONVERSATIONS_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f"AI conversations saved successfully. File size: {os.path.getsize(AI_CONVERSATIONS_FILE)} bytes")
-        return True
-    except Exception as e:
-        print(f"Error saving AI conversations: {e}")
-        return False
+        offset = int(args.get('offset', 0))
+        limit = int(args['limit']) if 'limit' in args else None
+    except ValueError:
+        raise ValueError("'limit' and 'offset' must be integers")
+    if offset < 0 or (limit is not None and not 0 <= limit <= LIST_MAX_LIMIT):
+        raise ValueError(f"'offset' must be >= 0 and 'limit' between 0 and {LIST_MAX_LIMIT}")
+
+    order = args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        raise ValueError("'order' must be 'asc' or 'desc'")
+
+    fields = None
+    if args.get('fields'):
+        fields = [field.strip() for field in args['fields'].split(',') if field.strip()]
+        unknown = [field for field in fields if field not in summary_fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+    return {"offset": offset, "limit": limit, "order": order, "fields": fields,
+            "paged": any(key in args for key in ('offset', 'limit', 'order', 'fields', 'sort'))}
+
+
+def paginate(items, page):
+    if page["order"] == 'desc':
+        items = items[::-1]
+    end = None if page["limit"] is None else page["offset"] + page["limit"]
+    return items[page["offset"]:end]
+
+
+def pagination_headers(total, page, returned):
+    headers = {"X-Total-Count": str(total)}
+    next_offset = page["offset"] + returned
+    if returned and next_offset < total:
+        headers["X-Next-Offset"] = str(next_offset)
+    return headers
+
 
 @app.route('/api/resume/upload', methods=['POST'])
 def upload_resume():
@@ -151,11 +1767,21 @@ def upload_resume():
             # Extract file extension (e.g., pdf, docx)
             ext = os.path.splitext(file.filename)[1].lower()
             filename = f"res{ext}"
-            file_path = os.path.join(RESUMES_DIR, filename)
+            shard = current_shard()
+            os.makedirs(shard.resumes_dir, exist_ok=True)
+            file_path = os.path.join(shard.resumes_dir, filename)
 
             # Save/overwrite the file
             file.save(file_path)
-            print(f"Resume saved successfully as: {file_path}")
+            logger.info("Resume saved as %s", file_path)
+
+            # Parse the extra sections once now rather than on every render
+            if ext == ".docx":
+                try:
+                    with shard.resume_sections_lock:
+                        store_resume_sections(file_path, uploaded_resume_digest())
+                except Exception:
+                    logger.exception("Error parsing uploaded resume sections")
 
             return jsonify({
                 "message": "Resume uploaded and saved as 'res' successfully",
@@ -163,8 +1789,8 @@ def upload_resume():
                 "path": os.path.join("resumes", filename)
             })
 
-    except Exception as e:
-        print(f"Error uploading resume: {e}")
+    except Exception:
+        logger.exception("Error uploading resume")
         return jsonify({"error": "Resume upload failed"}), 500
 
 @app.route('/api/chat/save', methods=['POST'])
@@ -174,9 +1800,6 @@ def save_chat():
         chat_data = data.get('chatMessages', [])
         job_title = data.get('jobTitle', 'Untitled Job')
         
-        # Load existing chat history
-        chat_history = load_chat_history()
-        
         # Create new chat entry with metadata
         new_chat = {
             "id": str(uuid.uuid4()),
@@ -185,14 +1808,11 @@ def save_chat():
             "messages": chat_data
         }
         
-        # Add to chat history
-        chat_history.append(new_chat)
-        
-        # Save updated chat history
-        success = save_chat_history(chat_history)
+        # Append to the chat history log
+        success = append_chat_record(new_chat)
         
         if success:
-            print(f"Chat history saved successfully for job: {job_title}")
+            logger.debug("Chat history saved for job: %s", job_title)
             return jsonify({
                 "message": "Chat history saved successfully",
                 "chatId": new_chat["id"]
@@ -201,18 +1821,202 @@ def save_chat():
             return jsonify({"error": "Failed to save chat history"}), 500
             
     except Exception as e:
-        print(f"Error saving chat history: {e}")
+        logger.exception("Error saving chat history")
         return jsonify({"error": str(e)}), 500
 
+CHAT_SUMMARY_FIELDS = ("id", "jobTitle", "timestamp", "messageCount")
+
+
 @app.route('/api/chat/history', methods=['GET'])
 def get_chat_history():
+    """List saved chats, oldest first.
+
+    Without query arguments the full history is streamed straight from the
+    log segments. ``sort=timestamp``, ``order`` and ``limit``/``offset`` page
+    through it using the index, and ``fields`` (any of id, jobTitle,
+    timestamp, messageCount, messages) selects what each item contains;
+    summary fields are served from the index alone.
+    """
+    try:
+        try:
+            page = parse_list_args(CHAT_SUMMARY_FIELDS + ("messages",))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        sort = request.args.get('sort')
+        if sort not in (None, 'timestamp'):
+            return jsonify({"error": "'sort' must be 'timestamp'"}), 400
+
+        if not page["paged"]:
+            lines = iter_chat_history_lines()
+        else:
+            entries = chat_index_entries()
+            if sort == 'timestamp':
+                entries.sort(key=lambda entry: entry.get("timestamp") or "")
+            selected = paginate(entries, page)
+            headers = pagination_headers(len(entries), page, len(selected))
+            fields = page["fields"]
+            if fields is not None and "messages" not in fields:
+                summaries = [{field: entry[field] for field in fields} for entry in selected]
+                return jsonify(summaries), 200, headers
+            lines = iter_chat_record_lines(selected)
+            if fields is not None:
+                # Parse the records only to project them
+                lines = (
+                    json.dumps({field: json.loads(line).get("messages", []) if field == "messages" else entry[field]
+                                for field in fields}).encode("utf-8")
+                    for entry, line in zip(selected, lines)
+                )
+
+        # Stream the stored records as a JSON array without parsing them
+        def generate():
+            yield b"["
+            for i, line in enumerate(lines):
+                yield line if i == 0 else b"," + line
+            yield b"]"
+
+        response = Response(stream_with_context(generate()), mimetype='application/json')
+        if page["paged"]:
+            response.headers.update(headers)
+        return response
+    except Exception as e:
+        logger.exception("Error retrieving chat history")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/chat/history/<chat_id>', methods=['GET'])
+def get_chat(chat_id):
     try:
-        chat_history = load_chat_history()
-        return jsonify(chat_history)
+        chat = read_chat_record(chat_id)
+        if chat is None:
+            return jsonify({"error": "Chat not found"}), 404
+        return jsonify(chat)
     except Exception as e:
-        print(f"Error retrieving chat history: {e}")
+        logger.exception("Error retrieving chat %s", chat_id)
         return jsonify({"error": str(e)}), 500
 
+# -------- Chat context window --------
+# chat_respond keeps the prompt within CHAT_CONTEXT_TOKEN_BUDGET: the most
+# recent turns are sent verbatim and older turns are folded into a rolling
+# summary. Summaries are cached under a hash chain of the folded prefix, and
+# when the window has to slide it folds enough turns to drop back to
+# CHAT_CONTEXT_REFILL_RATIO of the budget, so a new summary is only requested
+# every few turns and builds on the previous one.
+CHAT_CONTEXT_TOKEN_BUDGET = 3000
+CHAT_CONTEXT_REFILL_RATIO = 0.5
+CHAT_SUMMARY_MAX_TOKENS = 400
+CHAT_SUMMARY_CACHE_ENTRIES = 512
+CHAT_MESSAGE_OVERHEAD_TOKENS = 4
+CHAT_SUMMARY_SYSTEM_PROMPT = (
+    "You summarize conversations between a job seeker and a resume assistant. "
+    "Keep every fact, requested change and decision that later turns may rely on. Be concise."
+)
+
+_chat_summary_lock = threading.Lock()
+_chat_summary_cache = OrderedDict()
+_token_encoding = {"loaded": False, "encoding": None}
+
+
+def count_tokens(text):
+    """Count tokens with tiktoken when it is installed, else estimate ~4 characters per token."""
+    if not _token_encoding["loaded"]:
+        try:
+            import tiktoken
+            _token_encoding["encoding"] = tiktoken.get_encoding("o200k_base")
+        except Exception:
+            _token_encoding["encoding"] = None
+        _token_encoding["loaded"] = True
+    if _token_encoding["encoding"] is not None:
+        return len(_token_encoding["encoding"].encode(text))
+    return (len(text) + 3) // 4
+
+
+def _message_tokens(message):
+    return count_tokens(message["content"]) + CHAT_MESSAGE_OVERHEAD_TOKENS
+
+
+def _summarize_turns(previous_summary, messages):
+    transcript = "\n".join(f"{message['role']}: {message['content']}" for message in messages)
+    prompt = (
+        (f"Summary so far:\n{previous_summary}\n\n" if previous_summary else "")
+        + f"New turns:\n{transcript}\n\n"
+        + f"Write an updated summary of the whole conversation in at most {CHAT_SUMMARY_MAX_TOKENS} tokens."
+    )
+    return complete_chat(CHAT_SUMMARY_SYSTEM_PROMPT, prompt)
+
+
+def build_chat_context(system_prompt, messages):
+    """Return (messages to send, stats) for a conversation.
+
+    stats reports the prompt tokens before and after windowing, how many
+    were saved, and how many leading turns are covered by the summary.
+    """
+    tokens = [_message_tokens(message) for message in messages]
+    system_tokens = count_tokens(system_prompt) + CHAT_MESSAGE_OVERHEAD_TOKENS
+    original = system_tokens + sum(tokens)
+    stats = {"originalTokens": original, "promptTokens": original, "tokensSaved": 0, "summarizedMessages": 0}
+    if original <= CHAT_CONTEXT_TOKEN_BUDGET:
+        return [{"role": "system", "content": system_prompt}, *messages], stats
+
+    # suffix[k] = tokens of messages[k:]; prefix_hashes[k] identifies messages[:k]
+    suffix = [0] * (len(messages) + 1)
+    for k in range(len(messages) - 1, -1, -1):
+        suffix[k] = suffix[k + 1] + tokens[k]
+    prefix_hashes = [b""]
+    for message in messages:
+        prefix_hashes.append(hashlib.sha256(
+            prefix_hashes[-1] + json.dumps([message["role"], message["content"]]).encode("utf-8")
+        ).digest())
+
+    window = CHAT_CONTEXT_TOKEN_BUDGET - system_tokens - CHAT_SUMMARY_MAX_TOKENS - CHAT_MESSAGE_OVERHEAD_TOKENS
+    last = len(messages) - 1  # the newest message is always sent verbatim
+
+    with _chat_summary_lock:
+        cached = [k for k in range(last, 0, -1) if prefix_hashes[k] in _chat_summary_cache]
+    fold, summary = 0, None
+    if cached and suffix[cached[0]] <= window:
+        fold = cached[0]
+        with _chat_summary_lock:
+            summary = _chat_summary_cache.get(prefix_hashes[fold])
+            _chat_summary_cache.move_to_end(prefix_hashes[fold])
+    else:
+        # Slide the window: fold until the recent turns fill only part of it
+        fold = next(
+            (k for k in range(1, last + 1) if suffix[k] <= window * CHAT_CONTEXT_REFILL_RATIO), last
+        )
+        base = next((k for k in cached if k < fold), 0)
+        with _chat_summary_lock:
+            previous = _chat_summary_cache.get(prefix_hashes[base]) if base else None
+        try:
+            summary = _summarize_turns(previous, messages[base:fold])
+            with _chat_summary_lock:
+                _chat_summary_cache[prefix_hashes[fold]] = summary
+                while len(_chat_summary_cache) > CHAT_SUMMARY_CACHE_ENTRIES:
+                    _chat_summary_cache.popitem(last=False)
+        except Exception as e:
+            # Fall back to dropping the older turns rather than failing the reply
+            logger.warning("Error summarizing chat history: %s", e)
+            summary = previous
+            if not summary:
+                fold = base if suffix[base] <= window else fold
+
+    context = [{"role": "system", "content": system_prompt}]
+    prompt_tokens = system_tokens + suffix[fold]
+    if summary:
+        context.append({"role": "system", "content": f"Summary of the earlier conversation:\n{summary}"})
+        prompt_tokens += count_tokens(summary) + CHAT_MESSAGE_OVERHEAD_TOKENS
+    context.extend(messages[fold:])
+    stats.update(promptTokens=prompt_tokens, tokensSaved=max(0, original - prompt_tokens), summarizedMessages=fold)
+    return context, stats
+
+
+CHAT_SYSTEM_PROMPT = "Your name is ResumeCraft AI Agent, and you are a helpful assistant who improves job application documents."
+
+
+def _sse_event(payload, event=None):
+    lines = [f"event: {event}"] if event else []
+    lines.append(f"data: {json.dumps(payload)}")
+    return "\n".join(lines) + "\n\n"
+
+
 @app.route('/api/chat/respond', methods=['POST'])
 def chat_respond():
     try:
@@ -228,19 +2032,12 @@ def chat_respond():
         if not formatted_messages:
             return jsonify({"error": "No messages provided"}), 400
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "Your name is ResumeCraft AI Agent, and you are a helpful assistant who improves job application documents."},
-                *formatted_messages
-            ]
-        )
-
-        reply = response.choices[0].message.content.strip()
-        return jsonify({"reply": reply})
+        context, context_stats = build_chat_context(CHAT_SYSTEM_PROMPT, formatted_messages)
+        reply = llm.complete(context)
+        return jsonify({"reply": reply, "context": context_stats})
 
     except Exception as e:
-        print(f"Error generating chat reply: {e}")
+        logger.error("Error generating chat reply: %s", e)
         return jsonify({"error": str(e)}), 500
 
         # Simple logic to infer target based on the last user message
@@ -258,9 +2055,58 @@ def chat_respond():
         })
 
     except Exception as e:
-        print(f"Error generating chat reply: {e}")
+        logger.error("Error generating chat reply: %s", e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/chat/respond/stream', methods=['POST'])
+def chat_respond_stream():
+    """Streaming variant of /api/chat/respond using server-sent events.
+
+    Each token is sent as a ``data: {"delta": ...}`` event as soon as the
+    model produces it, followed by a final ``done`` event carrying the full
+    reply and context stats (or an ``error`` event if generation fails
+    mid-stream).
+    """
+    try:
+        data = request.json
+        messages = data.get("messages", [])
+
+        formatted_messages = [
+            {"role": msg["role"], "content": msg["content"]}
+            for msg in messages
+        ]
+
+        if not formatted_messages:
+            return jsonify({"error": "No messages provided"}), 400
+
+        context, context_stats = build_chat_context(CHAT_SYSTEM_PROMPT, formatted_messages)
+        deltas = llm.stream(context)
+    except Exception as e:
+        logger.error("Error starting chat reply stream: %s", e)
         return jsonify({"error": str(e)}), 500
 
+    def generate():
+        parts = []
+        try:
+            for delta in deltas:
+                parts.append(delta)
+                yield _sse_event({"delta": delta})
+            yield _sse_event({"reply": "".join(parts).strip(), "context": context_stats}, event="done")
+        except Exception as e:
+            logger.error("Error streaming chat reply: %s", e)
+            yield _sse_event({"error": str(e)}, event="error")
+        finally:
+            deltas.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    # Frees the LLM slot even if the client goes away before the first token
+    response.call_on_close(deltas.close)
+    return response
+
 @app.route('/api/ai-conversation/save', methods=['POST'])
 def save_ai_conversation():
     try:
@@ -272,80 +2118,520 @@ def save_ai_conversation():
         if not conversation_id:
             conversation_id = str(uuid.uuid4())
         
-        # Load existing AI conversations
-        conversations = load_ai_conversations()
-        
         # Create or update conversation
-        conversations[conversation_id] = {
+        conversation_store().upsert(conversation_id, {
             "jobTitle": job_title,
             "lastUpdated": datetime.now().isoformat(),
             "messages": messages
-        }
-        
-        # Save updated conversations
-        success = save_ai_conversations(conversations)
-        
-        if success:
-            print(f"AI conversation saved successfully for ID: {conversation_id}")
-            return jsonify({
-                "message": "Conversation saved successfully",
-                "conversationId": conversation_id
-            })
-        else:
-            return jsonify({"error": "Failed to save conversation"}), 500
+        })
+
+        logger.debug("AI conversation saved: %s", conversation_id)
+        return jsonify({
+            "message": "Conversation saved successfully",
+            "conversationId": conversation_id
+        })
             
     except Exception as e:
-        print(f"Error saving AI conversation: {e}")
+        logger.exception("Error saving AI conversation")
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/ai-conversation/<conversation_id>/append', methods=['POST'])
+def append_ai_conversation(conversation_id):
+    """Append new messages to a conversation without resending its history.
+
+    The body carries only the new ``messages`` plus ``baseCount``, the
+    number of messages the client last saw. If the stored conversation has
+    a different count the append is rejected with 409 and the current
+    ``messageCount`` so the client can resync.
+    """
+    try:
+        data = request.json or {}
+        messages = data.get('messages', [])
+        base_count = data.get('baseCount')
+        if not isinstance(messages, list):
+            return jsonify({"error": "'messages' must be a list"}), 400
+        # bool is an int subclass, so true/false would otherwise pass as 1/0
+        if isinstance(base_count, bool) or not isinstance(base_count, int) or base_count < 0:
+            return jsonify({"error": "'baseCount' must be a non-negative integer"}), 400
+
+        try:
+            message_count = conversation_store().append(
+                conversation_id, messages, base_count, data.get('jobTitle'), datetime.now().isoformat()
+            )
+        except ConversationConflict as e:
+            return jsonify({
+                "error": "Conversation has changed since baseCount",
+                "conversationId": conversation_id,
+                "messageCount": e.message_count
+            }), 409
+
+        return jsonify({
+            "message": "Conversation updated successfully",
+            "conversationId": conversation_id,
+            "messageCount": message_count
+        })
+    except Exception as e:
+        logger.exception("Error appending to AI conversation")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/ai-conversation/<conversation_id>', methods=['GET'])
 def get_ai_conversation(conversation_id):
     try:
-        conversations = load_ai_conversations()
+        # A user who never wrote anything has no conversation store to open
+        conversation = conversation_store().get(conversation_id) if current_shard().exists() else None
         
-        if conversation_id in conversations:
-            return jsonify(conversations[conversation_id])
+        if conversation is not None:
+            return jsonify(conversation)
         else:
             return jsonify({"error": "Conversation not found"}), 404
     except Exception as e:
-        print(f"Error retrieving AI conversation: {e}")
+        logger.exception("Error retrieving AI conversation")
         return jsonify({"error": str(e)}), 500
 
+AI_CONVERSATION_SUMMARY_FIELDS = ("id", "jobTitle", "lastUpdated", "messageCount")
+
+
 @app.route('/api/ai-conversation/list', methods=['GET'])
 def list_ai_conversations():
+    """List conversation summaries without loading any messages.
+
+    Supports ``sort=lastUpdated``, ``order``, ``limit``/``offset`` and a
+    ``fields`` projection; the total is returned in ``X-Total-Count``.
+    """
     try:
-        conversations = load_ai_conversations()
-        
-        # Create a simplified list with just IDs, titles, and timestamps
-        conversation_list = [
-            {
-                "id": conv_id,
-                "jobTitle": data.get("jobTitle", "Untitled Job"),
-                "lastUpdated": data.get("lastUpdated"),
-                "messageCount": len(data.get("messages", [])) if "messages" in data else 0
-            }
-            for conv_id, data in conversations.items()
-        ]
-        
-        return jsonify(conversation_list)
+        try:
+            page = parse_list_args(AI_CONVERSATION_SUMMARY_FIELDS)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        sort = request.args.get('sort')
+        if sort not in (None, 'lastUpdated'):
+            return jsonify({"error": "'sort' must be 'lastUpdated'"}), 400
+
+        if current_shard().exists():
+            total, selected = conversation_store().list_summaries(sort, page)
+        else:
+            total, selected = 0, []
+        if page["fields"] is not None:
+            selected = [{field: conv[field] for field in page["fields"]} for conv in selected]
+
+        if not page["paged"]:
+            return jsonify(selected)
+        return jsonify(selected), 200, pagination_headers(total, page, len(selected))
     except Exception as e:
-        print(f"Error listing AI conversations: {e}")
+        logger.exception("Error listing AI conversations")
         return jsonify({"error": str(e)}), 500
 
-@app.route('/api/resume/generate', methods=['POST'])
-def generate_resume():
-    data = request.json
-    job_title = data.get('jobTitle', '')
-    job_description = data.get('jobDescription', '')
-
+# -------- Resume / cover letter generation --------
+RESUME_SYSTEM_PROMPT = "You are an expert resume writer skilled in ATS optimization."
+COVER_LETTER_SYSTEM_PROMPT = "You are a skilled business communicator who writes concise, effective cover letters."
+
+
+def complete_chat(system_prompt, user_prompt, model=LLM_MODEL):
+    return llm.complete([
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": user_prompt}
+    ], model=model)
+
+
+# -------- LLM response cache --------
+# Completions for generation prompts are cached under a SHA-256 of (model,
+# system prompt, user prompt): a small in-memory LRU in front of one JSON file
+# per entry on disk. Entries expire after LLM_CACHE_TTL_SECONDS, and the disk
+# tier evicts least-recently-used files once it exceeds LLM_CACHE_MAX_DISK_BYTES.
+# _llm_cache_lock only guards the memory LRU, the stats and the byte counter;
+# file reads, writes and eviction scans run outside it. Files are replaced
+# atomically, so concurrent readers see either the old or the new entry.
+_llm_cache_lock = threading.Lock()
+_llm_memory_cache = OrderedDict()
+_llm_disk_state = {"bytes": None, "evicting": False}
+llm_cache_stats = {"memoryHits": 0, "diskHits": 0, "misses": 0, "bypassed": 0, "evictions": 0}
+
+
+def llm_cache_key(model, system_prompt, user_prompt):
+    payload = json.dumps([model, system_prompt, user_prompt], ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _llm_cache_path(key):
+    return os.path.join(LLM_CACHE_DIR, f"{key}.json")
+
+
+def _scan_llm_disk_cache():
+    """(mtime, size, path) of every cache file."""
+    entries = []
+    if os.path.exists(LLM_CACHE_DIR):
+        for entry in os.scandir(LLM_CACHE_DIR):
+            if entry.name.endswith(".json"):
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, entry.path))
+    return entries
+
+
+def _llm_disk_bytes():
+    with _llm_cache_lock:
+        if _llm_disk_state["bytes"] is not None:
+            return _llm_disk_state["bytes"]
+    total = sum(size for _, size, _ in _scan_llm_disk_cache())
+    with _llm_cache_lock:
+        if _llm_disk_state["bytes"] is None:
+            _llm_disk_state["bytes"] = total
+        return _llm_disk_state["bytes"]
+
+
+def _adjust_llm_disk_bytes(delta):
+    _llm_disk_bytes()
+    with _llm_cache_lock:
+        _llm_disk_state["bytes"] = max(0, _llm_disk_state["bytes"] + delta)
+        return _llm_disk_state["bytes"]
+
+
+def _evict_llm_disk_cache():
+    # One eviction pass at a time; other writers just update the counter
+    with _llm_cache_lock:
+        if _llm_disk_state["evicting"]:
+            return
+        _llm_disk_state["evicting"] = True
+    try:
+        entries = sorted(_scan_llm_disk_cache())
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, path in entries:
+            if total <= LLM_CACHE_MAX_DISK_BYTES:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            evicted += 1
+    finally:
+        with _llm_cache_lock:
+            _llm_disk_state["evicting"] = False
+    with _llm_cache_lock:
+        _llm_disk_state["bytes"] = total
+        llm_cache_stats["evictions"] += evicted
+
+
+def _remember_llm_response_locked(key, created, text):
+    _llm_memory_cache[key] = (created, text)
+    _llm_memory_cache.move_to_end(key)
+    while len(_llm_memory_cache) > LLM_CACHE_MEMORY_ENTRIES:
+        _llm_memory_cache.popitem(last=False)
+
+
+def _llm_cache_get(key):
+    now = time.time()
+    with _llm_cache_lock:
+        cached = _llm_memory_cache.get(key)
+        if cached is not None:
+            if now - cached[0] < LLM_CACHE_TTL_SECONDS:
+                _llm_memory_cache.move_to_end(key)
+                llm_cache_stats["memoryHits"] += 1
+                return cached[1]
+            del _llm_memory_cache[key]
+
+    path = _llm_cache_path(key)
     try:
-        user_data = load_user_data()
-        education = user_data.get("education", [])
-        work_experience = user_data.get("workExperiences", [])
-        skills = user_data.get("skills", [])
+        with open(path, 'r') as f:
+            entry = json.load(f)
+        created, text = entry["created"], entry["response"]
+        usable = isinstance(text, str) and now - created < LLM_CACHE_TTL_SECONDS
+    except FileNotFoundError:
+        usable = None
+    except (OSError, ValueError, KeyError, TypeError):
+        usable = False  # truncated or malformed entry
+    if usable:
+        try:
+            os.utime(path)  # mark as recently used for disk eviction
+        except OSError:
+            pass
+        with _llm_cache_lock:
+            _remember_llm_response_locked(key, created, text)
+            llm_cache_stats["diskHits"] += 1
+        return text
+    if usable is False:
+        # Expired or unreadable: remove it so it is not read again
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            _adjust_llm_disk_bytes(-size)
+        except OSError:
+            pass
+
+    with _llm_cache_lock:
+        llm_cache_stats["misses"] += 1
+    return None
+
+
+def _llm_cache_put(key, model, text):
+    created = time.time()
+    body = json.dumps({"created": created, "model": model, "response": text})
+    with _llm_cache_lock:
+        _remember_llm_response_locked(key, created, text)
+    try:
+        os.makedirs(LLM_CACHE_DIR, exist_ok=True)
+        path = _llm_cache_path(key)
+        try:
+            previous = os.path.getsize(path)
+        except FileNotFoundError:
+            previous = 0
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(body)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning("Error writing LLM cache entry: %s", e)
+        return
+    if _adjust_llm_disk_bytes(len(body.encode("utf-8")) - previous) > LLM_CACHE_MAX_DISK_BYTES:
+        _evict_llm_disk_cache()
+
+
+def cached_complete_chat(system_prompt, user_prompt, model=LLM_MODEL, bypass=False):
+    """complete_chat() with the response cache in front of it.
+
+    With ``bypass`` the cache is not consulted (e.g. the user asked to
+    regenerate) but the fresh response still replaces the cached one.
+    """
+    key = llm_cache_key(model, system_prompt, user_prompt)
+    if bypass:
+        with _llm_cache_lock:
+            llm_cache_stats["bypassed"] += 1
+    else:
+        with span("llm-cache-lookup"):
+            text = _llm_cache_get(key)
+        if text is not None:
+            return text
+
+    text = complete_chat(system_prompt, user_prompt, model=model)
+    _llm_cache_put(key, model, text)
+    return text
+
+
+# -------- Relevance scoring --------
+# Before the resume prompt is built, experience bullets are ranked against the
+# job description with BM25 and only the best ones are sent: at most
+# RESUME_PROMPT_MAX_BULLETS, within RESUME_PROMPT_BULLET_TOKENS, and always at
+# least one per role because the model must keep every role. Profiles that
+# already fit are sent unchanged, so their prompts (and LLM cache keys) stay
+# the same. The BM25 index (vocabulary, idf and per-posting weights) is built
+# once per version of the profile's work experience. Scoring uses NumPy when it is installed and a
+# plain dict otherwise; both give the same scores. The same index backs the
+# keyword coverage report, which needs no model call.
+RESUME_PROMPT_MAX_BULLETS = 40
+RESUME_PROMPT_BULLET_TOKENS = 1500
+RELEVANCE_INDEX_CACHE_ENTRIES = 64
+KEYWORD_REPORT_MAX_TERMS = 25
+BM25_K1 = 1.2
+BM25_B = 0.75
+_TERM_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*(?:[.\-][a-z0-9+#]+)*")
+_STOPWORDS = frozenset("""
+a about above after all also an and any are as at be been being both but by can could did do does during each
+either etc for from had has have having he her here his how i if in into is it its just may more most must
+of on one or other our out over own per so some such than that the their them then there these they this
+those through to too under up us use used using very via was we well were what when where which while who
+will with within without would you your able across ability experience work working strong role team teams
+including new year years plus preferred required requirements responsibilities candidate ideal looking join
+""".split())
+
+_relevance_lock = threading.Lock()
+_relevance_indexes = OrderedDict()
+_numpy = {"loaded": False, "module": None}
+
+
+def _load_numpy():
+    if not _numpy["loaded"]:
+        try:
+            import numpy
+            _numpy["module"] = numpy
+        except ImportError:
+            _numpy["module"] = None
+        _numpy["loaded"] = True
+    return _numpy["module"]
+
+
+def _term_pairs(text):
+    """(term, word as written) for each indexable word of text; non-strings have none."""
+    if not isinstance(text, str):
+        return
+    for word in _TERM_PATTERN.findall(text.lower()):
+        if word in _STOPWORDS or word.isdigit() or len(word) < 2:
+            continue
+        # Fold simple plurals so "suppliers" matches "supplier"
+        if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+            yield word[:-1], word
+        else:
+            yield word, word
+
+
+def _terms(text):
+    return [term for term, _ in _term_pairs(text)]
+
+
+class BulletIndex:
+    """BM25 index over the bullets of a list of work experiences."""
+
+    def __init__(self, work_experience):
+        self.experiences = list(work_experience)
+        self.bullets = []  # (experience index, bullet index, text)
+        for exp_index, exp in enumerate(work_experience):
+            for bullet_index, bullet in enumerate(exp.get("bullets") or []):
+                self.bullets.append((exp_index, bullet_index, bullet))
+
+        frequencies = []
+        lengths = []
+        for _, _, text in self.bullets:
+            counts = {}
+            for term in _terms(text):
+                counts[term] = counts.get(term, 0) + 1
+            frequencies.append(counts)
+            lengths.append(sum(counts.values()))
+        count = len(self.bullets)
+        average = (sum(lengths) / count) if count else 0.0
+
+        postings = {}
+        for doc, counts in enumerate(frequencies):
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc, tf))
+        # Per-posting BM25 weights, so a query only sums the postings of its terms
+        self.postings = {}
+        for term, docs in postings.items():
+            idf = math.log(1 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+            self.postings[term] = (
+                [doc for doc, _ in docs],
+                [idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / average))
+                 for doc, tf in docs]
+            )
+
+        self.tokens = [count_tokens(f"• {text}") for _, _, text in self.bullets]
+        numpy = _load_numpy()
+        if numpy is not None:
+            self._arrays = {term: (numpy.asarray(docs, dtype=numpy.intp), numpy.asarray(weights))
+                            for term, (docs, weights) in self.postings.items()}
+
+    def scores(self, query):
+        """BM25 score of every bullet for the query text."""
+        terms = [term for term in set(_terms(query)) if term in self.postings]
+        numpy = _load_numpy()
+        if numpy is not None:
+            if not terms:
+                return [0.0] * len(self.bullets)
+            docs = numpy.concatenate([self._arrays[term][0] for term in terms])
+            weights = numpy.concatenate([self._arrays[term][1] for term in terms])
+            return numpy.bincount(docs, weights=weights, minlength=len(self.bullets)).tolist()
+        scores = [0.0] * len(self.bullets)
+        for term in terms:
+            docs, weights = self.postings[term]
+            for doc, weight in zip(docs, weights):
+                scores[doc] += weight
+        return scores
+
+
+def relevance_index(work_experience):
+    """The BulletIndex for work_experience, cached per user.
+
+    Profile updates copy the top-level lists but keep unchanged entries, so the
+    cached index stays valid across profile versions (e.g. saving a generated
+    resume) for as long as every experience entry is the same object.
+    """
+    user_id = current_user_id()
+    with _relevance_lock:
+        index = _relevance_indexes.get(user_id)
+        if (index is not None and len(index.experiences) == len(work_experience)
+                and all(a is b for a, b in zip(index.experiences, work_experience))):
+            _relevance_indexes.move_to_end(user_id)
+            return index
+    with span("relevance-index"):
+        index = BulletIndex(work_experience)
+    with _relevance_lock:
+        _relevance_indexes[user_id] = index
+        _relevance_indexes.move_to_end(user_id)
+        while len(_relevance_indexes) > RELEVANCE_INDEX_CACHE_ENTRIES:
+            _relevance_indexes.popitem(last=False)
+    return index
+
+
+def select_relevant_bullets(work_experience, job_description,
+                            max_bullets=RESUME_PROMPT_MAX_BULLETS, token_budget=RESUME_PROMPT_BULLET_TOKENS):
+    """Return work_experience with each role's bullets trimmed to the most relevant ones.
+
+    Every role keeps its best bullet, the rest are added by score while they
+    fit, and kept bullets stay in their original order. work_experience is
+    returned as is when it is already within both limits.
+    """
+    index = relevance_index(work_experience)
+    if len(index.bullets) <= max_bullets and sum(index.tokens) <= token_budget:
+        return work_experience
+
+    with span("relevance-rank"):
+        scores = index.scores(job_description)
+        # Highest score first; ties go to the earlier role and bullet
+        ranked = sorted(range(len(index.bullets)), key=lambda doc: (-scores[doc], doc))
+        selected = set()
+        used = 0
+        seen_roles = set()
+        for doc in ranked:
+            exp_index = index.bullets[doc][0]
+            if exp_index not in seen_roles:
+                seen_roles.add(exp_index)
+                selected.add(doc)
+                used += index.tokens[doc]
+        for doc in ranked:
+            if len(selected) >= max_bullets:
+                break
+            if doc not in selected and used + index.tokens[doc] <= token_budget:
+                selected.add(doc)
+                used += index.tokens[doc]
+
+    kept = [[] for _ in work_experience]
+    for doc in sorted(selected):
+        exp_index, _, text = index.bullets[doc]
+        kept[exp_index].append(text)
+    logger.debug("Kept %d of %d bullets (%d tokens) for the resume prompt",
+                 len(selected), len(index.bullets), used)
+    return [{**exp, "bullets": bullets} for exp, bullets in zip(work_experience, kept)]
+
+
+def keyword_coverage(user_data, job_description, max_terms=KEYWORD_REPORT_MAX_TERMS):
+    """Which of the job description's most frequent keywords the profile mentions."""
+    counts = {}
+    words = {}
+    for term, word in _term_pairs(job_description):
+        counts[term] = counts.get(term, 0) + 1
+        words.setdefault(term, word)
+    # Most frequent first; ties keep their order of appearance
+    keywords = sorted(counts, key=lambda term: -counts[term])[:max_terms]
+
+    index = relevance_index(user_data.get("workExperiences", []))
+    other_terms = set()
+    for skill in user_data.get("skills", []):
+        other_terms.update(_terms(skill))
+    for exp in user_data.get("workExperiences", []):
+        other_terms.update(_terms(exp.get("position", "")))
+
+    report = []
+    for term in keywords:
+        bullets = len(index.postings[term][0]) if term in index.postings else 0
+        report.append({
+            "keyword": words[term],
+            "occurrences": counts[term],
+            "bullets": bullets,
+            "covered": bullets > 0 or term in other_terms
+        })
+    covered = sum(1 for entry in report if entry["covered"])
+    return {
+        "keywords": report,
+        "covered": covered,
+        "total": len(report),
+        "coverage": covered / len(report) if report else 0.0,
+        "missing": [entry["keyword"] for entry in report if not entry["covered"]]
+    }
+
 
-        # -------- Resume Prompt --------
-        prompt = f"""
+def build_resume_prompt(work_experience, job_description):
+    return f"""
 You are a professional resume writer helping tailor resumes for a specific job description. Keep it recruiter-friendly and ATS-compliant. Use strong action verbs, quantified achievements, and align each bullet point with the provided job description.
 
 The goal is to **rewrite only the WORK EXPERIENCE section** from the candidate's resume. Your output will be injected into an existing resume layout, so do NOT include any summary, contact info, education, or skills — just the updated WORK EXPERIENCE section in clean resume bullet format.
@@ -367,38 +2653,9 @@ Instructions:
 - Keep a concise, executive MBA-style tone.
 """
 
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are an expert resume writer skilled in ATS optimization."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-
-        updated_experience = response.choices[0].message.content.strip()
-
-        # Check for uploaded resume file
-        resume_file = None
-        for fname in os.listdir(RESUMES_DIR):
-            if fname.startswith("res"):
-                resume_file = os.path.join(RESUMES_DIR, fname)
-                break
-
-        if not resume_file:
-            return jsonify({"error": "No uploaded resume file found. Please upload one named 'res'."}), 400
 
-        now = datetime.now().isoformat()
-        resume_id = str(uuid.uuid4())
-
-        user_data["resumes"].append({
-            "id": resume_id,
-            "title": f"Updated Resume for {job_title}",
-            "content": updated_experience,
-            "createdAt": now
-        })
-
-        # -------- Cover Letter Prompt --------
-        cover_prompt = f"""
+def build_cover_letter_prompt(job_title, job_description, skills, work_experience):
+    return f"""
 Write a concise, personalized cover letter for the following job title and description.
 
 Job Title: {job_title}
@@ -416,327 +2673,1063 @@ Recent Experience Highlights:
 Make it sound confident, polished, and tailored to the role.
 """
 
-        cover_response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a skilled business communicator who writes concise, effective cover letters."},
-                {"role": "user", "content": cover_prompt}
-            ]
-        )
 
-        # -------- Format Cover Letter Header --------
-        name = user_data.get("name", "[Your Name]")
-        email = user_data.get("email", "[Your Email]")
-        phone = user_data.get("phone", "[Your Phone Number]")
-        date_str = datetime.now().strftime("%B %d, %Y")
-
-        formatted_header = "\n".join([
-            name,
-            "[Your Address]",
-            "[City, State, Zip]",
-            email,
-            phone,
-            date_str
-        ])
-
-        # Replace the top 6 lines of the GPT-generated letter with our real info
-        cover_letter_lines = cover_response.choices[0].message.content.strip().split("\n")
-        body_start_index = 6 if len(cover_letter_lines) >= 6 else 0
-        body_rest = "\n".join(cover_letter_lines[body_start_index:])
-        # Remove any existing "Warm regards," block in the GPT body
-        # Format your actual header
-        name = user_data.get("name", "[Your Name]")
-        email = user_data.get("email", "[Your Email]")
-        phone = user_data.get("phone", "[Your Phone Number]")
-        date_str = datetime.now().strftime("%B %d, %Y")
-
-        header_lines = [
-            name,
-            "[Your Address]",
-            "[City, State, Zip]",
-            email,
-            phone,
-            date_str
-        ]
-        formatted_header = "\n".join(header_lines)
+def format_cover_letter(letter, user_data):
+    # Format your actual header
+    name = user_data.get("name", "[Your Name]")
+    email = user_data.get("email", "[Your Email]")
+    phone = user_data.get("phone", "[Your Phone Number]")
+    date_str = datetime.now().strftime("%B %d, %Y")
+
+    header_lines = [
+        name,
+        "[Your Address]",
+        "[City, State, Zip]",
+        email,
+        phone,
+        date_str
+    ]
+    formatted_header = "\n".join(header_lines)
+
+    # Replace just the first 6 lines of GPT's output (header), keep the rest as-is
+    gpt_lines = letter.split("\n")
+    body_rest = "\n".join(gpt_lines[6:]) if len(gpt_lines) > 6 else ""
+
+    # Final combined cover letter text
+    cover_letter_text = f"{formatted_header}\n{body_rest}".strip()
+    if "[Your Name]" in cover_letter_text:
+        cover_letter_text = cover_letter_text.replace("[Your Name]", name)
+    return cover_letter_text
+
+
+def generate_documents(user_data, job_title, job_description, regenerate=False):
+    """Generate the tailored work experience and cover letter for one job.
+
+    The two model calls are independent, so they run concurrently on the
+    shared LLM executor and the wall-clock cost is that of the slower one.
+    If either call fails the other is cancelled (when not yet started) and
+    the exception is re-raised. Identical prompts are served from the LLM
+    response cache unless ``regenerate`` is set.
+    """
+    work_experience = user_data.get("workExperiences", [])
+    skills = user_data.get("skills", [])
+
+    resume_prompt = build_resume_prompt(select_relevant_bullets(work_experience, job_description), job_description)
+    cover_prompt = build_cover_letter_prompt(job_title, job_description, skills, work_experience)
+
+    resume_future = submit_in_context(llm_executor, cached_complete_chat, RESUME_SYSTEM_PROMPT, resume_prompt,
+                                      bypass=regenerate)
+    cover_future = submit_in_context(llm_executor, cached_complete_chat, COVER_LETTER_SYSTEM_PROMPT, cover_prompt,
+                                     bypass=regenerate)
+    try:
+        updated_experience = resume_future.result()
+        cover_letter = cover_future.result()
+    except Exception:
+        resume_future.cancel()
+        cover_future.cancel()
+        raise
+
+    return updated_experience, format_cover_letter(cover_letter, user_data)
 
-        # Get GPT's full output as lines
-        gpt_lines = cover_response.choices[0].message.content.strip().split("\n")
 
-        # Replace just the first 6 lines (header), keep the rest as-is
-        body_rest = "\n".join(gpt_lines[6:]) if len(gpt_lines) > 6 else ""
+def find_uploaded_resume():
+    resumes_dir = current_shard().resumes_dir
+    if os.path.exists(resumes_dir):
+        for fname in os.listdir(resumes_dir):
+            if fname.startswith("res"):
+                return os.path.join(resumes_dir, fname)
+    return None
+
+
+def generated_document_entries(job_title, resume_text, cover_letter_text):
+    """Store the texts as artifacts and return the (resume, cover letter) profile references.
+
+    Call it before update_user_data() so the artifact writes happen outside the profile lock.
+    """
+    now = datetime.now().isoformat()
+    resume_entry = artifact_reference({
+        "id": str(uuid.uuid4()),
+        "title": f"Updated Resume for {job_title}",
+        "content": resume_text,
+        "createdAt": now
+    })
+    cover_letter_entry = artifact_reference({
+        "id": str(uuid.uuid4()),
+        "title": f"Cover Letter for {job_title}",
+        "content": cover_letter_text,
+        "createdAt": now
+    })
+    return resume_entry, cover_letter_entry
+
+
+def record_generated_documents(user_data, entries):
+    resume_entry, cover_letter_entry = entries
+    user_data["resumes"].append(resume_entry)
+    user_data["coverLetters"].append(cover_letter_entry)
+
+
+def generation_request_error(data):
+    """Why a single generate request can't be served, or None if it is valid."""
+    if not isinstance(data, dict):
+        return "Request body must be a JSON object"
+    if not isinstance(data.get('jobDescription', ''), str):
+        return "'jobDescription' must be a string"
+    if not isinstance(data.get('jobTitle', ''), str):
+        return "'jobTitle' must be a string"
+    return None
 
-        # Final combined cover letter text
-        cover_letter_text = f"{formatted_header}\n{body_rest}".strip()
-        if "[Your Name]" in cover_letter_text:
-            cover_letter_text = cover_letter_text.replace("[Your Name]", name)
 
+@app.route('/api/resume/generate', methods=['POST'])
+def generate_resume():
+    data = request.json
+    error = generation_request_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+    job_title = data.get('jobTitle', '')
+    job_description = data.get('jobDescription', '')
+    regenerate = bool(data.get('regenerate', False))
 
-        # Save cover letter
-        cover_letter_id = str(uuid.uuid4())
-        user_data["coverLetters"].append({
-            "id": cover_letter_id,
-            "title": f"Cover Letter for {job_title}",
-            "content": cover_letter_text,
-            "createdAt": now
-        })
+    try:
+        # Check for uploaded resume file before paying for any model calls
+        if not find_uploaded_resume():
+            return jsonify({"error": "No uploaded resume file found. Please upload one named 'res'."}), 400
+
+        with span("profile-load"):
+            user_data = get_user_data()
+
+        try:
+            with span("llm"):
+                updated_experience, cover_letter_text = generate_documents(
+                    user_data, job_title, job_description, regenerate=regenerate
+                )
+        except Exception as e:
+            logger.error("Error from language model during resume generation: %s", e)
+            return jsonify({"error": "Failed to generate resume. Please try again."}), 502
 
-        save_user_data(user_data)
+        with span("profile-save"):
+            entries = generated_document_entries(job_title, updated_experience, cover_letter_text)
+            update_user_data(lambda user_data: record_generated_documents(user_data, entries))
         
-        TEMP_FILE = os.path.join(DATA_DIR, "tmp", "generated_resume.json")
+        TEMP_FILE = os.path.join(current_shard().root, "tmp", "generated_resume.json")
         os.makedirs(os.path.dirname(TEMP_FILE), exist_ok=True)
 
-        with open(TEMP_FILE, "w") as f:
+        with span("tmp-write"), open(TEMP_FILE, "w") as f:
             json.dump({
                 "resume": updated_experience,
                 "coverLetter": cover_letter_text
             }, f)
         return jsonify({
             "resume": updated_experience,
-            "coverLetter": cover_letter_text
+            "coverLetter": cover_letter_text,
+            "keywordCoverage": keyword_coverage(user_data, job_description)
         })
 
-    except Exception as e:
-        print(f"Error in resume generation: {e}")
+    except Exception:
+        logger.exception("Error in resume generation")
         return jsonify({"error": "Failed to generate resume. Please try again."}), 500
 
+
+@app.route('/api/resume/keyword-coverage', methods=['POST'])
+def get_keyword_coverage():
+    try:
+        data = request.json or {}
+        job_description = data.get('jobDescription', '')
+        if not isinstance(job_description, str) or not job_description.strip():
+            return jsonify({"error": "'jobDescription' must be a non-empty string"}), 400
+        return jsonify(keyword_coverage(get_user_data(), job_description))
+    except Exception as e:
+        logger.exception("Error computing keyword coverage")
+        return jsonify({"error": str(e)}), 500
+
+BATCH_MAX_JOBS = 100
+BATCH_DEFAULT_CONCURRENCY = 4
+BATCH_MAX_CONCURRENCY = LLM_MAX_WORKERS // 2  # each job makes two concurrent model calls
+
+
+def batch_job_error(job):
+    """Why a batch item can't be generated, or None if it is valid."""
+    if not isinstance(job, dict):
+        return "Each job must be an object"
+    description = job.get('jobDescription')
+    if not isinstance(description, str) or not description.strip():
+        return "'jobDescription' must be a non-empty string"
+    if not isinstance(job.get('jobTitle', ''), str):
+        return "'jobTitle' must be a string"
+    return None
+
+
+@app.route('/api/resume/generate/batch', methods=['POST'])
+def generate_resume_batch():
+    """Generate resumes and cover letters for many job postings in one request.
+
+    Jobs fan out over a pool of ``concurrency`` workers, every produced
+    document is persisted with a single profile write, and the response
+    carries a result or an error for each job in request order. Invalid
+    jobs are reported as errors without calling the model.
+    """
+    data = request.json or {}
+    jobs = data.get('jobs', [])
+    regenerate = bool(data.get('regenerate', False))
+
+    if not isinstance(jobs, list) or not jobs:
+        return jsonify({"error": "'jobs' must be a non-empty list"}), 400
+    if len(jobs) > BATCH_MAX_JOBS:
+        return jsonify({"error": f"At most {BATCH_MAX_JOBS} jobs per batch"}), 400
+    try:
+        concurrency = int(data.get('concurrency', BATCH_DEFAULT_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "'concurrency' must be an integer"}), 400
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY, len(jobs)))
+
+    try:
+        if not find_uploaded_resume():
+            return jsonify({"error": "No uploaded resume file found. Please upload one named 'res'."}), 400
+
+        user_data = get_user_data()
+
+        def run(job):
+            return generate_documents(
+                user_data, job.get('jobTitle', ''), job.get('jobDescription', ''), regenerate=regenerate
+            )
+
+        errors = [batch_job_error(job) for job in jobs]
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+            futures = [None if error else submit_in_context(pool, run, job) for job, error in zip(jobs, errors)]
+
+        results = []
+        generated = []
+        for index, (job, error, future) in enumerate(zip(jobs, errors, futures)):
+            job_title = job.get('jobTitle', '') if isinstance(job, dict) else ''
+            if error:
+                results.append({"index": index, "jobTitle": job_title if isinstance(job_title, str) else '',
+                                "error": error})
+                continue
+            try:
+                resume_text, cover_letter_text = future.result()
+            except Exception as e:
+                logger.error("Error generating batch job %d (%s): %s", index, job_title, e)
+                results.append({"index": index, "jobTitle": job_title, "error": str(e)})
+                continue
+            generated.append(generated_document_entries(job_title, resume_text, cover_letter_text))
+            results.append({
+                "index": index,
+                "jobTitle": job_title,
+                "resume": resume_text,
+                "coverLetter": cover_letter_text
+            })
+
+        def record_all(user_data):
+            for entries in generated:
+                record_generated_documents(user_data, entries)
+
+        if generated:
+            update_user_data(record_all)
+
+        succeeded = len(generated)
+
+        return jsonify({
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        })
+
+    except Exception:
+        logger.exception("Error in batch resume generation")
+        return jsonify({"error": "Failed to generate resumes. Please try again."}), 500
+
+# -------- Background generation jobs --------
+# Jobs are persisted as one JSON file each under jobs/ and executed by a small
+# worker pool, so the request thread returns a job id immediately. Several
+# worker processes can share jobs/, so who runs a job is decided in
+# jobs/claims.db (SQLite, WAL): each unfinished job has an owner (host, pid
+# and a per-process token) and a lease that the owner renews while the job
+# runs. A background thread in every process renews its own leases, takes
+# over jobs whose owner died or whose lease expired (claiming them with a
+# compare-and-swap UPDATE, so only one process wins), and deletes finished
+# jobs after JOB_RETENTION_SECONDS. That thread starts with the process's first
+# job submit or poll, so processes that never touch jobs create no job state.
+# Only the jobs a process is running are kept in memory; the others are read
+# from their file when polled.
+JOB_WORKERS = 4
+JOB_LEASE_SECONDS = 120
+JOB_MAINTENANCE_INTERVAL_SECONDS = 30
+JOB_RETENTION_SECONDS = 24 * 60 * 60
+JOB_CLAIMS_DB = os.path.join(JOBS_DIR, "claims.db")
+job_executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_jobs_lock = threading.Lock()
+_jobs = {}
+_jobs_state = {"pid": None}
+_job_claims_local = threading.local()
+_process_token = uuid.uuid4().hex[:12]
+
+
+def _job_owner():
+    # The pid is read on every call so forked workers get owners of their own
+    return f"{socket.gethostname()}:{os.getpid()}:{_process_token}"
+
+
+def _job_owner_alive(owner):
+    """False only when owner is a process on this host that no longer exists."""
+    host, _, rest = (owner or "").partition(":")
+    pid = rest.partition(":")[0]
+    if host != socket.gethostname() or not pid.isdigit():
+        return True  # cannot tell; the lease decides
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def _job_claims():
+    # sqlite3 connections are per thread (and per process after a fork)
+    conn = getattr(_job_claims_local, "conn", None)
+    if conn is None or _job_claims_local.pid != os.getpid():
+        os.makedirs(JOBS_DIR, exist_ok=True)
+        conn = sqlite3.connect(JOB_CLAIMS_DB, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS job_claims (
+            id TEXT PRIMARY KEY,
+            owner TEXT,
+            lease_until REAL NOT NULL DEFAULT 0,
+            finished_at REAL
+        )""")
+        _job_claims_local.conn = conn
+        _job_claims_local.pid = os.getpid()
+    return conn
+
+
+def _job_path(job_id):
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _save_job(job):
+    job["updatedAt"] = datetime.now().isoformat()
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    tmp_path = f"{_job_path(job['id'])}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(job, f)
+    os.replace(tmp_path, _job_path(job["id"]))
+
+
+def _update_job(job_id, **changes):
+    with _jobs_lock:
+        job = _jobs[job_id]
+        job.update(changes)
+        _save_job(job)
+
+
+def _finish_job(job_id, **changes):
+    with _jobs_lock:
+        job = _jobs.pop(job_id)
+        job.update(changes)
+        _save_job(job)
+    with _job_claims() as conn:
+        conn.execute("UPDATE job_claims SET owner = NULL, finished_at = ? WHERE id = ?", (time.time(), job_id))
+
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job is not None:
+            return dict(job)
+    try:
+        with open(_job_path(job_id), 'r') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def run_generation_job(job_id):
+    with _jobs_lock:
+        job = dict(_jobs[job_id])
+    try:
+        _update_job(job_id, status="running", progress="generating")
+        # Jobs taken over from another process have no request context to inherit the user from
+        with acting_as(job.get("userId", DEFAULT_USER_ID)):
+            resume_text, cover_letter_text = generate_documents(
+                get_user_data(), job["jobTitle"], job["jobDescription"], regenerate=job["regenerate"]
+            )
+
+            _update_job(job_id, progress="saving")
+            entries = generated_document_entries(job["jobTitle"], resume_text, cover_letter_text)
+            update_user_data(lambda user_data: record_generated_documents(user_data, entries))
+
+        _finish_job(job_id, status="completed", progress="done",
+                    result={"resume": resume_text, "coverLetter": cover_letter_text})
+    except Exception as e:
+        logger.error("Error in generation job %s: %s", job_id, e)
+        _finish_job(job_id, status="failed", progress="done", error=str(e))
+
+
+def submit_generation_job(job_title, job_description, regenerate=False):
+    now = datetime.now().isoformat()
+    job = {
+        "id": str(uuid.uuid4()),
+        "userId": current_user_id(),
+        "status": "queued",
+        "progress": "queued",
+        "jobTitle": job_title,
+        "jobDescription": job_description,
+        "regenerate": regenerate,
+        "createdAt": now,
+        "result": None,
+        "error": None
+    }
+    ensure_job_maintenance()
+    # Claim before writing the file, so no other process ever sees it unowned
+    with _job_claims() as conn:
+        conn.execute("INSERT INTO job_claims (id, owner, lease_until) VALUES (?, ?, ?)",
+                     (job["id"], _job_owner(), time.time() + JOB_LEASE_SECONDS))
+    with _jobs_lock:
+        _jobs[job["id"]] = job
+        _save_job(job)
+        submitted = dict(job)
+    submit_in_context(job_executor, run_generation_job, job["id"])
+    return submitted
+
+
+def _register_unclaimed_job_files(conn):
+    # Job files written before claims.db existed have no row; they start unowned
+    known = {row[0] for row in conn.execute("SELECT id FROM job_claims")}
+    for fname in os.listdir(JOBS_DIR):
+        job_id = fname[:-len(".json")]
+        if not fname.endswith(".json") or job_id in known:
+            continue
+        try:
+            with open(os.path.join(JOBS_DIR, fname), 'r') as f:
+                status = json.load(f).get("status")
+        except (OSError, ValueError) as e:
+            logger.warning("Skipping unreadable job file %s: %s", fname, e)
+            continue
+        finished_at = None if status in ("queued", "running") else time.time()
+        conn.execute("INSERT OR IGNORE INTO job_claims (id, owner, lease_until, finished_at) VALUES (?, NULL, 0, ?)",
+                     (job_id, finished_at))
+
+
+def claim_orphaned_jobs():
+    """Take over unfinished jobs whose owner died or stopped renewing its lease."""
+    now = time.time()
+    conn = _job_claims()
+    rows = conn.execute(
+        "SELECT id, owner, lease_until FROM job_claims WHERE finished_at IS NULL AND (owner IS NULL OR owner != ?)",
+        (_job_owner(),)
+    ).fetchall()
+    claimed = []
+    for job_id, owner, lease_until in rows:
+        if owner is not None and lease_until >= now and _job_owner_alive(owner):
+            continue
+        with conn:
+            # Compare-and-swap: only one process can move the row off the owner it saw
+            cursor = conn.execute(
+                "UPDATE job_claims SET owner = ?, lease_until = ? WHERE id = ? AND owner IS ? AND lease_until = ?",
+                (_job_owner(), now + JOB_LEASE_SECONDS, job_id, owner, lease_until)
+            )
+        if cursor.rowcount != 1:
+            continue
+        job = get_job(job_id)
+        if job is None:
+            with conn:
+                conn.execute("DELETE FROM job_claims WHERE id = ?", (job_id,))
+            continue
+        job.update(status="queued", progress="queued")
+        with _jobs_lock:
+            _jobs[job_id] = job
+            _save_job(job)
+        job_executor.submit(run_generation_job, job_id)
+        claimed.append(job_id)
+    if claimed:
+        logger.info("Took over %d unfinished generation jobs", len(claimed))
+    return claimed
+
+
+def renew_job_leases():
+    with _jobs_lock:
+        running = list(_jobs)
+    if running:
+        with _job_claims() as conn:
+            conn.executemany("UPDATE job_claims SET lease_until = ? WHERE id = ? AND owner = ?",
+                             [(time.time() + JOB_LEASE_SECONDS, job_id, _job_owner()) for job_id in running])
+
+
+def prune_finished_jobs():
+    conn = _job_claims()
+    expired = [row[0] for row in conn.execute(
+        "SELECT id FROM job_claims WHERE finished_at < ?", (time.time() - JOB_RETENTION_SECONDS,)
+    )]
+    for job_id in expired:
+        try:
+            os.remove(_job_path(job_id))
+        except FileNotFoundError:
+            pass
+    if expired:
+        with conn:
+            conn.executemany("DELETE FROM job_claims WHERE id = ?", [(job_id,) for job_id in expired])
+        logger.info("Deleted %d finished generation jobs", len(expired))
+
+
+def run_job_maintenance():
+    try:
+        renew_job_leases()
+        claim_orphaned_jobs()
+        prune_finished_jobs()
+    except Exception:
+        logger.exception("Error in generation job maintenance")
+
+
+def _job_maintenance_loop():
+    while True:
+        time.sleep(JOB_MAINTENANCE_INTERVAL_SECONDS)
+        run_job_maintenance()
+
+
+def ensure_job_maintenance():
+    """Start this process's maintenance thread and pick up orphaned jobs once."""
+    if _jobs_state["pid"] == os.getpid():
+        return
+    with _jobs_lock:
+        if _jobs_state["pid"] == os.getpid():
+            return
+        _jobs_state["pid"] = os.getpid()
+    if os.path.exists(JOBS_DIR):
+        with _job_claims() as conn:
+            _register_unclaimed_job_files(conn)
+    threading.Thread(target=_job_maintenance_loop, name="job-maintenance", daemon=True).start()
+    run_job_maintenance()
+
+
+@app.route('/api/resume/generate/async', methods=['POST'])
+def generate_resume_async():
+    data = request.json or {}
+    error = generation_request_error(data)
+    if error:
+        return jsonify({"error": error}), 400
+    try:
+        if not find_uploaded_resume():
+            return jsonify({"error": "No uploaded resume file found. Please upload one named 'res'."}), 400
+
+        job = submit_generation_job(
+            data.get('jobTitle', ''), data.get('jobDescription', ''), bool(data.get('regenerate', False))
+        )
+        return jsonify({"jobId": job["id"], "status": job["status"]}), 202
+    except Exception:
+        logger.exception("Error submitting generation job")
+        return jsonify({"error": "Failed to submit generation job"}), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_generation_job(job_id):
+    ensure_job_maintenance()
+    job = get_job(job_id)
+    # Other users' jobs are reported as missing rather than forbidden
+    if job is None or job.get("userId", DEFAULT_USER_ID) != current_user_id():
+        return jsonify({"error": "Job not found"}), 404
+    job.pop("jobDescription", None)
+    return jsonify(job)
+
+@app.route('/api/llm-cache/stats', methods=['GET'])
+def get_llm_cache_stats():
+    disk_bytes = _llm_disk_bytes()
+    with _llm_cache_lock:
+        stats = dict(llm_cache_stats)
+        stats["memoryEntries"] = len(_llm_memory_cache)
+        stats["diskBytes"] = disk_bytes
+    lookups = stats["memoryHits"] + stats["diskHits"] + stats["misses"]
+    stats["hitRate"] = (stats["memoryHits"] + stats["diskHits"]) / lookups if lookups else 0.0
+    return jsonify(stats)
+
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    with _llm_cache_lock:
+        cache_events = [("resumecraft_llm_cache_events_total", {"event": event}, count)
+                        for event, count in llm_cache_stats.items()]
+    return Response(metrics.render(cache_events), mimetype="text/plain; version=0.0.4")
+
+# -------- Rendered document cache --------
+# Rendered PDF/DOCX bytes are cached in memory under a digest of everything
+# that affects the output: the content, format and document type, plus the
+# profile version and uploaded resume hash for resumes. The cache is bounded
+# by total size and evicts least-recently-used documents.
+DOCUMENT_MIMETYPES = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+RENDER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+# PDFs are built in memory; one that grows past this spills to a temporary
+# file and is streamed from there without being cached
+PDF_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+_render_cache_lock = threading.Lock()
+_render_cache = OrderedDict()
+_render_cache_state = {"bytes": 0}
+_uploaded_resume_digests = {}
+
+
+def uploaded_resume_docx():
+    resumes_dir = current_shard().resumes_dir
+    if os.path.exists(resumes_dir):
+        for fname in os.listdir(resumes_dir):
+            if fname.startswith("res") and fname.endswith(".docx"):
+                return os.path.join(resumes_dir, fname)
+    return None
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def uploaded_resume_digest():
+    """SHA-256 of the uploaded res*.docx, re-hashed only when its mtime/size change."""
+    path = uploaded_resume_docx()
+    if path is None:
+        return None
+    st = os.stat(path)
+    stamp = (path, st.st_mtime_ns, st.st_size)
+    digest = _uploaded_resume_digests.get(stamp)
+    if digest is None:
+        digest = file_sha256(path)
+        # One live entry per user; drop stale stamps once there are too many
+        if len(_uploaded_resume_digests) >= 1024:
+            _uploaded_resume_digests.clear()
+        _uploaded_resume_digests[stamp] = digest
+    return digest
+
+
+def render_cache_key(content, format_type, doc_type):
+    parts = [content, format_type, doc_type]
+    if doc_type == "resume":
+        # Profile versions are per user, so the user is part of the key too
+        parts += [current_user_id(), profile_version(), uploaded_resume_digest()]
+    return hashlib.sha256(json.dumps(parts).encode("utf-8")).hexdigest()
+
+
+def _render_cache_get(key):
+    with _render_cache_lock:
+        body = _render_cache.get(key)
+        if body is not None:
+            _render_cache.move_to_end(key)
+        return body
+
+
+def _render_cache_put(key, body):
+    if len(body) > RENDER_CACHE_MAX_BYTES:
+        return
+    with _render_cache_lock:
+        previous = _render_cache.pop(key, None)
+        if previous is not None:
+            _render_cache_state["bytes"] -= len(previous)
+        _render_cache[key] = body
+        _render_cache_state["bytes"] += len(body)
+        while _render_cache_state["bytes"] > RENDER_CACHE_MAX_BYTES:
+            _, evicted = _render_cache.popitem(last=False)
+            _render_cache_state["bytes"] -= len(evicted)
+
+
+def render_document(content, format_type, doc_type):
+    """Render content to PDF or DOCX, or None if the PDF build failed.
+
+    Returns bytes, except for a PDF larger than PDF_SPOOL_MAX_BYTES, which is
+    returned as an open temporary file positioned at the start.
+    """
+    model = document_model(content, doc_type)
+    if format_type == 'pdf':
+        buffer = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX_BYTES)
+        with span("pdf-layout"):
+            if doc_type == "coverLetter":
+                built = emit_cover_letter_pdf(model, buffer)
+            else:
+                built = emit_resume_pdf(model, buffer)
+        if built is None:
+            buffer.close()
+            return None
+        size = buffer.tell()
+        buffer.seek(0)
+        if size > PDF_SPOOL_MAX_BYTES:
+            return buffer
+        with buffer:
+            return buffer.read()
+
+    with span("docx-build"):
+        if doc_type == "coverLetter":
+            return emit_cover_letter_docx(model)
+        return emit_resume_docx(model)
+
+
+def rendered_document(content, format_type, doc_type):
+    """render_document() behind the rendered document cache."""
+    with span("render-cache-lookup"):
+        key = render_cache_key(content, format_type, doc_type)
+        body = _render_cache_get(key)
+    if body is None:
+        body = render_document(content, format_type, doc_type)
+        if isinstance(body, bytes):
+            _render_cache_put(key, body)
+    return body
+
+
+def download_content(data):
+    """Resolve a download request body to (content, doc_type), or (None, error response)."""
+    content = data.get('content', '')
+
+    # Decide type based on whether content is provided
+    if not content.strip():  # empty means it's resume
+        content = latest_resume_content()
+        if content is None:
+            return None, (jsonify({"error": "No resume found"}), 404)
+
+    if not content:
+        return None, (jsonify({"error": "No content available"}), 400)
+
+    if content.strip().lower().startswith("dear") or "dear hiring manager" in content.lower():
+        return content, "coverLetter"
+    return content, "resume"
+
+
 @app.route('/api/document/download', methods=['POST'])
 def download_document():
     try:
         data = request.json
-        content = data.get('content', '')
         file_name = data.get('fileName', 'document')
         format_type = data.get('format', 'pdf')
 
-        # Decide type based on whether content is provided
-        if not content.strip():  # empty means it's resume
-            user_data = load_user_data()
-            if not user_data.get("resumes"):
-                return jsonify({"error": "No resume found"}), 404
-            content = user_data["resumes"][-1]["content"]
+        content, doc_type = download_content(data)
+        if content is None:
+            return doc_type
 
-        if not content:
-            return jsonify({"error": "No content available"}), 400
+        if format_type not in DOCUMENT_MIMETYPES:
+            return jsonify({"error": "Unsupported format"}), 400
 
-        if format_type == 'pdf':
-            if content.strip().lower().startswith("dear") or "dear hiring manager" in content.lower():
-                pdf_path = generate_cover_letter_pdf(content, file_name)
-            else:
-                pdf_path = generate_resume_pdf(content, file_name)
+        body = rendered_document(content, format_type, doc_type)
+        if body is None:
+            return jsonify({"error": f"Failed to generate {format_type.upper()}"}), 500
 
-            if pdf_path and os.path.exists(pdf_path):
-                return send_file(pdf_path, mimetype='application/pdf', as_attachment=True)
-            else:
-                return jsonify({"error": "Failed to generate PDF"}), 500
+        return send_file(
+            io.BytesIO(body) if isinstance(body, bytes) else body,
+            mimetype=DOCUMENT_MIMETYPES[format_type],
+            as_attachment=True,
+            download_name=f"{file_name}.{format_type}"
+        )
 
-        elif format_type == 'docx':
-            if content.strip().lower().startswith("dear") or "dear hiring manager" in content.lower():
-                return generate_cover_letter_docx(content, file_name)
-            else:
-                return generate_resume_docx(content, file_name)
+    except Exception as e:
+        logger.exception("Error in document download")
+        return jsonify({"error": str(e)}), 500
 
-        else:
+
+@app.route('/api/document/download/bundle', methods=['POST'])
+def download_document_bundle():
+    """Same body as /api/document/download; returns a zip with every requested format.
+
+    Both formats are rendered from one parsed document model.
+    """
+    try:
+        data = request.json
+        file_name = data.get('fileName', 'document')
+        formats = data.get('formats', list(DOCUMENT_MIMETYPES))
+
+        content, doc_type = download_content(data)
+        if content is None:
+            return doc_type
+
+        if not isinstance(formats, list) or not formats or any(fmt not in DOCUMENT_MIMETYPES for fmt in formats):
             return jsonify({"error": "Unsupported format"}), 400
 
+        buffer = io.BytesIO()
+        # PDF and DOCX are already compressed, so the archive just stores them
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_STORED) as bundle:
+            for format_type in dict.fromkeys(formats):
+                body = rendered_document(content, format_type, doc_type)
+                if body is None:
+                    return jsonify({"error": f"Failed to generate {format_type.upper()}"}), 500
+                if isinstance(body, bytes):
+                    bundle.writestr(f"{file_name}.{format_type}", body)
+                else:
+                    with body, bundle.open(f"{file_name}.{format_type}", 'w') as entry:
+                        shutil.copyfileobj(body, entry)
+
+        buffer.seek(0)
+        return send_file(buffer, mimetype="application/zip", as_attachment=True, download_name=f"{file_name}.zip")
+
     except Exception as e:
-        print(f"Error in document download: {e}")
+        logger.exception("Error in document bundle download")
         return jsonify({"error": str(e)}), 500
 
-def extract_additional_sections():
+def parse_additional_sections(doc_path):
+    load_docx_stack()
     additional_info = {}
-    if os.path.exists(RESUMES_DIR):
-        for fname in os.listdir(RESUMES_DIR):
-            if fname.startswith("res") and fname.endswith(".docx"):
-                doc_path = os.path.join(RESUMES_DIR, fname)
-                doc = Document(doc_path)
-                for table in doc.tables:
-                    for row in table.rows:
-                        if len(row.cells) >= 2:
-                            header = row.cells[0].text.strip().rstrip(":")
-                            data = row.cells[1].text.strip()
-                            if header and data:
-                                additional_info[header] = data.split('\n')
-                break
+    doc = Document(doc_path)
+    for table in doc.tables:
+        for row in table.rows:
+            if len(row.cells) >= 2:
+                header = row.cells[0].text.strip().rstrip(":")
+                data = row.cells[1].text.strip()
+                if header and data:
+                    additional_info[header] = data.split('\n')
     return additional_info
 
-def generate_resume_pdf(content, file_name):
-    with open(USER_DATA_FILE, "r") as f:
-        user_data = json.load(f)
+
+def store_resume_sections(doc_path, digest):
+    """Parse the uploaded resume and persist the sections next to it, keyed by content hash."""
+    with span("docx-parse"):
+        sections = parse_additional_sections(doc_path)
+    shard = current_shard()
+    tmp_path = f"{shard.resume_sections_file}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"sha256": digest, "source": os.path.basename(doc_path), "sections": sections}, f, indent=2)
+    os.replace(tmp_path, shard.resume_sections_file)
+    shard.resume_sections.update(sha256=digest, sections=sections)
+    return sections
+
+
+def _load_resume_sections(doc_path, digest):
+    shard = current_shard()
+    if shard.resume_sections["sha256"] == digest:
+        return shard.resume_sections["sections"]
+    try:
+        with open(shard.resume_sections_file, 'r') as f:
+            stored = json.load(f)
+        if stored.get("sha256") == digest:
+            shard.resume_sections.update(sha256=digest, sections=stored["sections"])
+            return stored["sections"]
+    except (OSError, ValueError):
+        pass
+    # The file was replaced outside /api/resume/upload, parse it again
+    logger.info("Parsing uploaded resume sections from %s", doc_path)
+    return store_resume_sections(doc_path, digest)
+
+
+def extract_additional_sections():
+    doc_path = uploaded_resume_docx()
+    if not doc_path:
+        return {}
+    with span("sections-load"), current_shard().resume_sections_lock:
+        sections = _load_resume_sections(doc_path, uploaded_resume_digest())
+    # Callers pop entries from the result, so hand out a copy
+    return {header: list(items) for header, items in sections.items()}
+
+# -------- Document model --------
+# Resumes and cover letters are parsed once into an immutable model that the
+# PDF and DOCX emitters below render from. Models are cached under the same
+# inputs as rendered documents (the content, plus the profile version and the
+# uploaded resume hash for resumes), so rendering both formats of a document
+# loads the profile and splits the content only once.
+DOCUMENT_MODEL_CACHE_ENTRIES = 64
+_document_model_lock = threading.Lock()
+_document_models = OrderedDict()
+
+
+@dataclass(frozen=True)
+class ResumeEntry:
+    heading: str
+    bullets: tuple = ()
+
+
+@dataclass(frozen=True)
+class ResumeModel:
+    name: str
+    contact: str
+    education: tuple
+    experience: tuple
+    skills: str
+    additional: tuple  # one ResumeEntry per extra section of the uploaded resume
+
+
+@dataclass(frozen=True)
+class CoverLetterModel:
+    lines: tuple  # stripped lines, "" for blank ones
+
+
+def build_resume_model(content):
+    user_data = get_user_data()
 
     additional_info = extract_additional_sections()
     extra_skills = additional_info.pop("Skills", [])
 
-    output_path = os.path.join(DATA_DIR, f"{file_name}.pdf")
-    doc = SimpleDocTemplate(output_path, pagesize=A4,
+    education = tuple(
+        ResumeEntry(
+            f"{edu['degree']} in {edu['field']} - {edu['institution']} ({edu['startDate']} to {edu['endDate']})",
+            tuple(line.strip() for line in edu.get("description", "").split('\n') if line.strip())
+        )
+        for edu in user_data.get("education", [])
+    )
+
+    if not content or not isinstance(content, str):
+        content = "Experience details not available."
+    experience = []
+    for block in content.split("\n\n"):
+        lines = block.strip().split("\n")
+        experience.append(ResumeEntry(lines[0], tuple(bullet.strip() for bullet in lines[1:] if bullet.strip())))
+
+    return ResumeModel(
+        name=user_data["name"],
+        contact=f"{user_data['email']} | {user_data['phone']} | {user_data['linkedin']}",
+        education=education,
+        experience=tuple(experience),
+        skills=", ".join(user_data.get("skills", []) + extra_skills),
+        additional=tuple(
+            ResumeEntry(section, tuple(item for item in items if item.strip()))
+            for section, items in additional_info.items()
+        )
+    )
+
+
+def build_cover_letter_model(content):
+    return CoverLetterModel(tuple(line.strip() for line in content.strip().split("\n")))
+
+
+def document_model(content, doc_type):
+    """The cached ResumeModel or CoverLetterModel for content."""
+    key = render_cache_key(content, "model", doc_type)
+    with _document_model_lock:
+        model = _document_models.get(key)
+        if model is not None:
+            _document_models.move_to_end(key)
+            return model
+
+    with span("document-model"):
+        model = build_cover_letter_model(content) if doc_type == "coverLetter" else build_resume_model(content)
+
+    with _document_model_lock:
+        _document_models[key] = model
+        while len(_document_models) > DOCUMENT_MODEL_CACHE_ENTRIES:
+            _document_models.popitem(last=False)
+    return model
+
+
+# -------- PDF and DOCX emitters --------
+def emit_resume_pdf(model, output):
+    """Build the PDF into output (a path or binary file object); returns output, or None on failure."""
+    styles = pdf_styles()
+    doc = SimpleDocTemplate(output, pagesize=A4,
                             leftMargin=0.5 * inch, rightMargin=0.5 * inch,
                             topMargin=0.5 * inch, bottomMargin=0.5 * inch)
 
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='Header', fontName='Times-Roman', fontSize=18, alignment=TA_CENTER, spaceAfter=10))
-    styles.add(ParagraphStyle(name='Section', fontName='Times-Roman', fontSize=14, spaceBefore=12, spaceAfter=6, textColor=colors.HexColor('#2c3e50')))
-    styles.add(ParagraphStyle(name='Body', fontName='Times-Roman', fontSize=11, spaceAfter=4))
-    styles.add(ParagraphStyle(name='MyBullet', fontName='Times-Roman', fontSize=11, leftIndent=10, bulletIndent=5))
-
     elements = []
 
-    elements.append(Paragraph(user_data["name"], styles["Header"]))
-    contact = f"{user_data['email']} | {user_data['phone']} | {user_data['linkedin']}"
-    elements.append(Paragraph(contact, styles["Body"]))
+    elements.append(Paragraph(model.name, styles["Header"]))
+    elements.append(Paragraph(model.contact, styles["Body"]))
     elements.append(Spacer(1, 12))
 
     elements.append(Paragraph("Education", styles["Section"]))
-    for edu in user_data.get("education", []):
-        edu_summary = f"{edu['degree']} in {edu['field']} - {edu['institution']} ({edu['startDate']} to {edu['endDate']})"
-        elements.append(Paragraph(edu_summary, styles["Body"]))
-        for line in edu.get("description", "").split('\n'):
-            if line.strip():
-                elements.append(Paragraph(line.strip(), styles["MyBullet"]))
+    for entry in model.education:
+        elements.append(Paragraph(entry.heading, styles["Body"]))
+        for line in entry.bullets:
+            elements.append(Paragraph(line, styles["MyBullet"]))
 
     elements.append(Paragraph("Experience", styles["Section"]))
-    if not content or not isinstance(content, str):
-        content = "Experience details not available."
-    for block in content.split("\n\n"):
-        lines = block.strip().split("\n")
-        if lines:
-            elements.append(Paragraph(lines[0], styles["Body"]))
-            for bullet in lines[1:]:
-                if bullet.strip():
-                    elements.append(Paragraph(bullet.strip(), styles["MyBullet"]))
+    for entry in model.experience:
+        elements.append(Paragraph(entry.heading, styles["Body"]))
+        for bullet in entry.bullets:
+            elements.append(Paragraph(bullet, styles["MyBullet"]))
 
     elements.append(Paragraph("Skills", styles["Section"]))
-    all_skills = user_data.get("skills", []) + extra_skills
-    skills_text = ", ".join(all_skills)
-    elements.append(Paragraph(skills_text, styles["Body"]))
+    elements.append(Paragraph(model.skills, styles["Body"]))
 
-    if additional_info:
+    if model.additional:
         elements.append(Paragraph("Additional Information", styles["Section"]))
-        for section, items in additional_info.items():
-            elements.append(Paragraph(f"<b>{section}</b>", styles["Body"]))
-            for item in items:
-                if item.strip():
-                    elements.append(Paragraph(f"- {item}", styles["MyBullet"]))
+        for entry in model.additional:
+            elements.append(Paragraph(f"<b>{entry.heading}</b>", styles["Body"]))
+            for item in entry.bullets:
+                elements.append(Paragraph(f"- {item}", styles["MyBullet"]))
 
     try:
         doc.build(elements)
-        return output_path
-    except Exception as e:
-        print(f"Error while building PDF: {e}")
+        return output
+    except Exception:
+        logger.exception("Error while building PDF")
         return None
 
-def generate_cover_letter_pdf(content, file_name):
-    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-    from reportlab.lib.pagesizes import A4
-    from reportlab.lib.units import inch
-    from reportlab.lib.enums import TA_LEFT
 
-    output_path = os.path.join(DATA_DIR, f"{file_name}.pdf")
-
-    doc = SimpleDocTemplate(output_path, pagesize=A4,
+def emit_cover_letter_pdf(model, output):
+    styles = pdf_styles()
+    doc = SimpleDocTemplate(output, pagesize=A4,
                             leftMargin=0.75 * inch, rightMargin=0.75 * inch,
                             topMargin=0.75 * inch, bottomMargin=0.75 * inch)
 
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='Letter', fontName='Times-Roman', fontSize=12, leading=16, alignment=TA_LEFT))
-
     elements = []
 
-    for line in content.strip().split("\n"):
-        if line.strip():
-            elements.append(Paragraph(line.strip(), styles["Letter"]))
+    for line in model.lines:
+        if line:
+            elements.append(Paragraph(line, styles["Letter"]))
             elements.append(Spacer(1, 6))
 
     try:
         doc.build(elements)
-        return output_path
-    except Exception as e:
-        print(f"Error building cover letter PDF: {e}")
+        return output
+    except Exception:
+        logger.exception("Error building cover letter PDF")
         return None
 
 
-def generate_resume_docx(content, file_name):
-    with open(USER_DATA_FILE, "r") as f:
-        user_data = json.load(f)
-
-    additional_info = extract_additional_sections()
-    extra_skills = additional_info.pop("Skills", [])
-
-    doc = Document()
-    doc.add_heading(user_data["name"], level=0)
-    contact = f"{user_data['email']} | {user_data['phone']} | {user_data['linkedin']}"
-    doc.add_paragraph(contact)
+def emit_resume_docx(model):
+    doc = new_docx("resume_docx")
+    doc.add_heading(model.name, level=0)
+    doc.add_paragraph(model.contact)
 
     doc.add_heading("Education", level=1)
-    for edu in user_data.get("education", []):
-        edu_summary = f"{edu['degree']} in {edu['field']} - {edu['institution']} ({edu['startDate']} to {edu['endDate']})"
-        doc.add_paragraph(edu_summary, style='Normal')
-        for line in edu.get("description", "").split('\n'):
-            if line.strip():
-                doc.add_paragraph(line.strip(), style='ListBullet')
+    for entry in model.education:
+        doc.add_paragraph(entry.heading, style='Normal')
+        for line in entry.bullets:
+            doc.add_paragraph(line, style='List Bullet')
 
     doc.add_heading("Experience", level=1)
-    if not content or not isinstance(content, str):
-        content = "Experience details not available."
-    for block in content.split("\n\n"):
-        lines = block.strip().split("\n")
-        if lines:
-            doc.add_paragraph(lines[0], style='Normal')
-            for bullet in lines[1:]:
-                if bullet.strip():
-                    doc.add_paragraph(bullet.strip(), style='ListBullet')
+    for entry in model.experience:
+        doc.add_paragraph(entry.heading, style='Normal')
+        for bullet in entry.bullets:
+            doc.add_paragraph(bullet, style='List Bullet')
 
     doc.add_heading("Skills", level=1)
-    all_skills = user_data.get("skills", []) + extra_skills
-    skills_text = ", ".join(all_skills)
-    doc.add_paragraph(skills_text)
+    doc.add_paragraph(model.skills)
 
-    if additional_info:
+    if model.additional:
         doc.add_heading("Additional Information", level=1)
-        for section, items in additional_info.items():
-            doc.add_paragraph(section + ":", style='Normal')
-            for item in items:
-                if item.strip():
-                    doc.add_paragraph(item.strip(), style='ListBullet')
+        for entry in model.additional:
+            doc.add_paragraph(entry.heading + ":", style='Normal')
+            for item in entry.bullets:
+                doc.add_paragraph(item.strip(), style='List Bullet')
 
     docx_io = io.BytesIO()
     doc.save(docx_io)
-    docx_io.seek(0)
-
-    return send_file(
-        docx_io,
-        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        as_attachment=True,
-        download_name=f"{file_name}.docx"
-    )
+    return docx_io.getvalue()
 
-def generate_cover_letter_docx(content, file_name):
-    from docx import Document
-    from docx.shared import Pt
-
-    doc = Document()
 
-    # Style setup
-    style = doc.styles['Normal']
-    font = style.font
-    font.name = 'Times New Roman'
-    font.size = Pt(12)
+def emit_cover_letter_docx(model):
+    doc = new_docx("cover_letter_docx")
 
-    for line in content.strip().split('\n'):
-        if line.strip():
-            doc.add_paragraph(line.strip())
-        else:
-            doc.add_paragraph("")
+    for line in model.lines:
+        doc.add_paragraph(line)
 
     buffer = io.BytesIO()
     doc.save(buffer)
-    buffer.seek(0)
+    return buffer.getvalue()
+
+
+def generate_resume_pdf(content):
+    pdf_io = io.BytesIO()
+    if emit_resume_pdf(document_model(content, "resume"), pdf_io) is None:
+        return None
+    return pdf_io.getvalue()
 
-    return send_file(
-        buffer,
-        mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-        as_attachment=True,
-        download_name=f"{file_name}.docx"
-    )
+
+def generate_cover_letter_pdf(content):
+    pdf_io = io.BytesIO()
+    if emit_cover_letter_pdf(document_model(content, "coverLetter"), pdf_io) is None:
+        return None
+    return pdf_io.getvalue()
+
+
+def generate_resume_docx(content):
+    return emit_resume_docx(document_model(content, "resume"))
+
+
+def generate_cover_letter_docx(content):
+    return emit_cover_letter_docx(document_model(content, "coverLetter"))
 
 
 def generate_experience_section(experiences):
@@ -786,113 +3779,140 @@ def generate_experience_summary(experiences):
 
 @app.route('/api/profile', methods=['GET'])
 def get_profile():
-    user_data = load_user_data()
+    user_data = get_user_data()
     return jsonify(user_data)
 
+@app.route('/api/artifacts/<artifact_id>', methods=['GET'])
+def get_artifact(artifact_id):
+    content = current_shard().artifacts.read(artifact_id)
+    if content is None:
+        return jsonify({"error": "Artifact not found"}), 404
+    response = jsonify({"id": artifact_id, "content": content})
+    # An artifact id is the hash of its content, so a response never goes stale
+    response.headers["Cache-Control"] = "private, max-age=31536000, immutable"
+    return response
+
 @app.route('/api/profile/update', methods=['POST'])
 def update_profile():
     try:
         data = request.json
-        print(f"Received profile update request with data: {data}")
-        
-        user_data = load_user_data()
+        logger.debug("Profile update payload: %s", data)
         
+        # Documents posted with their text are moved to the artifact store first
+        for key in ARTIFACT_LIST_KEYS:
+            if isinstance(data.get(key), list):
+                data[key] = [artifact_reference(entry) for entry in data[key]]
+
         # Update user profile with provided data
-        for key, value in data.items():
-            if key in user_data:
-                user_data[key] = value
+        def apply(user_data):
+            for key, value in data.items():
+                if key in user_data:
+                    user_data[key] = value
         
-        # Save the updated user data
-        success = save_user_data(user_data)
-        if success:
-            print("Profile updated successfully!")
-            return jsonify({"message": "Profile updated successfully"})
-        else:
-            print("Failed to save user data")
-            return jsonify({"error": "Failed to save profile data"}), 500
+        update_user_data(apply)
+        logger.debug("Profile updated")
+        if any(key in data for key in ARTIFACT_LIST_KEYS):
+            # Documents dropped from the lists leave their artifacts unreferenced
+            try:
+                current_shard().collect_artifacts()
+            except Exception:
+                logger.exception("Error deleting unreferenced artifacts")
+        return jsonify({"message": "Profile updated successfully"})
     except Exception as e:
-        print(f"Error in update_profile: {e}")
+        logger.exception("Error in update_profile")
         return jsonify({"error": str(e)}), 500
 
 @app.route('/api/profile/education/<education_id>', methods=['PUT'])
 def update_education_entry(education_id):
     try:
         data = request.json
-        print(f"Received education update for ID {education_id}: {data}")
-        
-        user_data = load_user_data()
+        logger.debug("Education update payload for %s: %s", education_id, data)
         
+        if not any(edu.get('id') == education_id for edu in get_user_data().get('education', [])):
+            logger.info("Education entry not found: %s", education_id)
+            return jsonify({"error": "Education entry not found"}), 404
+
         # Find and update the education entry
-        found = False
-        for i, edu in enumerate(user_data.get('education', [])):
-            if edu.get('id') == education_id:
-                # Update the education entry with the new data
-                user_data['education'][i] = {**edu, **data}
-                found = True
-                break
+        def apply(user_data):
+            for i, edu in enumerate(user_data.get('education', [])):
+                if edu.get('id') == education_id:
+                    # Update the education entry with the new data
+                    user_data['education'][i] = {**edu, **data}
+                    return user_data['education'][i]
+            return None
         
-        if not found:
-            print(f"Education entry not found: {education_id}")
+        updated = update_user_data(apply)
+        if updated is None:
+            logger.info("Education entry not found: %s", education_id)
             return jsonify({"error": "Education entry not found"}), 404
             
-        success = save_user_data(user_data)
-        if success:
-            print(f"Education entry {education_id} updated successfully")
-            return jsonify({"message": "Education entry updated successfully", "education": user_data['education'][i]})
-        else:
-            return jsonify({"error": "Failed to save education data"}), 500
+        logger.debug("Education entry %s updated", education_id)
+        return jsonify({"message": "Education entry updated successfully", "education": updated})
     except Exception as e:
-        print(f"Error updating education entry: {e}")
+        logger.exception("Error updating education entry")
         return jsonify({"error": str(e)}), 500
 
+# -------- Warm-up --------
+def warm_up():
+    """Load the LLM and rendering stacks and the local stores before the first request.
+
+    Call it from each worker (e.g. gunicorn's post_worker_init hook), or set
+    RESUMECRAFT_WARM_UP=1 with a preloading server so the master does it once
+    and forked workers share the loaded modules. No network connections or
+    database handles are opened, so it is safe to run before forking.
+    """
+    with startup_phase("warm-up"):
+        if isinstance(llm, LLMClient):
+            llm._client()
+        load_render_templates()
+        get_user_data()
+        current_shard().chat_history.count()
+        extract_additional_sections()
+
+
+startup_timings["module"] = time.perf_counter() - STARTUP_STARTED
+if os.environ.get("RESUMECRAFT_WARM_UP") == "1":
+    warm_up()
+if PROFILE_STARTUP:
+    logger.info("Startup profile:\n%s", startup_report())
+
+
 if __name__ == '__main__':
+    if "--profile-startup" in sys.argv:
+        warm_up()
+        logger.info("Startup profile after warm-up:\n%s", startup_report())
+        sys.exit(0)
+
     # Check if the data directory exists
     if not os.path.exists(DATA_DIR):
         os.makedirs(DATA_DIR)
-        print(f"Created directory: {DATA_DIR}")
+        logger.info("Created directory: %s", DATA_DIR)
     
     # Initialize user data file if it doesn't exist
     if not os.path.exists(USER_DATA_FILE):
-        initial_data = {
-            "name": "John Doe",
-            "email": "john@example.com",
-            "phone": "(123) 456-7890",
-            "linkedin": "linkedin.com/in/johndoe",
-            "education": [],
-            "workExperiences": [],
-            "skills": ["JavaScript", "React", "Python"],
-            "resumes": [],
-            "coverLetters": []
-        }
-        save_user_data(initial_data)
-        print(f"Created initial user data file at {os.path.abspath(USER_DATA_FILE)}")
+        save_user_data(_default_user_data())
+        current_shard().profile.flush()
+        logger.info("Created initial user data file at %s", os.path.abspath(USER_DATA_FILE))
     else:
-        print(f"Using existing user data file at {os.path.abspath(USER_DATA_FILE)}")
+        logger.info("Using existing user data file at %s", os.path.abspath(USER_DATA_FILE))
     
-    # Initialize chat history file if it doesn't exist
-    if not os.path.exists(CHAT_HISTORY_FILE):
-        save_chat_history([])
-        print(f"Created empty chat history file at {os.path.abspath(CHAT_HISTORY_FILE)}")
-    else:
-        print(f"Using existing chat history file at {os.path.abspath(CHAT_HISTORY_FILE)}")
+    # Initialize the chat history log, migrating chat_history.json if present
+    logger.info("Using chat history log at %s (%d chats)", os.path.abspath(CHAT_HISTORY_DIR),
+                current_shard().chat_history.count())
         
-    # Initialize AI conversations file if it doesn't exist
-    if not os.path.exists(AI_CONVERSATIONS_FILE):
-        save_ai_conversations({})
-        print(f"Created empty AI conversations file at {os.path.abspath(AI_CONVERSATIONS_FILE)}")
-    else:
-        print(f"Using existing AI conversations file at {os.path.abspath(AI_CONVERSATIONS_FILE)}")
+    # Open the AI conversation store, migrating ai_conversations.json if needed
+    conversation_store()
+    logger.info("Using %s AI conversation store", AI_CONVERSATION_BACKEND)
     
     print("Checking required packages...")
-    required_packages = ["markdown", "xhtml2pdf", "python-docx"]
+    # pip name -> import name; find_spec checks without importing the package
+    required_packages = {"openai": "openai", "httpx": "httpx", "reportlab": "reportlab", "python-docx": "docx"}
     missing_packages = []
     
-    # Import each package to check if it's installed
-    for package in required_packages:
-        try:
-            __import__(package)
+    for package, module in required_packages.items():
+        if importlib.util.find_spec(module) is not None:
             print(f"✓ {package} is installed")
-        except ImportError:
+        else:
             print(f"✗ {package} is not installed")
             missing_packages.append(package)
     
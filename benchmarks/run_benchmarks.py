@@ -0,0 +1,359 @@
+"""Offline benchmarks for the Flask endpoints and the render/storage helpers.
+
+Each profile size runs in its own subprocess against a throwaway data
+directory, with the model client replaced by an in-process stub, so no
+network or API key is needed. Results (throughput and p50/p95/p99 latency per
+benchmark) are written as JSON and can be compared against an earlier run:
+
+    python benchmarks/run_benchmarks.py --sizes small,large --output bench_results.json
+    python benchmarks/run_benchmarks.py --baseline bench_results.json --output new.json
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_MARKER = "BENCHMARK_RESULTS "
+
+# experiences, bullets per experience, saved chats, AI conversations, messages per conversation
+SIZES = {
+    "small": {"experiences": 2, "bullets": 4, "chats": 10, "conversations": 10, "messages": 10},
+    "medium": {"experiences": 10, "bullets": 5, "chats": 200, "conversations": 200, "messages": 20},
+    "large": {"experiences": 50, "bullets": 6, "chats": 2000, "conversations": 1000, "messages": 40},
+    "xlarge": {"experiences": 200, "bullets": 8, "chats": 5000, "conversations": 3000, "messages": 60},
+}
+
+WORDS = ("led drove built scaled optimized reduced launched analytics supplier sourcing strategy "
+         "platform revenue pipeline migration latency customers governance roadmap python sql").split()
+
+
+def sentence(rng, n=14):
+    return " ".join(rng.choice(WORDS) for _ in range(n)).capitalize() + "."
+
+
+def synthetic_profile(rng, spec):
+    return {
+        "name": "Bench Candidate",
+        "email": "bench@example.com",
+        "phone": "(555) 010-0000",
+        "linkedin": "linkedin.com/in/bench",
+        "education": [
+            {"id": f"edu-{i}", "institution": f"University {i}", "degree": "MS", "field": "Engineering",
+             "startDate": "2010", "endDate": "2012", "description": "\n".join(sentence(rng) for _ in range(3))}
+            for i in range(3)
+        ],
+        "workExperiences": [
+            {"id": f"exp-{i}", "company": f"Company {i}", "position": f"Role {i}", "startDate": "2015",
+             "endDate": "2020", "bullets": [sentence(rng) for _ in range(spec["bullets"])]}
+            for i in range(spec["experiences"])
+        ],
+        "skills": [rng.choice(WORDS).title() for _ in range(25)],
+        "resumes": [],
+        "coverLetters": []
+    }
+
+
+def resume_content(profile):
+    return "\n\n".join(
+        f"{exp['position']} | {exp['company']} | {exp['startDate']} – {exp['endDate']}\n"
+        + "\n".join(f"• {bullet}" for bullet in exp["bullets"])
+        for exp in profile["workExperiences"]
+    )
+
+
+class StubStream:
+    """Text deltas with the close() that app.LLMClient.stream() results have."""
+
+    def __init__(self, deltas):
+        self._deltas = iter(deltas)
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return next(self._deltas)
+
+    def close(self):
+        self.closed = True
+
+
+class StubLLM:
+    """Stands in for app.llm: canned replies after an optional fixed latency."""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+
+    def complete(self, messages, model=None, timeout=None):
+        time.sleep(self.latency)
+        return "Stub reply: " + messages[-1]["content"][:2000]
+
+    def stream(self, messages, model=None, timeout=None):
+        time.sleep(self.latency)
+        return StubStream(["Stub ", "streamed ", "reply"])
+
+
+def percentile(sorted_samples, pct):
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_samples) - 1, int(round(pct / 100.0 * len(sorted_samples) + 0.5)) - 1))
+    return sorted_samples[index]
+
+
+def measure(fn, iterations, warmup=2):
+    for _ in range(warmup):
+        fn()
+    samples = []
+    start = time.perf_counter()
+    for _ in range(iterations):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    total = time.perf_counter() - start
+    samples.sort()
+    return {
+        "iterations": iterations,
+        "throughput_per_s": iterations / total if total else float("inf"),
+        "mean_ms": 1000 * sum(samples) / len(samples),
+        "p50_ms": 1000 * percentile(samples, 50),
+        "p95_ms": 1000 * percentile(samples, 95),
+        "p99_ms": 1000 * percentile(samples, 99),
+    }
+
+
+def run_size(size, iterations, llm_latency, seed):
+    """Benchmark one profile size in this process and return {benchmark: stats}."""
+    spec = SIZES[size]
+    rng = random.Random(seed)
+    data_dir = tempfile.mkdtemp(prefix=f"resumecraft-bench-{size}-")
+    os.environ["RESUMECRAFT_DATA_DIR"] = data_dir
+    os.environ.setdefault("RESUMECRAFT_LOG_LEVEL", "WARNING")
+    sys.path.insert(0, REPO_DIR)
+
+    import app as resumecraft
+    from docx import Document
+
+    resumecraft.llm = StubLLM(llm_latency)
+    profile = synthetic_profile(rng, spec)
+    resumecraft.save_user_data(profile)
+    resumecraft.flush_write_behind_stores()
+
+    resume_doc = Document()
+    table = resume_doc.add_table(rows=4, cols=2)
+    for row, header in enumerate(["Skills:", "Certifications:", "Awards:", "Languages:"]):
+        table.cell(row, 0).text = header
+        table.cell(row, 1).text = "\n".join(sentence(rng, 4) for _ in range(5))
+    resume_path = os.path.join(resumecraft.RESUMES_DIR, "res.docx")
+    resume_doc.save(resume_path)
+
+    for i in range(spec["chats"]):
+        resumecraft.append_chat_record({
+            "id": f"chat-{i}", "jobTitle": f"Job {i}", "timestamp": datetime.now().isoformat(),
+            "messages": [{"role": "user", "content": sentence(rng)} for _ in range(spec["messages"])]
+        })
+    store = resumecraft.conversation_store()
+    for i in range(spec["conversations"]):
+        store.upsert(f"conv-{i}", {
+            "jobTitle": f"Job {i}", "lastUpdated": datetime.now().isoformat(),
+            "messages": [{"role": "user", "content": sentence(rng)} for _ in range(spec["messages"])]
+        })
+
+    client = resumecraft.app.test_client()
+    content = resume_content(profile)
+    letter = "Dear Hiring Manager,\n" + "\n".join(sentence(rng, 30) for _ in range(6)) + "\nSincerely,\nBench"
+    job = {"jobTitle": "Staff Engineer", "jobDescription": " ".join(sentence(rng) for _ in range(20))}
+    chat_request = {"messages": [{"role": "user", "content": sentence(rng)} for _ in range(spec["messages"])]}
+
+    def request(method, url, **kwargs):
+        def call():
+            response = getattr(client, method)(url, **kwargs)
+            if response.status_code >= 400:
+                raise RuntimeError(f"{method.upper()} {url} returned {response.status_code}")
+            response.get_data()
+        return call
+
+    def uncached_download(fmt, body):
+        def call():
+            resumecraft._render_cache.clear()
+            resumecraft._render_cache_state["bytes"] = 0
+            resumecraft._document_models.clear()
+            if fmt == "bundle":
+                request("post", "/api/document/download/bundle", json={"content": body, "fileName": "bench"})()
+            else:
+                request("post", "/api/document/download", json={"content": body, "fileName": "bench", "format": fmt})()
+        return call
+
+    def append_turn():
+        conversation = store.get("conv-append")
+        count = len(conversation["messages"]) if conversation else 0
+        request("post", "/api/ai-conversation/conv-append/append",
+                json={"messages": [{"role": "user", "content": "turn"}], "baseCount": count})()
+
+    def stream_reply():
+        response = client.post("/api/chat/respond/stream", json=chat_request)
+        body = response.get_data()
+        if response.status_code >= 400 or b"event: done" not in body:
+            raise RuntimeError(f"POST /api/chat/respond/stream failed: {body[:200]!r}")
+
+    def async_job():
+        response = client.post("/api/resume/generate/async", json=dict(job, regenerate=True))
+        if response.status_code != 202:
+            raise RuntimeError(f"POST /api/resume/generate/async returned {response.status_code}")
+        job_id = response.get_json()["jobId"]
+        while True:
+            status = client.get(f"/api/jobs/{job_id}").get_json()["status"]
+            if status == "completed":
+                return
+            if status == "failed":
+                raise RuntimeError(f"job {job_id} failed")
+            time.sleep(0.001)
+
+    def reparse_sections():
+        resumecraft.parse_additional_sections(resume_path)
+
+    benchmarks = {
+        # endpoints
+        "GET /api/profile": request("get", "/api/profile"),
+        "POST /api/profile/update": request("post", "/api/profile/update", json={"skills": profile["skills"]}),
+        "POST /api/resume/generate": request("post", "/api/resume/generate", json=dict(job, regenerate=True)),
+        "POST /api/resume/generate (cached)": request("post", "/api/resume/generate", json=job),
+        "POST /api/resume/generate/batch (4 jobs)": request("post", "/api/resume/generate/batch", json={
+            "jobs": [dict(job, jobTitle=f"Role {i}") for i in range(4)], "regenerate": True}),
+        "POST /api/resume/generate/async + GET /api/jobs/<id>": async_job,
+        "POST /api/resume/keyword-coverage": request("post", "/api/resume/keyword-coverage", json=job),
+        "POST /api/document/download pdf": uncached_download("pdf", content),
+        "POST /api/document/download docx": uncached_download("docx", content),
+        "POST /api/document/download pdf (cached)": request(
+            "post", "/api/document/download", json={"content": content, "fileName": "bench", "format": "pdf"}),
+        "POST /api/document/download cover pdf": uncached_download("pdf", letter),
+        "POST /api/document/download/bundle": uncached_download("bundle", content),
+        "POST /api/chat/save": request("post", "/api/chat/save", json={
+            "chatMessages": [{"role": "user", "content": "hello"}], "jobTitle": "Bench"}),
+        "GET /api/chat/history": request("get", "/api/chat/history"),
+        "GET /api/chat/history?limit=20&fields=id,jobTitle": request(
+            "get", "/api/chat/history?limit=20&order=desc&fields=id,jobTitle"),
+        "POST /api/chat/respond": request("post", "/api/chat/respond", json=chat_request),
+        "POST /api/chat/respond/stream": stream_reply,
+        "POST /api/ai-conversation/save": request("post", "/api/ai-conversation/save", json={
+            "conversationId": "conv-0", "jobTitle": "Job 0",
+            "messages": [{"role": "user", "content": "m"} for _ in range(spec["messages"])]}),
+        "POST /api/ai-conversation/<id>/append": append_turn,
+        "GET /api/ai-conversation/<id>": request("get", "/api/ai-conversation/conv-1"),
+        "GET /api/ai-conversation/list": request("get", "/api/ai-conversation/list"),
+        "GET /api/ai-conversation/list?sort&limit=20": request(
+            "get", "/api/ai-conversation/list?sort=lastUpdated&order=desc&limit=20"),
+        # render and storage helpers
+        "render: generate_resume_pdf": lambda: resumecraft.generate_resume_pdf(content),
+        "render: generate_resume_docx": lambda: resumecraft.generate_resume_docx(content),
+        "render: generate_cover_letter_pdf": lambda: resumecraft.generate_cover_letter_pdf(letter),
+        "render: generate_cover_letter_docx": lambda: resumecraft.generate_cover_letter_docx(letter),
+        "parse: parse_additional_sections": reparse_sections,
+        "parse: extract_additional_sections": resumecraft.extract_additional_sections,
+        "storage: get_user_data": resumecraft.get_user_data,
+        "storage: update_user_data + flush": lambda: (
+            resumecraft.update_user_data(lambda data: data.__setitem__("name", "Bench Candidate")),
+            resumecraft.flush_write_behind_stores()),
+        "storage: load_chat_history": resumecraft.load_chat_history,
+    }
+
+    results = {}
+    for name, fn in benchmarks.items():
+        try:
+            results[name] = measure(fn, iterations)
+        except Exception as e:
+            results[name] = {"error": str(e)}
+        print(f"  [{size}] {name}: " + (
+            f"p50 {results[name]['p50_ms']:.2f} ms, p95 {results[name]['p95_ms']:.2f} ms, "
+            f"{results[name]['throughput_per_s']:.1f}/s" if "error" not in results[name]
+            else f"ERROR {results[name]['error']}"), file=sys.stderr)
+    resumecraft.flush_write_behind_stores()
+    return results
+
+
+def compare(baseline, current, threshold):
+    """Print per-benchmark changes against a baseline run; return the number of regressions."""
+    regressions = 0
+    print(f"\n{'size':8} {'benchmark':55} {'p50 base':>10} {'p50 now':>10} {'change':>8}")
+    for size, benches in current["results"].items():
+        for name, stats in benches.items():
+            base = baseline.get("results", {}).get(size, {}).get(name)
+            if not base or "error" in base or "error" in stats:
+                continue
+            change = 100.0 * (stats["p50_ms"] - base["p50_ms"]) / base["p50_ms"] if base["p50_ms"] else 0.0
+            flag = ""
+            # Sub-50µs swings are timer noise, not regressions
+            if change > threshold and stats["p50_ms"] - base["p50_ms"] > 0.05:
+                regressions += 1
+                flag = "  REGRESSION"
+            print(f"{size:8} {name[:55]:55} {base['p50_ms']:10.2f} {stats['p50_ms']:10.2f} {change:+7.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="small,medium,large",
+                        help=f"comma-separated subset of {','.join(SIZES)}")
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="stub model latency in seconds")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", help="earlier results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="p50 slowdown (%%) reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(RESULTS_MARKER + json.dumps(run_size(args.worker, args.iterations, args.llm_latency, args.seed)))
+        return 0
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    results = {}
+    for size in sizes:
+        print(f"Running {size} benchmarks...", file=sys.stderr)
+        # A fresh interpreter per size keeps caches and data directories independent
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", size, "--iterations", str(args.iterations),
+             "--llm-latency", str(args.llm_latency), "--seed", str(args.seed)],
+            check=True, stdout=subprocess.PIPE, text=True
+        ).stdout
+        # The app logs to stdout from a background thread, so find the results line
+        line = next(line for line in output.splitlines() if line.startswith(RESULTS_MARKER))
+        results[size] = json.loads(line[len(RESULTS_MARKER):])
+
+    report = {
+        "meta": {
+            "createdAt": datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "iterations": args.iterations,
+            "llmLatency": args.llm_latency,
+            "sizes": {size: SIZES[size] for size in sizes},
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}", file=sys.stderr)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), report, args.threshold)
+        print(f"\n{regressions} regression(s) above {args.threshold:.0f}%")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
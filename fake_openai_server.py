@@ -0,0 +1,114 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Serves ``POST /v1/chat/completions`` (plain and streamed) with canned,
+deterministic replies and configurable latency and failure rates, so the app
+can be run, tested and benchmarked offline:
+
+    python fake_openai_server.py --port 8001 --latency 0.8
+    RESUMECRAFT_LLM_BASE_URL=http://localhost:8001/v1 python app.py
+"""
+import argparse
+import json
+import random
+import time
+import uuid
+
+from flask import Flask, Response, jsonify, request
+
+
+def create_app(latency=0.0, jitter=0.0, token_delay=0.0, error_rate=0.0, reply_words=120):
+    app = Flask(__name__)
+    app.config.update(LATENCY=latency, JITTER=jitter, TOKEN_DELAY=token_delay,
+                      ERROR_RATE=error_rate, REPLY_WORDS=reply_words)
+    stats = {"requests": 0, "errors": 0}
+    app.config["STATS"] = stats
+
+    def fake_reply(messages):
+        # Echo enough of the prompt to make replies prompt-dependent but stable
+        prompt = messages[-1]["content"] if messages else ""
+        words = prompt.split() or ["ok"]
+        body = [words[i % len(words)] for i in range(app.config["REPLY_WORDS"])]
+        return "Fake completion: " + " ".join(body)
+
+    def usage(messages, reply):
+        prompt_tokens = sum(len(m.get("content", "")) // 4 + 4 for m in messages)
+        completion_tokens = len(reply) // 4
+        return {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    @app.route('/v1/models', methods=['GET'])
+    def models():
+        return jsonify({"object": "list", "data": [{"id": "gpt-4o-mini", "object": "model"}]})
+
+    @app.route('/v1/stats', methods=['GET'])
+    def get_stats():
+        return jsonify(stats)
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        stats["requests"] += 1
+        payload = request.get_json(force=True)
+        messages = payload.get("messages", [])
+        model = payload.get("model", "gpt-4o-mini")
+
+        delay = app.config["LATENCY"] + random.uniform(0, app.config["JITTER"])
+        if random.random() < app.config["ERROR_RATE"]:
+            stats["errors"] += 1
+            status = random.choice([429, 500, 503])
+            return jsonify({"error": {"message": "Injected failure", "type": "fake_error"}}), status
+
+        reply = fake_reply(messages)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+
+        if not payload.get("stream"):
+            time.sleep(delay)
+            return jsonify({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant", "content": reply}}],
+                "usage": usage(messages, reply)
+            })
+
+        def generate():
+            # Latency applies to the first token; token_delay between tokens
+            time.sleep(delay)
+            for i, word in enumerate(reply.split(" ")):
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": model,
+                    "choices": [{"index": 0, "finish_reason": None,
+                                 "delta": {"content": word if i == 0 else " " + word}}]
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+                if app.config["TOKEN_DELAY"]:
+                    time.sleep(app.config["TOKEN_DELAY"])
+            final = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                     "model": model, "choices": [{"index": 0, "finish_reason": "stop", "delta": {}}]}
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return Response(generate(), mimetype='text/event-stream')
+
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible chat completions server")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds before the response / first token")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this many seconds")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 429/5xx")
+    parser.add_argument("--reply-words", type=int, default=120)
+    args = parser.parse_args()
+
+    fake = create_app(latency=args.latency, jitter=args.jitter, token_delay=args.token_delay,
+                      error_rate=args.error_rate, reply_words=args.reply_words)
+    print(f"Fake OpenAI server on http://localhost:{args.port}/v1")
+    fake.run(port=args.port, threaded=True)
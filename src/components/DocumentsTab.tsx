@@ -5,14 +5,18 @@ import { Button } from '@/components/ui/button';
 import { ScrollArea } from '@/components/ui/scroll-area';
 import { FileText, Eye, Trash2 } from 'lucide-react';
 import DocumentPreviewModal from './DocumentPreviewModal';
+import { ResumeService } from '@/services/ResumeService';
 
 export interface Document {
   id: string;
   title: string;
   createdAt: string;
-  content: string;
+  content?: string;
+  artifactId?: string;
 }
 
+type LoadedDocument = Document & { content: string };
+
 interface DocumentsTabProps {
   resumes: Document[];
   coverLetters: Document[];
@@ -26,11 +30,19 @@ const DocumentsTab = ({
   onDeleteResume = () => {},
   onDeleteCoverLetter = () => {}
 }: DocumentsTabProps) => {
-  const [previewDocument, setPreviewDocument] = useState<Document | null>(null);
+  const [previewDocument, setPreviewDocument] = useState<LoadedDocument | null>(null);
   const [isPreviewOpen, setIsPreviewOpen] = useState(false);
 
-  const handlePreview = (document: Document) => {
-    setPreviewDocument(document);
+  const handlePreview = async (document: Document) => {
+    let content = document.content;
+    if (content === undefined && document.artifactId) {
+      try {
+        content = await ResumeService.getArtifact(document.artifactId);
+      } catch (error) {
+        console.error("Error loading document:", error);
+      }
+    }
+    setPreviewDocument({ ...document, content: content ?? "" });
     setIsPreviewOpen(true);
   };
 
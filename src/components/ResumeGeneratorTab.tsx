@@ -8,7 +8,7 @@ import { useAuth } from '@/context/AuthContext';
 import { ScrollArea } from '@/components/ui/scroll-area';
 import { useToast } from '@/components/ui/use-toast';
 import { Loader2, FileText, Download, Upload, ThumbsUp, ThumbsDown, RefreshCw, Clipboard, MessageSquare, FileUp, Edit, Check, X } from 'lucide-react';
-import { ResumeService, ResumeGenerationRequest, ChatMessage } from '@/services/ResumeService';
+import { ResumeService, ResumeGenerationRequest, ChatMessage, ApiError, KeywordCoverage } from '@/services/ResumeService';
 import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import { Popover, PopoverContent, PopoverTrigger } from '@/components/ui/popover';
 
@@ -29,6 +29,8 @@ const ResumeGeneratorTab = ({ onComplete }) => {
   const [downloadFormat, setDownloadFormat] = useState<'pdf' | 'docx'>('pdf');
   const [isSavingChat, setIsSavingChat] = useState(false);
   const [conversationId, setConversationId] = useState<string | null>(null);
+  // Number of chat messages the server already has for conversationId
+  const savedMessageCountRef = useRef(0);
   
   const resumeFileInputRef = useRef<HTMLInputElement>(null);
   const chatEndRef = useRef<HTMLDivElement>(null);
@@ -43,6 +45,8 @@ const ResumeGeneratorTab = ({ onComplete }) => {
     coverLetter: string | null;
   }>({ resume: null, coverLetter: null });
 
+  const [keywordCoverage, setKeywordCoverage] = useState<KeywordCoverage | null>(null);
+
   useEffect(() => {
     if (chatEndRef.current) {
       chatEndRef.current.scrollIntoView({ behavior: 'smooth' });
@@ -122,6 +126,8 @@ const ResumeGeneratorTab = ({ onComplete }) => {
         resume: response.resume,
         coverLetter: response.coverLetter
       });
+
+      setKeywordCoverage(response.keywordCoverage ?? null);
       
       toast({
         title: "Generation complete",
@@ -139,6 +145,29 @@ const ResumeGeneratorTab = ({ onComplete }) => {
     }
   };
 
+  // Sends only the messages the server hasn't seen; falls back to a full save
+  // when there is no conversation yet or the server's copy has diverged (409).
+  const persistConversation = async (messages: ChatMessage[], title: string): Promise<string> => {
+    if (conversationId) {
+      try {
+        const baseCount = savedMessageCountRef.current;
+        savedMessageCountRef.current = await ResumeService.appendAIConversation(
+          conversationId,
+          messages.slice(baseCount),
+          baseCount,
+          title
+        );
+        return conversationId;
+      } catch (error) {
+        if (!(error instanceof ApiError && error.status === 409)) throw error;
+      }
+    }
+    const id = await ResumeService.saveAIConversation(conversationId, title, messages);
+    savedMessageCountRef.current = messages.length;
+    setConversationId(id);
+    return id;
+  };
+
   const handleSave = async () => {
     if (editedContent.resume) {
       addResume({
@@ -160,13 +189,7 @@ const ResumeGeneratorTab = ({ onComplete }) => {
         
         const chatId = await ResumeService.saveChatHistory(chatMessages, jobTitle);
         
-        const convId = await ResumeService.saveAIConversation(
-          conversationId,
-          jobTitle,
-          chatMessages
-        );
-        
-        setConversationId(convId);
+        await persistConversation(chatMessages, jobTitle);
         
         toast({
           title: "Chat history saved",
@@ -221,6 +244,22 @@ const ResumeGeneratorTab = ({ onComplete }) => {
     }
   };
 
+  const handleBundleDownload = async (content, fileName) => {
+    const success = await ResumeService.downloadDocumentBundle(content, fileName);
+    if (success) {
+      toast({
+        title: "Documents downloaded",
+        description: `Your ${fileName} has been downloaded as PDF and Word in one ZIP file.`
+      });
+    } else {
+      toast({
+        title: "Download failed",
+        description: "There was an error downloading your documents.",
+        variant: "destructive"
+      });
+    }
+  };
+
   const handleSendMessage = async () => {
     if (!messageInput.trim()) return;
   
@@ -234,25 +273,24 @@ const ResumeGeneratorTab = ({ onComplete }) => {
     setMessageInput('');
   
     try {
-      const reply = await ResumeService.getAIChatReply(newMessages);
-  
-      const updatedMessages: ChatMessage[] = [
+      // Show the reply as it streams in, in a pending assistant message
+      const replyTimestamp = new Date().toISOString();
+      let streamed = '';
+      const withReply = (content: string): ChatMessage[] => [
         ...newMessages,
-        {
-          role: 'assistant',
-          content: reply,
-          timestamp: new Date().toISOString()
-        }
+        { role: 'assistant', content, timestamp: replyTimestamp }
       ];
+      setChatMessages(withReply(''));
+      const reply = await ResumeService.streamAIChatReply(newMessages, (delta) => {
+        streamed += delta;
+        setChatMessages(withReply(streamed));
+      });
+  
+      const updatedMessages = withReply(reply);
       setChatMessages(updatedMessages);
   
       if (conversationId || updatedMessages.length > 1) {
-        const id = await ResumeService.saveAIConversation(
-          conversationId,
-          jobTitle || "Untitled Job",
-          updatedMessages
-        );
-        if (!conversationId) setConversationId(id);
+        await persistConversation(updatedMessages, jobTitle || "Untitled Job");
       }
     } catch (error) {
       console.error("Failed to get AI response:", error);
@@ -276,6 +314,7 @@ const ResumeGeneratorTab = ({ onComplete }) => {
           jobTitle,
           [initialMessage]
         ).then(id => {
+          savedMessageCountRef.current = 1;
           setConversationId(id);
         }).catch(error => {
           console.error("Failed to save initial AI conversation:", error);
@@ -490,6 +529,14 @@ const ResumeGeneratorTab = ({ onComplete }) => {
                               >
                                 Download as Word
                               </Button>
+                              <Button 
+                                size="sm" 
+                                variant="ghost"
+                                onClick={() => handleBundleDownload(editedContent.resume, `Resume_${jobTitle}`)}
+                                className="justify-start"
+                              >
+                                Download both (ZIP)
+                              </Button>
                             </div>
                           </PopoverContent>
                         </Popover>
@@ -519,6 +566,16 @@ const ResumeGeneratorTab = ({ onComplete }) => {
                     </div>
                   </ScrollArea>
                 )}
+                {keywordCoverage && keywordCoverage.total > 0 && (
+                  <div className="mt-3 text-sm text-gray-600">
+                    <span className="font-medium">
+                      Keyword coverage: {keywordCoverage.covered}/{keywordCoverage.total} ({Math.round(keywordCoverage.coverage * 100)}%)
+                    </span>
+                    {keywordCoverage.missing.length > 0 && (
+                      <span> · Missing: {keywordCoverage.missing.join(', ')}</span>
+                    )}
+                  </div>
+                )}
               </CardContent>
               <CardFooter className="flex justify-between">
                 <div className="flex gap-2">
@@ -593,6 +650,14 @@ const ResumeGeneratorTab = ({ onComplete }) => {
                               >
                                 Download as Word
                               </Button>
+                              <Button 
+                                size="sm" 
+                                variant="ghost"
+                                onClick={() => handleBundleDownload(editedContent.coverLetter, `CoverLetter_${jobTitle}`)}
+                                className="justify-start"
+                              >
+                                Download both (ZIP)
+                              </Button>
                             </div>
                           </PopoverContent>
                         </Popover>
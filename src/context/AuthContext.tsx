@@ -36,18 +36,22 @@ export type WorkExperience = {
   bullets: string[];
 };
 
+// Saved documents come back from the server as references; the text is
+// fetched by artifactId when needed. Newly added ones carry their content.
 export type Resume = {
   id: string;
   title: string;
   createdAt: string;
-  content: string;
+  content?: string;
+  artifactId?: string;
 };
 
 export type CoverLetter = {
   id: string;
   title: string;
   createdAt: string;
-  content: string;
+  content?: string;
+  artifactId?: string;
 };
 
 type AuthContextType = {
@@ -1,5 +1,15 @@
 // This service will handle communication with the Python backend
 
+// Carries the HTTP status so callers can react to specific failures (e.g. 409)
+export class ApiError extends Error {
+  status: number;
+
+  constructor(status: number) {
+    super(`API error: ${status}`);
+    this.status = status;
+  }
+}
+
 export interface ResumeGenerationRequest {
   jobTitle: string;
   jobDescription: string;
@@ -10,9 +20,25 @@ export interface ResumeGenerationRequest {
   existingResumeFormat?: string; // Added to support custom formatting based on uploaded resume
 }
 
+export interface KeywordCoverageEntry {
+  keyword: string;
+  occurrences: number;
+  bullets: number;
+  covered: boolean;
+}
+
+export interface KeywordCoverage {
+  keywords: KeywordCoverageEntry[];
+  covered: number;
+  total: number;
+  coverage: number;
+  missing: string[];
+}
+
 export interface ResumeGenerationResponse {
   resume: string;
   coverLetter: string;
+  keywordCoverage?: KeywordCoverage;
 }
 
 export interface UserProfile {
@@ -397,6 +423,40 @@ export const ResumeService = {
     }
   },
   
+  downloadDocumentBundle: async (content: string, fileName: string): Promise<boolean> => {
+    try {
+      const response = await fetch('http://localhost:5000/api/document/download/bundle', {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          content,
+          fileName,
+          formats: ['pdf', 'docx']
+        }),
+      });
+
+      if (!response.ok) {
+        throw new Error(`API error: ${response.status}`);
+      }
+
+      const blob = await response.blob();
+      const downloadUrl = window.URL.createObjectURL(blob);
+      const link = document.createElement('a');
+      link.href = downloadUrl;
+      link.download = `${fileName}.zip`;
+      document.body.appendChild(link);
+      link.click();
+      document.body.removeChild(link);
+
+      return true;
+    } catch (error) {
+      console.error("Error downloading document bundle:", error);
+      return false;
+    }
+  },
+  
   uploadResume: async (file: File): Promise<{filename: string, path: string}> => {
     try {
       console.log("Uploading resume file:", file.name);
@@ -501,6 +561,33 @@ export const ResumeService = {
     }
   },
   
+  // Sends only the messages added since baseCount; throws on a 409 so the caller can resync
+  appendAIConversation: async (conversationId: string, newMessages: ChatMessage[], baseCount: number, jobTitle?: string): Promise<number> => {
+    try {
+      const response = await fetch(`http://localhost:5000/api/ai-conversation/${conversationId}/append`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+        },
+        body: JSON.stringify({
+          messages: newMessages,
+          baseCount,
+          jobTitle
+        })
+      });
+
+      if (!response.ok) {
+        throw new ApiError(response.status);
+      }
+
+      const result = await response.json();
+      return result.messageCount;
+    } catch (error) {
+      console.error("Error appending to AI conversation:", error);
+      throw error;
+    }
+  },
+
   getAIConversation: async (conversationId: string): Promise<AIConversation> => {
     try {
       console.log("Fetching AI conversation:", conversationId);
@@ -520,6 +607,22 @@ export const ResumeService = {
     }
   },
   
+  getArtifact: async (artifactId: string): Promise<string> => {
+    try {
+      const response = await fetch(`http://localhost:5000/api/artifacts/${artifactId}`);
+      
+      if (!response.ok) {
+        throw new Error(`API error: ${response.status}`);
+      }
+      
+      const result = await response.json();
+      return result.content;
+    } catch (error) {
+      console.error("Error fetching artifact:", error);
+      throw error;
+    }
+  },
+  
   listAIConversations: async (): Promise<AIConversationSummary[]> => {
     try {
       console.log("Listing AI conversations");
@@ -557,5 +660,55 @@ export const ResumeService = {
       console.error("Error in getAIChatReply:", error);
       return "Sorry, something went wrong while generating a response.";
     }
+  },
+
+  // Streams the reply token by token; onDelta is called as each piece arrives
+  streamAIChatReply: async (messages: ChatMessage[], onDelta: (delta: string) => void): Promise<string> => {
+    try {
+      const response = await fetch("http://localhost:5000/api/chat/respond/stream", {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ messages })
+      });
+
+      if (!response.ok || !response.body) {
+        throw new Error(`API error: ${response.status}`);
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+      let reply = "";
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        const events = buffer.split("\n\n");
+        buffer = events.pop() || "";
+        for (const event of events) {
+          const lines = event.split("\n");
+          const type = lines.find(line => line.startsWith("event: "))?.slice(7) || "message";
+          const dataLine = lines.find(line => line.startsWith("data: "));
+          if (!dataLine) continue;
+          const payload = JSON.parse(dataLine.slice(6));
+
+          if (type === "done") {
+            reply = payload.reply;
+          } else if (type === "error") {
+            throw new Error(payload.error);
+          } else if (payload.delta) {
+            reply += payload.delta;
+            onDelta(payload.delta);
+          }
+        }
+      }
+
+      return reply || "Sorry, I didn't quite get that.";
+    } catch (error) {
+      console.error("Error in streamAIChatReply:", error);
+      return "Sorry, something went wrong while generating a response.";
+    }
   }
 };
\ No newline at end of file
@@ -0,0 +1,91 @@
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import pytest
+
+# app.py reads its data directory at import time; keep test runs out of the repo
+os.environ.setdefault("RESUMECRAFT_DATA_DIR", tempfile.mkdtemp(prefix="resumecraft-tests-"))
+os.environ.setdefault("RESUMECRAFT_LOG_LEVEL", "WARNING")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as resumecraft  # noqa: E402
+
+
+class StubStream:
+    """Text deltas with the close() that app.LLMClient.stream() results have."""
+
+    def __init__(self, deltas, error=None):
+        self._deltas = iter(deltas)
+        self._error = error
+        self.closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._deltas)
+        except StopIteration:
+            if self._error is not None:
+                raise self._error
+            raise
+
+    def close(self):
+        self.closed = True
+
+
+class StubLLM:
+    """Stands in for app.llm and records every prompt it is sent."""
+
+    def __init__(self, deltas=("Stub ", "streamed ", "reply"), stream_error=None, fail_on=None, slow_on=None):
+        self.calls = []
+        self.streams = []
+        self.deltas = deltas
+        self.stream_error = stream_error
+        self.fail_on = fail_on  # prompts containing this text raise
+        self.slow_on = slow_on  # prompts containing this text take a moment
+
+    def complete(self, messages, model=None, timeout=None):
+        self.calls.append(messages)
+        prompt = messages[-1]["content"]
+        if self.slow_on and self.slow_on in prompt:
+            time.sleep(0.2)
+        if self.fail_on and self.fail_on in prompt:
+            raise RuntimeError("model unavailable")
+        return "Stub reply: " + prompt
+
+    def stream(self, messages, model=None, timeout=None):
+        self.calls.append(messages)
+        stream = StubStream(self.deltas, self.stream_error)
+        self.streams.append(stream)
+        return stream
+
+
+@pytest.fixture
+def stub_llm(monkeypatch):
+    stub = StubLLM()
+    monkeypatch.setattr(resumecraft, "llm", stub)
+    return stub
+
+
+@pytest.fixture
+def client():
+    # Each test gets its own user, and so its own storage shard
+    user_id = f"test-{uuid.uuid4().hex[:12]}"
+    test_client = resumecraft.app.test_client()
+    test_client.environ_base["HTTP_X_USER_ID"] = user_id
+    test_client.user_id = user_id
+    return test_client
+
+
+@pytest.fixture
+def uploaded_resume(client):
+    """Give the client's user an uploaded resume, which generation requires."""
+    resumes_dir = resumecraft.user_shard(client.user_id).resumes_dir
+    os.makedirs(resumes_dir, exist_ok=True)
+    with open(os.path.join(resumes_dir, "res.docx"), "wb") as f:
+        f.write(b"not parsed by generation")
+    return client
@@ -0,0 +1,82 @@
+"""Generated documents in the per-user, content-addressed artifact store."""
+import json
+import os
+import time
+import uuid
+
+import app as resumecraft
+
+
+def make_old(path):
+    stamp = time.time() - resumecraft.ARTIFACT_GC_GRACE_SECONDS - 60
+    os.utime(path, (stamp, stamp))
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = resumecraft.ArtifactStore(str(tmp_path / "artifacts"))
+    first = store.put("Experienced engineer")
+    assert store.put("Experienced engineer") == first
+    assert store.put("Different text") != first
+    files = [name for _, _, names in os.walk(tmp_path / "artifacts") for name in names]
+    assert sorted(files) == sorted([f"{first}.txt", f"{store.put('Different text')}.txt"])
+    assert store.read(first) == "Experienced engineer"
+    assert store.read("../../etc/passwd") is None
+
+
+def test_inline_documents_are_migrated_when_the_shard_opens():
+    user_id = f"artifacts-{uuid.uuid4().hex[:12]}"
+    root = os.path.join(resumecraft.USERS_DIR, user_id)
+    os.makedirs(root)
+    profile = resumecraft._default_user_data()
+    profile["resumes"] = [{"id": "r1", "title": "Old resume", "content": "Inline resume text", "createdAt": "2024"}]
+    with open(os.path.join(root, "user_data.json"), "w") as f:
+        json.dump(profile, f)
+
+    client = resumecraft.app.test_client()
+    client.environ_base["HTTP_X_USER_ID"] = user_id
+    entry = client.get("/api/profile").get_json()["resumes"][0]
+    assert "content" not in entry
+    assert (entry["id"], entry["title"], entry["size"]) == ("r1", "Old resume", len("Inline resume text"))
+    assert client.get(f"/api/artifacts/{entry['artifactId']}").get_json()["content"] == "Inline resume text"
+
+
+def test_artifacts_are_only_visible_to_their_owner(client):
+    client.post("/api/profile/update", json={"resumes": [{"id": "r1", "title": "Mine", "content": "Private text"}]})
+    artifact_id = client.get("/api/profile").get_json()["resumes"][0]["artifactId"]
+    assert client.get(f"/api/artifacts/{artifact_id}").status_code == 200
+
+    other = resumecraft.app.test_client()
+    other.environ_base["HTTP_X_USER_ID"] = f"other-{uuid.uuid4().hex[:12]}"
+    assert other.get(f"/api/artifacts/{artifact_id}").status_code == 404
+
+
+def test_unreferenced_artifacts_are_deleted(client):
+    client.post("/api/profile/update", json={"resumes": [
+        {"id": "keep", "title": "Keep", "content": "Kept text"},
+        {"id": "drop", "title": "Drop", "content": "Dropped text"},
+    ]})
+    kept, dropped = client.get("/api/profile").get_json()["resumes"]
+    store = resumecraft.user_shard(client.user_id).artifacts
+    for artifact_id in (kept["artifactId"], dropped["artifactId"]):
+        make_old(store._path(artifact_id))
+    recent = store.put("Generated a moment ago, not referenced yet")
+
+    # Removing a document from the list deletes its artifact, but not newer or referenced ones
+    client.post("/api/profile/update", json={"resumes": [kept]})
+    assert not os.path.exists(store._path(dropped["artifactId"]))
+    assert client.get(f"/api/artifacts/{dropped['artifactId']}").status_code == 404
+    assert client.get(f"/api/artifacts/{kept['artifactId']}").get_json()["content"] == "Kept text"
+    assert store.read(recent) is not None
+
+    make_old(store._path(recent))
+    assert resumecraft.user_shard(client.user_id).collect_artifacts() == 1
+
+
+def test_reusing_old_content_protects_it_from_the_next_sweep(tmp_path):
+    store = resumecraft.ArtifactStore(str(tmp_path / "artifacts"))
+    artifact_id = store.put("Regenerated text")
+    make_old(store._path(artifact_id))
+    # Generation stores the artifact before the profile references it
+    assert store.put("Regenerated text") == artifact_id
+    assert store.sweep(set()) == 0
+    assert store.read(artifact_id) == "Regenerated text"
@@ -0,0 +1,136 @@
+"""Recovery and multi-process behaviour of the append-only chat history log."""
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+import app as resumecraft
+
+
+def chat(chat_id, title="Job"):
+    return {"id": chat_id, "jobTitle": title, "timestamp": "2024-01-01T00:00:00",
+            "messages": [{"role": "user", "content": f"hello from {chat_id}"}]}
+
+
+def test_chat_log_recovers_unindexed_records_and_truncates_torn_tail(tmp_path):
+    log = resumecraft.ChatHistoryLog(str(tmp_path / "chat"))
+    log.append(chat("a"))
+    log.append(chat("b"))
+    segment = log._segment_path(1)
+    indexed_size = os.path.getsize(segment)
+
+    # A crash after the segment write but before the index write, then a torn append
+    unindexed = (json.dumps(chat("c")) + "\n").encode("utf-8")
+    with open(segment, "ab") as f:
+        f.write(unindexed)
+        f.write(b'{"id": "torn", "jobTi')
+
+    reopened = resumecraft.ChatHistoryLog(str(tmp_path / "chat"))
+    assert reopened.count() == 3
+    assert reopened.read("c")["jobTitle"] == "Job"
+    assert os.path.getsize(segment) == indexed_size + len(unindexed)
+
+    reopened.append(chat("d"))
+    assert [json.loads(line)["id"] for line in reopened.iter_lines()] == ["a", "b", "c", "d"]
+    # The recovered entry was written to the index, so a third open finds it without rescanning
+    assert resumecraft.ChatHistoryLog(str(tmp_path / "chat")).read("d")["id"] == "d"
+
+
+def test_interrupted_legacy_migration_does_not_duplicate_chats(tmp_path):
+    legacy_file = tmp_path / "chat_history.json"
+    legacy_file.write_text(json.dumps([chat("old-1"), chat("old-2"), chat("old-3")]))
+
+    # The first attempt copied one chat and died before renaming the legacy file
+    partial = resumecraft.ChatHistoryLog(str(tmp_path / "chat"))
+    partial._state["loaded"] = True
+    with partial.lock:
+        partial._append_record_locked(chat("old-1"))
+
+    log = resumecraft.ChatHistoryLog(str(tmp_path / "chat"), legacy_file=str(legacy_file))
+    assert [entry["id"] for entry in log.index_entries()] == ["old-1", "old-2", "old-3"]
+    assert not legacy_file.exists()
+    assert (tmp_path / "chat_history.json.migrated").exists()
+
+
+WORKER = textwrap.dedent("""
+    import json, sys, time
+    import app as resumecraft
+
+    directory, name, count, total = sys.argv[1], sys.argv[2], int(sys.argv[3]), int(sys.argv[4])
+    log = resumecraft.ChatHistoryLog(directory)
+    for i in range(count):
+        log.append({"id": f"{name}-{i}", "jobTitle": name, "messages": []})
+    # A long-lived worker must eventually see every sibling's chats
+    deadline = time.time() + 20
+    while log.count() < total and time.time() < deadline:
+        time.sleep(0.05)
+    print(json.dumps({"count": log.count(), "readable": all(
+        log.read(f"w{w}-{i}") is not None for w in range(3) for i in range(count))}))
+""")
+
+
+def test_chat_log_appends_from_several_processes(tmp_path):
+    directory = str(tmp_path / "chat")
+    per_worker, workers = 150, 3
+    env = dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    procs = [subprocess.Popen([sys.executable, "-c", WORKER, directory, f"w{w}", str(per_worker),
+                               str(per_worker * workers)], stdout=subprocess.PIPE, env=env)
+             for w in range(workers)]
+    results = [json.loads(proc.communicate(timeout=60)[0].decode().strip().splitlines()[-1]) for proc in procs]
+    assert all(proc.returncode == 0 for proc in procs)
+    assert results == [{"count": per_worker * workers, "readable": True}] * workers
+
+    with open(os.path.join(directory, "index.jsonl"), 'rb') as f:
+        ids = [json.loads(line)["id"] for line in f]
+    assert len(ids) == len(set(ids)) == per_worker * workers
+    reopened = resumecraft.ChatHistoryLog(directory)
+    assert reopened.count() == per_worker * workers
+    assert reopened.read("w1-42")["jobTitle"] == "w1"
+
+
+def save_chats(client, titles):
+    ids = []
+    for title in titles:
+        response = client.post("/api/chat/save", json={"jobTitle": title,
+                                                       "chatMessages": [{"role": "user", "content": title}]})
+        ids.append(response.get_json()["chatId"])
+    return ids
+
+
+def test_history_pages_through_summaries_from_the_index(client):
+    ids = save_chats(client, ["one", "two", "three"])
+
+    response = client.get("/api/chat/history?order=desc&limit=2&fields=id,jobTitle,messageCount")
+    assert response.get_json() == [{"id": ids[2], "jobTitle": "three", "messageCount": 1},
+                                   {"id": ids[1], "jobTitle": "two", "messageCount": 1}]
+    assert response.headers["X-Total-Count"] == "3"
+    assert response.headers["X-Next-Offset"] == "2"
+    assert [chat["id"] for chat in client.get("/api/chat/history").get_json()] == ids
+
+
+def test_history_projects_fields_alongside_messages(client):
+    ids = save_chats(client, ["one", "two"])
+    response = client.get("/api/chat/history?offset=1&fields=jobTitle,messages,messageCount")
+    assert response.get_json() == [{"jobTitle": "two", "messages": [{"role": "user", "content": "two"}],
+                                    "messageCount": 1}]
+    assert client.get("/api/chat/history?limit=1&fields=id,messages").get_json() == [
+        {"id": ids[0], "messages": [{"role": "user", "content": "one"}]}]
+
+
+def test_history_sorts_by_timestamp(client):
+    log = resumecraft.user_shard(client.user_id).chat_history
+    log.append(dict(chat("late"), timestamp="2024-03-01T00:00:00"))
+    log.append(dict(chat("early"), timestamp="2024-01-01T00:00:00"))
+
+    response = client.get("/api/chat/history?sort=timestamp&fields=id")
+    assert response.get_json() == [{"id": "early"}, {"id": "late"}]
+    assert client.get("/api/chat/history?sort=timestamp&order=desc&fields=id").get_json() == [
+        {"id": "late"}, {"id": "early"}]
+
+
+@pytest.mark.parametrize("query", ["sort=jobTitle", "fields=id,body", "limit=-1", "order=sideways"])
+def test_history_rejects_unsupported_arguments(client, query):
+    assert client.get(f"/api/chat/history?{query}").status_code == 400
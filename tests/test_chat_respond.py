@@ -0,0 +1,135 @@
+"""Chat replies: server-sent-event streaming and the token-budgeted context window."""
+import json
+
+import pytest
+
+from conftest import StubLLM
+import app as resumecraft
+
+
+def sse_events(body):
+    events = []
+    for block in body.decode("utf-8").strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields.get("event", "message"), json.loads(fields["data"])))
+    return events
+
+
+def test_stream_sends_deltas_then_done(client, stub_llm):
+    response = client.post("/api/chat/respond/stream", json={"messages": [{"role": "user", "content": "hi"}]})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+
+    events = sse_events(response.get_data())
+    assert [data["delta"] for kind, data in events[:-1]] == ["Stub ", "streamed ", "reply"]
+    kind, done = events[-1]
+    assert kind == "done"
+    assert done["reply"] == "Stub streamed reply"
+    assert done["context"]["promptTokens"] > 0
+    response.close()
+    assert stub_llm.streams[0].closed
+
+
+def test_stream_reports_mid_stream_failure_as_error_event(client, monkeypatch):
+    stub = StubLLM(deltas=("partial ",), stream_error=RuntimeError("upstream reset"))
+    monkeypatch.setattr(resumecraft, "llm", stub)
+
+    response = client.post("/api/chat/respond/stream", json={"messages": [{"role": "user", "content": "hi"}]})
+    events = sse_events(response.get_data())
+    assert events == [("message", {"delta": "partial "}), ("error", {"error": "upstream reset"})]
+    response.close()
+    assert stub.streams[0].closed
+
+
+def test_stream_closes_unread_stream_when_client_disconnects(client, stub_llm):
+    response = client.post("/api/chat/respond/stream", json={"messages": [{"role": "user", "content": "hi"}]},
+                           buffered=False)
+    response.close()
+    assert stub_llm.streams[0].closed
+
+
+def test_stream_rejects_empty_conversation_without_calling_model(client, stub_llm):
+    response = client.post("/api/chat/respond/stream", json={"messages": []})
+    assert response.status_code == 400
+    assert stub_llm.calls == []
+
+
+class SummaryLLM:
+    """Returns a short numbered summary for every completion."""
+
+    def __init__(self, fail=False):
+        self.prompts = []
+        self.fail = fail
+
+    def complete(self, messages, model=None, timeout=None):
+        self.prompts.append(messages[-1]["content"])
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return f"summary {len(self.prompts)}"
+
+
+@pytest.fixture
+def small_window(monkeypatch):
+    monkeypatch.setattr(resumecraft, "CHAT_CONTEXT_TOKEN_BUDGET", 600)
+    monkeypatch.setattr(resumecraft, "CHAT_SUMMARY_MAX_TOKENS", 50)
+    monkeypatch.setattr(resumecraft, "_chat_summary_cache", resumecraft.OrderedDict())
+    llm = SummaryLLM()
+    monkeypatch.setattr(resumecraft, "llm", llm)
+    return llm
+
+
+def turns(count, start=0):
+    # About 54 tokens each with the ~4 characters per token estimate
+    return [{"role": "user" if i % 2 == 0 else "assistant", "content": f"turn {i:03d} " + "x" * 190}
+            for i in range(start, start + count)]
+
+
+def test_short_conversation_is_sent_unchanged(small_window):
+    messages = turns(3)
+    context, stats = resumecraft.build_chat_context("system", messages)
+    assert context == [{"role": "system", "content": "system"}, *messages]
+    assert stats["summarizedMessages"] == 0 and stats["tokensSaved"] == 0
+    assert small_window.prompts == []
+
+
+def test_long_conversation_is_summarized_within_budget(small_window):
+    messages = turns(20)
+    context, stats = resumecraft.build_chat_context("system", messages)
+
+    fold = stats["summarizedMessages"]
+    assert 0 < fold < len(messages)
+    assert context[1] == {"role": "system", "content": "Summary of the earlier conversation:\nsummary 1"}
+    assert context[2:] == messages[fold:]
+    assert stats["promptTokens"] <= resumecraft.CHAT_CONTEXT_TOKEN_BUDGET
+    assert stats["tokensSaved"] == stats["originalTokens"] - stats["promptTokens"]
+    assert len(small_window.prompts) == 1
+    assert "turn 000" in small_window.prompts[0] and f"turn {fold:03d}" not in small_window.prompts[0]
+
+
+def test_later_turns_reuse_the_cached_summary(small_window):
+    messages = turns(20)
+    _, first = resumecraft.build_chat_context("system", messages)
+    context, stats = resumecraft.build_chat_context("system", messages + turns(1, start=20))
+
+    assert len(small_window.prompts) == 1
+    assert stats["summarizedMessages"] == first["summarizedMessages"]
+    assert context[1]["content"].endswith("summary 1")
+
+    # Once the recent turns outgrow the window, the next summary builds on the previous one
+    longer = messages + turns(10, start=20)
+    context, stats = resumecraft.build_chat_context("system", longer)
+    assert len(small_window.prompts) == 2
+    assert "Summary so far:\nsummary 1" in small_window.prompts[1]
+    assert stats["summarizedMessages"] > first["summarizedMessages"]
+    assert context[1]["content"].endswith("summary 2")
+    assert stats["promptTokens"] <= resumecraft.CHAT_CONTEXT_TOKEN_BUDGET
+
+
+def test_failed_summary_drops_older_turns_instead_of_failing(small_window):
+    small_window.fail = True
+    messages = turns(20)
+    context, stats = resumecraft.build_chat_context("system", messages)
+    assert all(message["role"] != "system" for message in context[1:])
+    assert context[1:] == messages[stats["summarizedMessages"]:]
+    assert context[-1] == messages[-1]
+    assert stats["promptTokens"] <= resumecraft.CHAT_CONTEXT_TOKEN_BUDGET
@@ -0,0 +1,100 @@
+"""AI conversation stores: the SQLite backend and the delta-append API."""
+import json
+import os
+import threading
+
+import pytest
+
+import app as resumecraft
+
+
+def test_sqlite_store_migrates_json_conversations_once(tmp_path):
+    json_path = tmp_path / "ai_conversations.json"
+    json_path.write_text(json.dumps({
+        "c1": {"jobTitle": "One", "lastUpdated": "2024-01-01", "messages": [{"role": "user", "content": "hi"}]},
+        "c2": {"jobTitle": "Two", "lastUpdated": "2024-01-02", "messages": []},
+    }))
+    store = resumecraft.SqliteConversationStore(str(tmp_path / "ai_conversations.db"))
+    try:
+        assert store.migrate_from_json(str(json_path)) == 2
+        assert not json_path.exists()
+        assert store.migrate_from_json(str(json_path)) == 0
+        assert store.get("c1")["messages"] == [{"role": "user", "content": "hi"}]
+        total, _ = store.list_summaries(None, {"order": "asc", "limit": None, "offset": 0})
+        assert total == 2
+    finally:
+        store.close()
+
+
+def open_db_files(path):
+    fd_dir = "/proc/self/fd"
+    targets = []
+    for fd in os.listdir(fd_dir):
+        try:
+            targets.append(os.readlink(os.path.join(fd_dir, fd)))
+        except OSError:
+            continue
+    return sum(target.startswith(path) for target in targets)
+
+
+def test_sqlite_store_closes_connections_of_exited_threads(tmp_path):
+    path = str(tmp_path / "ai_conversations.db")
+    store = resumecraft.SqliteConversationStore(path)
+    try:
+        store.upsert("c1", {"jobTitle": "One", "messages": [{"role": "user", "content": "hi"}]})
+        for _ in range(100):
+            # Like the threaded dev server: one short-lived thread per request
+            thread = threading.Thread(target=store.get, args=("c1",))
+            thread.start()
+            thread.join()
+        assert len(store._connections) <= 2
+        if os.path.isdir("/proc/self/fd"):
+            assert open_db_files(path) <= 6
+        assert store.get("c1")["jobTitle"] == "One"
+    finally:
+        store.close()
+    assert store._connections == {}
+
+
+@pytest.fixture(params=["sqlite", "json"])
+def store(request, tmp_path):
+    if request.param == "sqlite":
+        store = resumecraft.SqliteConversationStore(str(tmp_path / "ai_conversations.db"))
+    else:
+        store = resumecraft.JsonConversationStore(str(tmp_path / "ai_conversations.json"))
+    yield store
+    store.close()
+
+
+def test_store_append_checks_the_base_count(store):
+    assert store.append("c1", [{"role": "user", "content": "one"}], 0, "Job", "2024-01-01") == 1
+    with pytest.raises(resumecraft.ConversationConflict) as conflict:
+        store.append("c1", [{"role": "user", "content": "again"}], 0, None, "2024-01-02")
+    assert conflict.value.message_count == 1
+    assert store.append("c1", [{"role": "assistant", "content": "two"}], 1, None, "2024-01-02") == 2
+
+    conversation = store.get("c1")
+    assert [message["content"] for message in conversation["messages"]] == ["one", "two"]
+    assert (conversation["jobTitle"], conversation["lastUpdated"]) == ("Job", "2024-01-02")
+
+
+def test_append_with_stale_base_count_returns_409(client):
+    messages = [{"role": "user", "content": "one"}, {"role": "assistant", "content": "two"}]
+    saved = client.post("/api/ai-conversation/save",
+                        json={"conversationId": None, "jobTitle": "Job", "messages": messages})
+    conversation_id = saved.get_json()["conversationId"]
+    url = f"/api/ai-conversation/{conversation_id}/append"
+
+    stale = client.post(url, json={"messages": [{"role": "user", "content": "late"}], "baseCount": 1})
+    assert stale.status_code == 409
+    assert stale.get_json()["messageCount"] == 2
+
+    fresh = client.post(url, json={"messages": [{"role": "user", "content": "three"}], "baseCount": 2})
+    assert fresh.status_code == 200
+    assert fresh.get_json()["messageCount"] == 3
+    assert len(client.get(f"/api/ai-conversation/{conversation_id}").get_json()["messages"]) == 3
+
+
+def test_append_rejects_boolean_base_count(client):
+    response = client.post("/api/ai-conversation/c/append", json={"messages": [], "baseCount": True})
+    assert response.status_code == 400
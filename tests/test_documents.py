@@ -0,0 +1,40 @@
+"""Document downloads rendered from the shared document model."""
+import io
+import os
+import zipfile
+
+import app as resumecraft
+
+LETTER = "Dear Hiring Manager,\n\nI would like to apply.\n\nSincerely,\nAlex"
+
+
+def test_bundle_contains_every_requested_format(client):
+    response = client.post("/api/document/download/bundle", json={"content": LETTER, "fileName": "CoverLetter_Eng"})
+    assert response.status_code == 200
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as bundle:
+        assert sorted(bundle.namelist()) == ["CoverLetter_Eng.docx", "CoverLetter_Eng.pdf"]
+        assert bundle.read("CoverLetter_Eng.pdf").startswith(b"%PDF")
+        assert bundle.read("CoverLetter_Eng.docx").startswith(b"PK")
+
+    single = client.post("/api/document/download", json={"content": LETTER, "fileName": "x", "format": "pdf"})
+    with zipfile.ZipFile(io.BytesIO(response.get_data())) as bundle:
+        assert bundle.read("CoverLetter_Eng.pdf") == single.get_data()
+
+
+def test_bundle_rejects_unknown_formats(client):
+    response = client.post("/api/document/download/bundle", json={"content": LETTER, "formats": ["pdf", "odt"]})
+    assert response.status_code == 400
+
+
+def data_dir_files():
+    return {os.path.join(root, name) for root, _, names in os.walk(resumecraft.DATA_DIR) for name in names}
+
+
+def test_pdf_download_is_built_in_memory(client):
+    before = data_dir_files()
+    response = client.post("/api/document/download",
+                           json={"content": LETTER + "\nin memory", "fileName": "CoverLetter_Eng", "format": "pdf"})
+    assert response.status_code == 200
+    assert response.get_data().startswith(b"%PDF")
+    assert "CoverLetter_Eng.pdf" in response.headers["Content-Disposition"]
+    assert data_dir_files() == before
@@ -0,0 +1,164 @@
+"""Resume generation: the batch endpoint and background jobs."""
+import os
+import socket
+import time
+import uuid
+
+import pytest
+
+from conftest import StubLLM
+import app as resumecraft
+
+
+def profile_resume_count(client):
+    return len(client.get("/api/profile").get_json()["resumes"])
+
+
+def test_batch_returns_results_in_request_order(uploaded_resume, monkeypatch):
+    client = uploaded_resume
+    marker = uuid.uuid4().hex
+    stub = StubLLM(fail_on=f"fail-{marker}", slow_on=f"slow-{marker}")
+    monkeypatch.setattr(resumecraft, "llm", stub)
+    jobs = [
+        {"jobTitle": "Slow", "jobDescription": f"slow-{marker} backend role"},
+        {"jobTitle": "Missing description"},
+        {"jobTitle": "Broken", "jobDescription": f"fail-{marker} data role"},
+        "not an object",
+        {"jobTitle": "Fast", "jobDescription": f"fast-{marker} frontend role"},
+    ]
+
+    response = client.post("/api/resume/generate/batch", json={"jobs": jobs, "concurrency": 4})
+    assert response.status_code == 200
+    body = response.get_json()
+    assert [result["index"] for result in body["results"]] == [0, 1, 2, 3, 4]
+    assert [result["jobTitle"] for result in body["results"]] == ["Slow", "Missing description", "Broken", "",
+                                                                 "Fast"]
+    assert body["results"][1]["error"] == "'jobDescription' must be a non-empty string"
+    assert body["results"][2]["error"] == "model unavailable"
+    assert body["results"][3]["error"] == "Each job must be an object"
+    assert f"slow-{marker}" in body["results"][0]["resume"]
+    assert f"fast-{marker}" in body["results"][4]["resume"]
+    assert (body["succeeded"], body["failed"]) == (2, 3)
+    assert profile_resume_count(client) == 2
+    # Invalid items never reach the model
+    prompts = [messages[-1]["content"] for messages in stub.calls]
+    assert all(any(f"{kind}-{marker}" in prompt for kind in ("slow", "fail", "fast")) for prompt in prompts)
+
+
+@pytest.mark.parametrize("payload, error", [
+    ({"jobs": []}, "'jobs' must be a non-empty list"),
+    ({"jobs": {"jobDescription": "x"}}, "'jobs' must be a non-empty list"),
+    ({"jobs": [{"jobDescription": "x"}], "concurrency": "many"}, "'concurrency' must be an integer"),
+    ({"jobs": [{"jobDescription": "x"}] * (resumecraft.BATCH_MAX_JOBS + 1)},
+     f"At most {resumecraft.BATCH_MAX_JOBS} jobs per batch"),
+])
+def test_batch_rejects_malformed_requests(uploaded_resume, stub_llm, payload, error):
+    response = uploaded_resume.post("/api/resume/generate/batch", json=payload)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == error
+    assert stub_llm.calls == []
+
+
+def test_batch_requires_an_uploaded_resume(client, stub_llm):
+    response = client.post("/api/resume/generate/batch", json={"jobs": [{"jobDescription": "x"}]})
+    assert response.status_code == 400
+    assert stub_llm.calls == []
+
+
+@pytest.fixture
+def job_state(tmp_path, monkeypatch):
+    jobs_dir = tmp_path / "jobs"
+    monkeypatch.setattr(resumecraft, "JOBS_DIR", str(jobs_dir))
+    monkeypatch.setattr(resumecraft, "JOB_CLAIMS_DB", str(jobs_dir / "claims.db"))
+    monkeypatch.setattr(resumecraft, "_jobs", {})
+    monkeypatch.setattr(resumecraft, "_jobs_state", {"pid": None})
+    monkeypatch.setattr(resumecraft, "_job_claims_local", resumecraft.threading.local())
+    return jobs_dir
+
+
+def wait_for_job(client, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = client.get(f"/api/jobs/{job_id}").get_json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} did not finish: {job}")
+
+
+def test_requests_that_do_not_use_jobs_create_no_job_state(client, job_state):
+    client.get("/api/profile")
+    client.get("/metrics")
+    assert not job_state.exists()
+    assert resumecraft._jobs_state["pid"] is None
+
+
+def test_async_job_completes_and_is_private_to_its_user(uploaded_resume, stub_llm, job_state):
+    client = uploaded_resume
+    response = client.post("/api/resume/generate/async",
+                           json={"jobTitle": "Engineer", "jobDescription": f"python {uuid.uuid4().hex}"})
+    assert response.status_code == 202
+    job = wait_for_job(client, response.get_json()["jobId"])
+    assert job["status"] == "completed"
+    assert job["result"]["resume"].startswith("Stub reply")
+    assert "jobDescription" not in job
+    assert profile_resume_count(client) == 1
+
+    other = resumecraft.app.test_client()
+    other.environ_base["HTTP_X_USER_ID"] = "someone-else"
+    assert other.get(f"/api/jobs/{job['id']}").status_code == 404
+
+
+def add_claimed_job(user_id, job_id, owner, lease_until):
+    resumecraft._save_job({"id": job_id, "userId": user_id, "status": "running", "progress": "generating",
+                           "jobTitle": "Engineer", "jobDescription": f"{job_id} {uuid.uuid4().hex}",
+                           "regenerate": True, "createdAt": "2024-01-01T00:00:00", "result": None, "error": None})
+    with resumecraft._job_claims() as conn:
+        conn.execute("INSERT INTO job_claims (id, owner, lease_until) VALUES (?, ?, ?)", (job_id, owner, lease_until))
+
+
+def test_maintenance_takes_over_only_orphaned_jobs(client, stub_llm, job_state):
+    host = socket.gethostname()
+    now = time.time()
+    add_claimed_job(client.user_id, "live-sibling", f"{host}:{os.getppid()}:x", now + 100)
+    add_claimed_job(client.user_id, "dead-sibling", f"{host}:999999999:x", now + 100)
+    add_claimed_job(client.user_id, "expired-remote", "otherhost:1:x", now - 1)
+    add_claimed_job(client.user_id, "leased-remote", "otherhost:1:x", now + 100)
+
+    # The first poll starts maintenance, which takes over the orphaned jobs
+    client.get("/api/jobs/live-sibling")
+    assert wait_for_job(client, "dead-sibling")["status"] == "completed"
+    assert wait_for_job(client, "expired-remote")["status"] == "completed"
+    assert client.get("/api/jobs/live-sibling").get_json()["status"] == "running"
+    assert client.get("/api/jobs/leased-remote").get_json()["status"] == "running"
+    assert resumecraft.claim_orphaned_jobs() == []
+
+
+def test_only_one_process_wins_an_orphaned_job(client, stub_llm, job_state, monkeypatch):
+    add_claimed_job(client.user_id, "orphan", "otherhost:1:x", time.time() - 1)
+    monkeypatch.setattr(resumecraft, "_job_owner", lambda: "otherhost:2:first")
+    assert resumecraft.claim_orphaned_jobs() == ["orphan"]
+    monkeypatch.setattr(resumecraft, "_job_owner", lambda: "otherhost:3:second")
+    assert resumecraft.claim_orphaned_jobs() == []
+    assert wait_for_job(client, "orphan")["status"] == "completed"
+
+
+def test_finished_jobs_are_deleted_after_retention(uploaded_resume, stub_llm, job_state, monkeypatch):
+    client = uploaded_resume
+    job_id = client.post("/api/resume/generate/async",
+                         json={"jobTitle": "Engineer", "jobDescription": uuid.uuid4().hex}).get_json()["jobId"]
+    wait_for_job(client, job_id)
+    # The claim is marked finished just after the job file
+    deadline = time.time() + 5
+    while resumecraft._job_claims().execute("SELECT finished_at FROM job_claims WHERE id = ?",
+                                            (job_id,)).fetchone()[0] is None:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    add_claimed_job(client.user_id, "unfinished", resumecraft._job_owner(), time.time() + 100)
+
+    resumecraft.prune_finished_jobs()
+    assert client.get(f"/api/jobs/{job_id}").status_code == 200
+    monkeypatch.setattr(resumecraft, "JOB_RETENTION_SECONDS", 0)
+    resumecraft.prune_finished_jobs()
+    assert client.get(f"/api/jobs/{job_id}").status_code == 404
+    assert (job_state / "unfinished.json").exists()
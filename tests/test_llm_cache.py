@@ -0,0 +1,93 @@
+"""The generation response cache: hits, bypass, expiry, eviction and damaged entries."""
+import json
+import os
+import time
+
+import pytest
+
+import app as resumecraft
+
+
+@pytest.fixture
+def llm_cache(tmp_path, monkeypatch, stub_llm):
+    monkeypatch.setattr(resumecraft, "LLM_CACHE_DIR", str(tmp_path / "llm"))
+    monkeypatch.setattr(resumecraft, "_llm_memory_cache", resumecraft.OrderedDict())
+    monkeypatch.setattr(resumecraft, "_llm_disk_state", {"bytes": None, "evicting": False})
+    monkeypatch.setattr(resumecraft, "llm_cache_stats", dict.fromkeys(resumecraft.llm_cache_stats, 0))
+    return stub_llm
+
+
+def entry_path(system_prompt, user_prompt):
+    return resumecraft._llm_cache_path(resumecraft.llm_cache_key(resumecraft.LLM_MODEL, system_prompt, user_prompt))
+
+
+def test_repeated_prompt_is_served_from_memory_then_disk(llm_cache):
+    first = resumecraft.cached_complete_chat("system", "write a resume")
+    assert resumecraft.cached_complete_chat("system", "write a resume") == first
+    resumecraft._llm_memory_cache.clear()
+    assert resumecraft.cached_complete_chat("system", "write a resume") == first
+
+    assert len(llm_cache.calls) == 1
+    assert resumecraft.llm_cache_stats == {"memoryHits": 1, "diskHits": 1, "misses": 1, "bypassed": 0,
+                                           "evictions": 0}
+
+
+def test_bypass_calls_the_model_and_refreshes_the_entry(llm_cache):
+    resumecraft.cached_complete_chat("system", "prompt")
+    resumecraft.cached_complete_chat("system", "prompt", bypass=True)
+    assert len(llm_cache.calls) == 2
+    assert resumecraft.llm_cache_stats["bypassed"] == 1
+    assert resumecraft.cached_complete_chat("system", "prompt") == "Stub reply: prompt"
+    assert len(llm_cache.calls) == 2
+
+
+def test_expired_entry_is_a_miss_and_is_removed(llm_cache, monkeypatch):
+    resumecraft.cached_complete_chat("system", "prompt")
+    path = entry_path("system", "prompt")
+    with open(path) as f:
+        entry = json.load(f)
+    entry["created"] -= resumecraft.LLM_CACHE_TTL_SECONDS + 1
+    with open(path, "w") as f:
+        json.dump(entry, f)
+    resumecraft._llm_memory_cache.clear()
+
+    assert resumecraft._llm_cache_get(resumecraft.llm_cache_key(resumecraft.LLM_MODEL, "system", "prompt")) is None
+    assert not os.path.exists(path)
+    assert resumecraft.llm_cache_stats["misses"] == 2
+
+
+@pytest.mark.parametrize("body", ['{"created": 1', '{"response": "no timestamp"}', '[1, 2]',
+                                  '{"created": "yesterday", "response": "x"}'])
+def test_damaged_entry_is_a_miss_and_is_removed(llm_cache, body):
+    os.makedirs(resumecraft.LLM_CACHE_DIR)
+    path = entry_path("system", "prompt")
+    with open(path, "w") as f:
+        f.write(body)
+
+    assert resumecraft.cached_complete_chat("system", "prompt") == "Stub reply: prompt"
+    assert len(llm_cache.calls) == 1
+    assert resumecraft.llm_cache_stats["misses"] == 1
+    with open(path) as f:
+        assert json.load(f)["response"] == "Stub reply: prompt"
+
+
+def test_disk_tier_evicts_least_recently_used_entries(llm_cache, monkeypatch):
+    for i in range(3):
+        resumecraft.cached_complete_chat("system", f"prompt {i}")
+    size = os.path.getsize(entry_path("system", "prompt 0"))
+    # Age the entries so their order is unambiguous, then touch prompt 0 by reading it
+    for i in range(3):
+        stamp = time.time() - 100 + i
+        os.utime(entry_path("system", f"prompt {i}"), (stamp, stamp))
+    resumecraft._llm_memory_cache.clear()
+    resumecraft.cached_complete_chat("system", "prompt 0")
+
+    # Room for three entries; timestamps make sizes differ by a few bytes
+    monkeypatch.setattr(resumecraft, "LLM_CACHE_MAX_DISK_BYTES", size * 3 + 16)
+    resumecraft.cached_complete_chat("system", "prompt 3")
+
+    assert not os.path.exists(entry_path("system", "prompt 1"))
+    assert all(os.path.exists(entry_path("system", f"prompt {i}")) for i in (0, 2, 3))
+    assert resumecraft.llm_cache_stats["evictions"] == 1
+    assert resumecraft._llm_disk_bytes() == sum(
+        os.path.getsize(entry_path("system", f"prompt {i}")) for i in (0, 2, 3))
@@ -0,0 +1,143 @@
+"""The pooled LLM client: retries, deadlines and concurrency slots."""
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import app as resumecraft
+
+
+class Retryable(Exception):
+    """Stands in for openai's rate-limit and server errors."""
+
+    response = None
+
+
+class FakeStream:
+    def __init__(self, words):
+        self.words = words
+        self.closed = False
+
+    def __iter__(self):
+        for word in self.words:
+            yield SimpleNamespace(usage=None, choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCompletions:
+    """Fails with each queued exception in turn, then answers."""
+
+    def __init__(self, failures=(), delay=0.0):
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = []
+
+    def create(self, model, messages, timeout, stream=False):
+        self.calls.append(timeout)
+        time.sleep(self.delay)
+        if self.failures:
+            raise self.failures.pop(0)
+        if stream:
+            return FakeStream(["Hello", " there"])
+        usage = SimpleNamespace(prompt_tokens=3, completion_tokens=2)
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content=" Hi "))])
+
+
+def make_client(completions, max_concurrency=2, timeout=5):
+    client = resumecraft.LLMClient(api_key="test", max_concurrency=max_concurrency, timeout=timeout)
+    client._openai = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    client._retryable = (Retryable,)
+    return client
+
+
+def free_slots(client):
+    acquired = 0
+    while client._slots.acquire(blocking=False):
+        acquired += 1
+    for _ in range(acquired):
+        client._slots.release()
+    return acquired
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(resumecraft, "LLM_RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(resumecraft, "LLM_RETRY_MAX_DELAY", 0.02)
+
+
+MESSAGES = [{"role": "user", "content": "hi"}]
+
+
+def test_retryable_errors_are_retried_until_success():
+    completions = FakeCompletions([Retryable("429"), Retryable("503")])
+    client = make_client(completions)
+    assert client.complete(MESSAGES) == "Hi"
+    assert len(completions.calls) == 3
+    # Every attempt gets only what is left of the one deadline
+    assert completions.calls == sorted(completions.calls, reverse=True)
+    assert free_slots(client) == 2
+
+
+def test_retries_stop_after_max_retries():
+    completions = FakeCompletions([Retryable(str(i)) for i in range(10)])
+    client = make_client(completions)
+    with pytest.raises(Retryable):
+        client.complete(MESSAGES)
+    assert len(completions.calls) == client.max_retries + 1
+    assert free_slots(client) == 2
+
+
+def test_other_errors_are_not_retried():
+    completions = FakeCompletions([ValueError("bad request")])
+    client = make_client(completions)
+    with pytest.raises(ValueError):
+        client.complete(MESSAGES)
+    assert len(completions.calls) == 1
+    assert free_slots(client) == 2
+
+
+def test_backoff_past_the_deadline_raises_timeout(monkeypatch):
+    monkeypatch.setattr(resumecraft, "LLM_RETRY_BASE_DELAY", 10)
+    monkeypatch.setattr(resumecraft, "LLM_RETRY_MAX_DELAY", 10)
+    monkeypatch.setattr(resumecraft.random, "uniform", lambda low, high: high)
+    client = make_client(FakeCompletions([Retryable("503")]))
+    started = time.monotonic()
+    with pytest.raises(resumecraft.LLMTimeout):
+        client.complete(MESSAGES, timeout=0.5)
+    assert time.monotonic() - started < 0.5
+    assert free_slots(client) == 2
+
+
+def test_waiting_for_a_slot_counts_against_the_deadline():
+    client = make_client(FakeCompletions(), max_concurrency=1)
+    held = client.stream(MESSAGES)
+    try:
+        with pytest.raises(resumecraft.LLMTimeout):
+            client.complete(MESSAGES, timeout=0.1)
+    finally:
+        held.close()
+    assert client.complete(MESSAGES) == "Hi"
+
+
+def test_stream_releases_its_slot_once():
+    client = make_client(FakeCompletions(), max_concurrency=1)
+
+    unread = client.stream(MESSAGES)
+    assert free_slots(client) == 0
+    unread.close()
+    unread.close()
+    assert free_slots(client) == 1
+
+    finished = client.stream(MESSAGES)
+    assert "".join(finished) == "Hello there"
+    finished.close()
+    assert free_slots(client) == 1
+
+
+def test_failed_stream_start_releases_its_slot():
+    client = make_client(FakeCompletions([ValueError("bad request")]), max_concurrency=1)
+    with pytest.raises(ValueError):
+        client.stream(MESSAGES)
+    assert free_slots(client) == 1
@@ -0,0 +1,105 @@
+"""BM25 bullet ranking, prompt trimming and the keyword coverage report."""
+import pytest
+
+import app as resumecraft
+
+EXPERIENCE = [
+    {"position": "Data Engineer", "company": "A", "startDate": "2020", "endDate": "2022", "bullets": [
+        "Built Kubernetes deployment pipelines for Python services",
+        "Organised the office holiday party",
+        "Migrated Kubernetes clusters and tuned Kubernetes autoscaling",
+    ]},
+    {"position": "Analyst", "company": "B", "startDate": "2018", "endDate": "2020", "bullets": [
+        "Prepared quarterly spreadsheets for finance",
+        "Wrote SQL reports on supplier spend",
+    ]},
+]
+JOB = "Platform engineer with Kubernetes and Python experience to run our Kubernetes clusters"
+
+
+@pytest.fixture(params=["dict", "numpy"])
+def scorer(request, monkeypatch):
+    if request.param == "numpy":
+        numpy = pytest.importorskip("numpy")
+        monkeypatch.setattr(resumecraft, "_numpy", {"loaded": True, "module": numpy})
+    else:
+        monkeypatch.setattr(resumecraft, "_numpy", {"loaded": True, "module": None})
+    return request.param
+
+
+def test_bm25_ranks_matching_bullets_first(scorer):
+    index = resumecraft.BulletIndex(EXPERIENCE)
+    scores = index.scores(JOB)
+    ranked = sorted(range(len(scores)), key=lambda doc: -scores[doc])
+    assert [index.bullets[doc][2] for doc in ranked[:2]] == [
+        "Migrated Kubernetes clusters and tuned Kubernetes autoscaling",
+        "Built Kubernetes deployment pipelines for Python services",
+    ]
+    assert scores[1] == scores[3] == 0.0
+    assert index.scores("nothing relevant here") == [0.0] * 5
+
+
+def test_numpy_and_dict_scoring_agree(monkeypatch):
+    numpy = pytest.importorskip("numpy")
+    monkeypatch.setattr(resumecraft, "_numpy", {"loaded": True, "module": None})
+    plain = resumecraft.BulletIndex(EXPERIENCE).scores(JOB)
+    monkeypatch.setattr(resumecraft, "_numpy", {"loaded": True, "module": numpy})
+    vectorised = resumecraft.BulletIndex(EXPERIENCE).scores(JOB)
+    assert vectorised == pytest.approx(plain)
+
+
+def test_profiles_within_limits_are_sent_unchanged(client):
+    with resumecraft.acting_as(client.user_id):
+        assert resumecraft.select_relevant_bullets(EXPERIENCE, JOB) is EXPERIENCE
+
+
+def test_trimming_keeps_every_role_and_the_original_order(client, scorer):
+    with resumecraft.acting_as(client.user_id):
+        trimmed = resumecraft.select_relevant_bullets(EXPERIENCE, JOB, max_bullets=3)
+    assert [exp["position"] for exp in trimmed] == ["Data Engineer", "Analyst"]
+    assert trimmed[0]["bullets"] == ["Built Kubernetes deployment pipelines for Python services",
+                                     "Migrated Kubernetes clusters and tuned Kubernetes autoscaling"]
+    # The second role has no match but still keeps its first bullet
+    assert trimmed[1]["bullets"] == ["Prepared quarterly spreadsheets for finance"]
+    assert EXPERIENCE[0]["bullets"][1] == "Organised the office holiday party"
+
+
+def test_keyword_coverage_reports_words_as_written(client):
+    profile = {"workExperiences": EXPERIENCE, "skills": ["Terraform"]}
+    with resumecraft.acting_as(client.user_id):
+        report = resumecraft.keyword_coverage(profile, "Kubernetes, Terraform and Golang. Kubernetes on-call.")
+    by_keyword = {entry["keyword"]: entry for entry in report["keywords"]}
+    assert by_keyword["kubernetes"] == {"keyword": "kubernetes", "occurrences": 2, "bullets": 2, "covered": True}
+    assert by_keyword["terraform"]["covered"] and by_keyword["terraform"]["bullets"] == 0
+    assert report["missing"] == ["golang", "on-call"]
+    assert (report["covered"], report["total"]) == (2, 4)
+
+
+@pytest.mark.parametrize("job_description", [None, 123, ["kubernetes"]])
+def test_scoring_ignores_non_string_input(client, job_description):
+    profile = {"workExperiences": EXPERIENCE, "skills": ["Terraform", None]}
+    with resumecraft.acting_as(client.user_id):
+        report = resumecraft.keyword_coverage(profile, job_description)
+        trimmed = resumecraft.select_relevant_bullets(EXPERIENCE, job_description, max_bullets=2)
+    assert report["total"] == 0 and report["keywords"] == []
+    assert [len(exp["bullets"]) for exp in trimmed] == [1, 1]
+
+
+@pytest.mark.parametrize("route", ["/api/resume/generate", "/api/resume/generate/async"])
+@pytest.mark.parametrize("job_description", [None, 123, {"text": "x"}])
+def test_generate_rejects_non_string_description_before_calling_the_model(uploaded_resume, stub_llm, route,
+                                                                          job_description):
+    client = uploaded_resume
+    response = client.post(route, json={"jobTitle": "Engineer", "jobDescription": job_description})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "'jobDescription' must be a string"}
+    assert stub_llm.calls == []
+    assert client.get("/api/profile").get_json()["resumes"] == []
+
+
+def test_generate_returns_keyword_coverage(uploaded_resume, stub_llm):
+    client = uploaded_resume
+    client.post("/api/profile/update", json={"workExperiences": EXPERIENCE})
+    response = client.post("/api/resume/generate", json={"jobTitle": "Engineer", "jobDescription": JOB})
+    assert response.status_code == 200
+    assert response.get_json()["keywordCoverage"]["keywords"][0]["keyword"] == "kubernetes"
@@ -0,0 +1,84 @@
+"""Per-user storage shards: the X-User-Id header, the shard LRU and pinning."""
+import os
+import uuid
+
+import pytest
+
+import app as resumecraft
+
+
+@pytest.fixture
+def small_shard_cache(monkeypatch):
+    monkeypatch.setattr(resumecraft, "USER_SHARD_CACHE_ENTRIES", 2)
+    yield
+    with resumecraft._user_shards_lock:
+        evicted = resumecraft._evict_shards_locked()
+    for shard in evicted:
+        shard.close()
+        resumecraft._closing_shards.pop(shard.user_id, None)
+        shard.closed.set()
+
+
+def new_user():
+    return f"shard-{uuid.uuid4().hex[:12]}"
+
+
+@pytest.mark.parametrize("user_id", ["../etc", "a/b", "-leading-dash", "x" * 65, "spaces here"])
+def test_invalid_user_header_is_rejected(user_id):
+    response = resumecraft.app.test_client().get("/api/profile", headers={"X-User-Id": user_id})
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid X-User-Id header"}
+
+
+def test_users_see_only_their_own_profile():
+    first, second = resumecraft.app.test_client(), resumecraft.app.test_client()
+    first.environ_base["HTTP_X_USER_ID"] = new_user()
+    second.environ_base["HTTP_X_USER_ID"] = new_user()
+    first.post("/api/profile/update", json={"name": "First"})
+    assert first.get("/api/profile").get_json()["name"] == "First"
+    assert second.get("/api/profile").get_json()["name"] != "First"
+
+
+def test_reads_do_not_create_shard_directories():
+    user_id = new_user()
+    client = resumecraft.app.test_client()
+    client.environ_base["HTTP_X_USER_ID"] = user_id
+    assert client.get("/api/profile").status_code == 200
+    assert client.get("/api/chat/history").get_json() == []
+    assert client.get("/api/ai-conversation/list").get_json() == []
+    assert not os.path.exists(os.path.join(resumecraft.USERS_DIR, user_id))
+
+
+def test_least_recently_used_shard_is_flushed_and_closed(small_shard_cache):
+    first, second, third = new_user(), new_user(), new_user()
+    shard = resumecraft.user_shard(first)
+    shard.profile.mutate(lambda data: data.__setitem__("name", "Evicted"))
+    resumecraft.user_shard(second)
+    resumecraft.user_shard(first)  # now more recent than second
+    resumecraft.user_shard(third)
+    assert second not in resumecraft._user_shards
+    assert first in resumecraft._user_shards
+
+    resumecraft.user_shard(new_user())
+    assert first not in resumecraft._user_shards
+    assert shard.closed.is_set()
+    # The pending write was flushed on eviction, and reopening reads it back
+    reopened = resumecraft.user_shard(first)
+    assert reopened is not shard
+    assert reopened.profile.read()["name"] == "Evicted"
+
+
+def test_pinned_shard_is_not_evicted(small_shard_cache):
+    pinned_user = new_user()
+    pinned = resumecraft.pin_shard(pinned_user)
+    try:
+        for _ in range(4):
+            resumecraft.user_shard(new_user())
+        assert resumecraft._user_shards.get(pinned_user) is pinned
+        assert not pinned.closed.is_set()
+    finally:
+        resumecraft.unpin_shard(pinned)
+    resumecraft.user_shard(new_user())
+    resumecraft.user_shard(new_user())
+    assert pinned_user not in resumecraft._user_shards
+    assert pinned.closed.is_set()
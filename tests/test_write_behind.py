@@ -0,0 +1,68 @@
+"""Write-behind JSON stores: coalesced writes, retries and flush on close."""
+import json
+import os
+import threading
+import time
+
+import app as resumecraft
+
+
+def test_write_behind_store_coalesces_writes(tmp_path):
+    path = tmp_path / "store.json"
+    store = resumecraft.WriteBehindJsonFile(str(path), dict, flush_window=60)
+    try:
+        for i in range(5):
+            store.mutate(lambda data, i=i: data.__setitem__("n", i))
+        assert store.writes == 0 and not path.exists()
+        assert store.read() == {"n": 4}
+
+        assert store.flush()
+        assert store.writes == 1
+        assert json.loads(path.read_text()) == {"n": 4}
+    finally:
+        store.close()
+
+
+def test_write_behind_store_retries_after_failed_flush(tmp_path, monkeypatch):
+    path = tmp_path / "store.json"
+    store = resumecraft.WriteBehindJsonFile(str(path), dict, flush_window=0.05)
+    real_replace = os.replace
+    failures = {"left": 1}
+
+    def flaky_replace(src, dst):
+        if dst == str(path) and failures["left"]:
+            failures["left"] -= 1
+            raise OSError("disk full")
+        return real_replace(src, dst)
+
+    monkeypatch.setattr(resumecraft.os, "replace", flaky_replace)
+    try:
+        store.mutate(lambda data: data.__setitem__("saved", True))
+        assert not store.flush()
+        # The change is kept in memory and the retry timer writes it out
+        assert store.read() == {"saved": True}
+        deadline = time.time() + 5
+        while not path.exists() and time.time() < deadline:
+            time.sleep(0.02)
+        assert json.loads(path.read_text()) == {"saved": True}
+        assert store.writes == 1
+    finally:
+        store.close()
+
+
+def test_write_behind_store_keeps_every_concurrent_mutation(tmp_path):
+    path = tmp_path / "store.json"
+    store = resumecraft.WriteBehindJsonFile(str(path), lambda: {"n": 0}, flush_window=60)
+
+    def bump():
+        for _ in range(200):
+            store.mutate(lambda data: data.__setitem__("n", data["n"] + 1))
+
+    threads = [threading.Thread(target=bump) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    store.close()
+    assert json.loads(path.read_text()) == {"n": 800}
+    assert store.writes == 1